@@ -0,0 +1,340 @@
+import argparse
+import os
+import random
+import time
+from typing import Optional
+
+from core.bitboard import BitBoard
+from core.bitboard import KING
+from core.board import Board
+from core.board import get_blank_board
+from core.board import get_board_state_fen
+from core.chess import BOARD_BACKENDS
+from core.chess import BoardBackend
+from core.chess import make_board
+from core.evaluation import compute_score
+from core.parallel import batch_perft
+from core.parallel import parallel_perft
+from core.perft import perft
+from core.perft import perft_fen
+from core.perft import run_suite
+from core.pgn import PgnError
+from core.pgn import read_games
+from core.pgn import replay_game
+from core.piece import ColourType
+from core.piece import get_piece
+from core.piece import PieceType
+from core.polyglot import PolyglotBook
+from core.profiling import BoardProfiler
+from core.search import search
+from core.search import SearchLimits
+from core.tablebase import PIECE_LETTERS
+from core.tablebase import TABLEBASE_ENDINGS
+from core.tablebase import Tablebases
+
+BENCHMARK_FENS: list[str] = ["rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+                             "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+                             "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1"]
+
+
+def benchmark_backends(depth: int) -> None:
+    """Compare the nodes per second of each board backend walking the move tree of the benchmark positions."""
+    for backend in BoardBackend:
+        total_nodes = 0
+        start = time.perf_counter()
+        for fen in BENCHMARK_FENS:
+            total_nodes += perft(make_board(fen, backend), depth)
+        elapsed = time.perf_counter() - start
+        print(f"{backend.name:<10} nodes {total_nodes:>10} time {elapsed:8.3f}s nps {total_nodes / elapsed:12.0f}")
+
+
+def generate_fen_corpus(count: int, seed: int = 0) -> list[str]:
+    """Generate a corpus of FENs from random games played out of the benchmark positions."""
+    rng = random.Random(seed)
+    corpus: list[str] = []
+    while len(corpus) < count:
+        board = make_board(rng.choice(BENCHMARK_FENS), BoardBackend.BITBOARD)
+        for _ in range(rng.randrange(10, 80)):
+            board._generate_legal_moves()
+            if not board.legal_moves:
+                break
+            board._make_move(rng.choice(board.legal_moves))
+            corpus.append(board.fen())
+    return corpus[:count]
+
+
+def benchmark_fen(corpus_path: Optional[str], count: int) -> None:
+    """Measure the FENs per second of constructing boards from, loading preallocated boards from and exporting FENs."""
+    if corpus_path is not None:
+        with open(corpus_path) as corpus_file:
+            corpus = [line.strip() for line in corpus_file if line.strip()]
+    else:
+        corpus = generate_fen_corpus(count)
+    split_corpus = [fen.split() for fen in corpus]
+    for backend in BoardBackend:
+        board_class = BOARD_BACKENDS[backend]
+        start = time.perf_counter()
+        for fen_fields in split_corpus:
+            board_class(fen_fields)
+        construct_elapsed = time.perf_counter() - start
+
+        board = board_class(split_corpus[0])
+        start = time.perf_counter()
+        for fen_fields in split_corpus:
+            board.set_fen(fen_fields)
+        load_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for fen_fields in split_corpus:
+            board.set_fen(fen_fields)
+            board.fen()
+        export_elapsed = time.perf_counter() - start - load_elapsed
+        print(f"{backend.name:<10} FENs {len(corpus)} | construct {len(corpus) / construct_elapsed:10.0f}/s"
+              f" | load preallocated {len(corpus) / load_elapsed:10.0f}/s | export {len(corpus) / export_elapsed:10.0f}/s")
+
+
+def benchmark_features(count: int) -> None:
+    """Compare the positions per second of batch feature planes and evaluation with a loop over object boards."""
+    # Imported here so the other benchmarks run without numpy
+    import numpy as np
+    from core.features import board_planes
+    from core.features import evaluate_batch
+    from core.features import pack_fens
+    from core.features import pack_planes
+
+    fens = generate_fen_corpus(count)
+    boards = [Board(fen.split()) for fen in fens]
+    bit_boards = [BitBoard(fen.split()) for fen in fens]
+
+    start = time.perf_counter()
+    loop_planes = np.stack([board_planes(board) for board in boards])
+    loop_scores = np.array([compute_score(board.state) for board in boards])
+    loop_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch_planes = pack_planes(bit_boards)
+    batch_scores = evaluate_batch(batch_planes)
+    batch_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    fen_planes = pack_fens(fens)
+    fen_scores = evaluate_batch(fen_planes)
+    fen_elapsed = time.perf_counter() - start
+
+    assert np.array_equal(loop_planes, batch_planes) and np.array_equal(loop_planes, fen_planes), "Feature planes differ"
+    assert np.array_equal(loop_scores, batch_scores) and np.array_equal(loop_scores, fen_scores), "Scores differ"
+    for name, elapsed in (("loop", loop_elapsed), ("bitboards", batch_elapsed), ("fens", fen_elapsed)):
+        print(f"{name:<10} positions {len(fens)} time {elapsed:8.3f}s positions/s {len(fens) / elapsed:12.0f} speedup {loop_elapsed / elapsed:6.2f}x")
+
+
+def benchmark_movegen(count: int) -> None:
+    """Compare the valid moves per second of the precomputed move tables with the potential move iterators."""
+    boards = [Board(fen.split()) for fen in generate_fen_corpus(count)]
+    for name, generate in (("tables", Board._get_valid_moves), ("iterators", Board._get_iterated_valid_moves)):
+        total_moves = 0
+        start = time.perf_counter()
+        for board in boards:
+            total_moves += len(generate(board))
+        elapsed = time.perf_counter() - start
+        print(f"{name:<10} positions {len(boards)} moves {total_moves:>8} time {elapsed:8.3f}s moves/s {total_moves / elapsed:12.0f}")
+
+
+def benchmark_parallel(depth: int, worker_counts: list[int], split_depth: int, backend: BoardBackend) -> None:
+    """Measure the speedup of parallel perft and batch perft on the benchmark positions over one worker."""
+    baseline: dict[str, float] = {}
+    for workers in worker_counts:
+        start = time.perf_counter()
+        nodes = sum(parallel_perft(fen, depth, workers, split_depth, backend).nodes for fen in BENCHMARK_FENS)
+        perft_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batch_nodes = sum(batch_perft(BENCHMARK_FENS, depth, workers, backend))
+        batch_elapsed = time.perf_counter() - start
+        assert batch_nodes == nodes, "Batch and parallel perft node counts differ"
+
+        baseline.setdefault("perft", perft_elapsed)
+        baseline.setdefault("batch", batch_elapsed)
+        print(f"workers {workers:>3} nodes {nodes:>10} | perft {perft_elapsed:8.3f}s speedup {baseline['perft'] / perft_elapsed:5.2f}x"
+              f" | batch {batch_elapsed:8.3f}s speedup {baseline['batch'] / batch_elapsed:5.2f}x")
+
+
+def benchmark_profile(fen: str, depth: int, count: int, output: Optional[str]) -> None:
+    """Profile the hot methods of the object board through perft of a position and the reference move generation of a corpus."""
+    board = Board(fen.split())
+    with BoardProfiler(board) as profiler:
+        perft(board, depth)
+        for corpus_fen in generate_fen_corpus(count):
+            board.set_fen(corpus_fen.split())
+            board.valid_moves = board._get_iterated_valid_moves()
+            board._brute_force_legal_moves()
+    for name, stats in profiler.as_dict().items():
+        print(f"{name:<26} calls {stats['calls']:>9} | total {stats['total_time']:8.3f}s | cumulative {stats['cumulative_time']:8.3f}s"
+              f" | per call {stats['time_per_call'] * 1e6:8.2f}us")
+    if output is not None:
+        profiler.dump_stats(output)
+
+
+def benchmark_book(path: str, count: int, backend: BoardBackend) -> None:
+    """Measure the time to open a Polyglot book and the probes per second of generated positions, counting those in book."""
+    boards = [make_board(fen, backend) for fen in generate_fen_corpus(count)]
+    start = time.perf_counter()
+    book = PolyglotBook(path)
+    open_elapsed = time.perf_counter() - start
+    with book:
+        hits = 0
+        start = time.perf_counter()
+        for board in boards:
+            if book.entries(board):
+                hits += 1
+        probe_elapsed = time.perf_counter() - start
+    print(f"entries {len(book)} | open {open_elapsed * 1000:.3f}ms | positions {len(boards)} | in book {hits}"
+          f" | probes {len(boards) / probe_elapsed if probe_elapsed > 0 else 0:.0f}/s")
+
+
+def generate_ending_fens(ending: str, count: int, seed: int = 0) -> list[str]:
+    """Generate legal positions of an ending by placing its pieces at random, giving the material to each colour in turn."""
+    rng = random.Random(seed)
+    fens: list[str] = []
+    while len(fens) < count:
+        strong = ColourType(len(fens) % 2)
+        weak = ColourType(1 - strong.value)
+        squares = rng.sample(range(64), len(ending))
+        if any(letter == "P" and not 8 <= square < 56 for letter, square in zip(ending, squares)):
+            continue
+        state = get_blank_board()
+        for index, (letter, square) in enumerate(zip(ending, squares)):
+            state[square // 8][square % 8].piece = get_piece(PieceType(PIECE_LETTERS.index(letter)), weak if index == len(ending) - 1 else strong)
+        board = BitBoard([get_board_state_fen(state), rng.choice("wb"), "-", "-"])
+        # the side not to move can't be in check, which also keeps the kings apart
+        if not board.is_square_attacked(board.pieces[board.side ^ 1][KING].bit_length() - 1, board.side):
+            fens.append(board.fen())
+    return fens
+
+
+def benchmark_tablebase(directory: str, endings: list[str], count: int) -> None:
+    """Generate the tables of endings by retrograde analysis, then measure the probes per second of each board backend."""
+    # Imported here so the other benchmarks run without numpy
+    import numpy as np
+    from core.retrograde import generate_tablebase
+    from core.retrograde import generation_order
+    from core.retrograde import save_tablebase
+
+    os.makedirs(directory, exist_ok=True)
+    solved: dict[str, np.ndarray] = {}
+    for ending in generation_order(endings):
+        start = time.perf_counter()
+        values = generate_tablebase(ending, solved)
+        elapsed = time.perf_counter() - start
+        solved[ending] = values
+        path = save_tablebase(directory, ending, values)
+        side_size = len(values) // 2
+        print(f"{ending:<5} generate {elapsed:8.3f}s | white to move wins {np.count_nonzero(values[:side_size]):>9}"
+              f" | black to move loses {np.count_nonzero(values[side_size:]):>9} | longest mate {int(values.max()) - 1:>2} plies"
+              f" | file {os.path.getsize(path):>9} bytes")
+    fens = [fen for ending in endings for fen in generate_ending_fens(ending, count)]
+    with Tablebases(directory) as tablebases:
+        for backend in BoardBackend:
+            boards = [make_board(fen, backend) for fen in fens]
+            start = time.perf_counter()
+            for board in boards:
+                board.probe_tablebase(tablebases)
+            elapsed = time.perf_counter() - start
+            print(f"{backend.name:<10} probes {len(boards)} time {elapsed:8.3f}s probes/s {len(boards) / elapsed:12.0f}")
+
+
+def benchmark_pgn(path: str, backend: BoardBackend) -> None:
+    """Measure the games per second of streaming and replaying the games of a PGN file, reporting the games that don't replay."""
+    games = 0
+    invalid_games = 0
+    positions = 0
+    chess = None
+    start = time.perf_counter()
+    for game in read_games(path):
+        games += 1
+        try:
+            for chess in replay_game(game, chess, backend):
+                positions += 1
+        except PgnError as error:
+            invalid_games += 1
+            print(error)
+    elapsed = time.perf_counter() - start
+    print(f"games {games} | invalid {invalid_games} | positions {positions} | time {elapsed:.3f}s"
+          f" | games {games / elapsed if elapsed > 0 else 0:.1f}/s | positions {positions / elapsed if elapsed > 0 else 0:.0f}/s")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Chess core benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+    backends_parser = subparsers.add_parser("backends", help="compare the board backends")
+    backends_parser.add_argument("--depth", type=int, default=3)
+    perft_parser = subparsers.add_parser("perft", help="count the leaf nodes of a position to a depth")
+    perft_parser.add_argument("fen")
+    perft_parser.add_argument("depth", type=int)
+    perft_parser.add_argument("--divide", action="store_true", help="print the node count of each root move")
+    suite_parser = subparsers.add_parser("suite", help="run the perft suite against the reference node counts")
+    suite_parser.add_argument("--depth", type=int, default=3)
+    fen_parser = subparsers.add_parser("fen", help="measure FEN loading and exporting throughput")
+    fen_parser.add_argument("--corpus", help="file of FENs, one per line, otherwise a corpus is generated")
+    fen_parser.add_argument("--count", type=int, default=20000, help="size of the generated corpus")
+    features_parser = subparsers.add_parser("features", help="compare batch feature planes and evaluation with a per-board loop")
+    features_parser.add_argument("--count", type=int, default=10000)
+    movegen_parser = subparsers.add_parser("movegen", help="compare the move tables with the potential move iterators")
+    movegen_parser.add_argument("--count", type=int, default=5000, help="number of generated positions")
+    parallel_parser = subparsers.add_parser("parallel", help="measure the scaling of perft across a process pool")
+    parallel_parser.add_argument("--depth", type=int, default=4)
+    parallel_parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="worker counts to compare")
+    parallel_parser.add_argument("--split-depth", type=int, default=1, help="ply at which the move tree is split into tasks")
+    book_parser = subparsers.add_parser("book", help="measure opening and probing a Polyglot opening book")
+    book_parser.add_argument("path")
+    book_parser.add_argument("--count", type=int, default=10000, help="number of generated positions to probe")
+    tablebase_parser = subparsers.add_parser("tablebase", help="generate endgame tablebases and measure probing them")
+    tablebase_parser.add_argument("directory", help="directory to write the tables to")
+    tablebase_parser.add_argument("--endings", nargs="+", choices=TABLEBASE_ENDINGS, default=TABLEBASE_ENDINGS)
+    tablebase_parser.add_argument("--count", type=int, default=10000, help="number of generated positions of each ending to probe")
+    pgn_parser = subparsers.add_parser("pgn", help="measure PGN streaming and replaying throughput")
+    pgn_parser.add_argument("path")
+    profile_parser = subparsers.add_parser("profile", help="count and time the object board's hot methods")
+    profile_parser.add_argument("fen")
+    profile_parser.add_argument("depth", type=int)
+    profile_parser.add_argument("--count", type=int, default=200, help="positions to generate reference moves for")
+    profile_parser.add_argument("--output", help="write pstats-compatible stats to this file")
+    search_parser = subparsers.add_parser("search", help="search a position for the best move")
+    search_parser.add_argument("fen")
+    search_parser.add_argument("--depth", type=int, default=64)
+    search_parser.add_argument("--nodes", type=int)
+    search_parser.add_argument("--movetime", type=float, help="seconds")
+    for subparser in (perft_parser, suite_parser, parallel_parser, book_parser, pgn_parser, search_parser):
+        subparser.add_argument("--backend", choices=[backend.name for backend in BoardBackend], default=BoardBackend.OBJECT.name)
+    args = parser.parse_args()
+    if args.benchmark == "backends":
+        benchmark_backends(args.depth)
+    elif args.benchmark == "perft":
+        result = perft_fen(args.fen, args.depth, BoardBackend[args.backend])
+        if args.divide:
+            for move, nodes in result.divide.items():
+                print(f"{move}: {nodes}")
+        print(result)
+    elif args.benchmark == "suite":
+        run_suite(args.depth, BoardBackend[args.backend])
+    elif args.benchmark == "fen":
+        benchmark_fen(args.corpus, args.count)
+    elif args.benchmark == "features":
+        benchmark_features(args.count)
+    elif args.benchmark == "movegen":
+        benchmark_movegen(args.count)
+    elif args.benchmark == "parallel":
+        benchmark_parallel(args.depth, args.workers, args.split_depth, BoardBackend[args.backend])
+    elif args.benchmark == "book":
+        benchmark_book(args.path, args.count, BoardBackend[args.backend])
+    elif args.benchmark == "tablebase":
+        benchmark_tablebase(args.directory, args.endings, args.count)
+    elif args.benchmark == "pgn":
+        benchmark_pgn(args.path, BoardBackend[args.backend])
+    elif args.benchmark == "profile":
+        benchmark_profile(args.fen, args.depth, args.count, args.output)
+    elif args.benchmark == "search":
+        limits = SearchLimits(args.depth, args.nodes, args.movetime)
+        board = make_board(args.fen, BoardBackend[args.backend])
+        search(board, limits)
+        if isinstance(board, Board):
+            print(f"Staged moves generated {board.moves_generated} | Consumed {board.moves_consumed}")
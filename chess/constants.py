@@ -8,12 +8,12 @@ UNICODE_PIECE_SYMBOLS: list[list[str]] = [["\u265A", "\u2654"],  # King   |K
 
 piece_str = str
 # [Piece][Colour]
-PIECE_STRS: list[list[piece_str]] = [["k", "K"],
-                                     ["q", "Q"],
-                                     ["r", "R"],
-                                     ["b", "B"],
-                                     ["n", "N"],
-                                     ["p", "P"]]
+PIECE_STRS: list[list[piece_str]] = [["K", "k"],
+                                     ["Q", "q"],
+                                     ["R", "r"],
+                                     ["B", "b"],
+                                     ["N", "n"],
+                                     ["P", "p"]]
 
 # Windows
 # UNICODE_WHITE_SPACE: str = "\u3000"
@@ -0,0 +1,22 @@
+from core.piece import ColourType
+from core.piece import PieceType
+from core.potential_move import MOVE_RAYS
+from core.potential_move import PAWN_CAPTURES
+from core.potential_move import RankFile
+
+# [Square index] (rank, file) of the squares a piece on the square attacks, where the square index is rank * 8 + file
+KNIGHT_ATTACKS: list[list[RankFile]] = [[target for ray in rays for target in ray]
+                                        for rays in MOVE_RAYS[PieceType.KNIGHT.value][ColourType.WHITE.value]]
+KING_ATTACKS: list[list[RankFile]] = [[target for ray in rays for target in ray]
+                                      for rays in MOVE_RAYS[PieceType.KING.value][ColourType.WHITE.value]]
+# [Colour][Square index]
+PAWN_ATTACKS: list[list[list[RankFile]]] = PAWN_CAPTURES
+# [Square index] rays of a sliding piece on the square
+ROOK_RAYS: list[list[list[RankFile]]] = MOVE_RAYS[PieceType.ROOK.value][ColourType.WHITE.value]
+BISHOP_RAYS: list[list[list[RankFile]]] = MOVE_RAYS[PieceType.BISHOP.value][ColourType.WHITE.value]
+
+
+def pawn_attacker_squares(square: int, colour: ColourType) -> list[RankFile]:
+    """Get the squares from which a pawn of the given colour would attack a square."""
+    # a pawn attacks a square from the squares a pawn of the other colour on it would attack
+    return PAWN_ATTACKS[1 - colour.value][square]
@@ -0,0 +1,768 @@
+from collections.abc import Iterator
+from collections.abc import Sequence
+from typing import Optional
+
+from core.board import board_state_str
+from core.board import EMPTY_SQUARE_COUNTS
+from core.board import LEGAL_MOVE_CACHE_SIZE
+from core.castling import CASTLING_RIGHTS_MASKS
+from core.castling import CASTLING_SIDE_BY_KING_TO
+from core.castling import COLOUR_CASTLING_SIDES
+from core.castling import read_castling_rights
+from core.castling import write_castling_rights
+from core.evaluation import mvv_lva_score
+from core.evaluation import PIECE_SQUARE_SCORES
+from core.move import CASTLING_FLAG
+from core.move import DOUBLE_STEP_FLAG
+from core.move import EN_PASSANT_FLAG
+from core.move import FLAGS_SHIFT
+from core.move import FROM_MASK
+from core.move import MOVE_KEY_MASK
+from core.move import pack_move
+from core.move import PROMOTION_SHIFT
+from core.move import TO_SHIFT
+from core.move_index import LegalMoveIndex
+from core.piece import CHESS_PIECES
+from core.piece import ColourType
+from core.piece import Piece
+from core.piece import piece_code
+from core.piece import PIECES
+from core.piece import PieceType
+from core.square import BoardSquare
+from core.square import Square
+from core.tablebase import TablebaseResult
+from core.tablebase import Tablebases
+from core.transposition import LegalMoveCache
+from core.undo import BitBoardUndoRecord
+from core.undo import UndoStack
+from core.zobrist import castling_key
+from core.zobrist import ZOBRIST_BLACK_TO_MOVE
+from core.zobrist import ZOBRIST_EN_PASSANT_KEYS
+from core.zobrist import ZOBRIST_PIECE_KEYS
+from util import read_chess_notation
+from util import write_chess_notation
+
+Bitboard = int
+# A move in the PackedMove layout, kept as a plain int as creating PackedMoves in the generator is twice as slow
+BitMove = int
+
+FULL_BOARD: Bitboard = (1 << 64) - 1
+EMPTY_SQUARE = -1
+
+RANK_1: Bitboard = 0xFF
+RANK_3: Bitboard = RANK_1 << 16
+RANK_6: Bitboard = RANK_1 << 40
+RANK_8: Bitboard = RANK_1 << 56
+PROMOTION_RANKS: Bitboard = RANK_1 | RANK_8
+# a1 is a dark square
+DARK_SQUARES: Bitboard = sum(1 << square for square in range(64) if (square // 8 + square % 8) % 2 == 0)
+
+PROMOTION_PIECE_TYPES = [PieceType.QUEEN.value, PieceType.ROOK.value, PieceType.BISHOP.value, PieceType.KNIGHT.value]
+
+KING = PieceType.KING.value
+QUEEN = PieceType.QUEEN.value
+ROOK = PieceType.ROOK.value
+BISHOP = PieceType.BISHOP.value
+KNIGHT = PieceType.KNIGHT.value
+PAWN = PieceType.PAWN.value
+WHITE = ColourType.WHITE.value
+BLACK = ColourType.BLACK.value
+
+
+def square_index(rank: int, file: int) -> int:
+    """Get the 0...63 bitboard index of a rank and file, with a1 as 0 and h8 as 63."""
+    return rank * 8 + file
+
+
+def iter_bits(bitboard: Bitboard) -> Iterator[int]:
+    """Iterate over the indices of the set bits of a bitboard, from least to most significant."""
+    while bitboard:
+        lsb = bitboard & -bitboard
+        yield lsb.bit_length() - 1
+        bitboard ^= lsb
+
+
+def popcount(bitboard: Bitboard) -> int:
+    """Count the set bits of a bitboard."""
+    return bin(bitboard).count("1")
+
+
+def _step_targets(square: int, steps: list[tuple[int, int]]) -> Bitboard:
+    """Get a bitboard of the on-board squares a single step away from the given square."""
+    rank, file = divmod(square, 8)
+    targets = 0
+    for rank_change, file_change in steps:
+        to_rank, to_file = rank + rank_change, file + file_change
+        if 0 <= to_rank < 8 and 0 <= to_file < 8:
+            targets |= 1 << square_index(to_rank, to_file)
+    return targets
+
+
+def _ray(square: int, rank_change: int, file_change: int) -> Bitboard:
+    """Get a bitboard of the squares in a direction from the given square, up to the edge of the board."""
+    rank, file = divmod(square, 8)
+    ray = 0
+    rank, file = rank + rank_change, file + file_change
+    while 0 <= rank < 8 and 0 <= file < 8:
+        ray |= 1 << square_index(rank, file)
+        rank, file = rank + rank_change, file + file_change
+    return ray
+
+
+KNIGHT_STEPS = [(1, 2), (2, 1), (2, -1), (1, -2), (-1, -2), (-2, -1), (-2, 1), (-1, 2)]
+KING_STEPS = [(1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1)]
+# Directions which increase the square index, and those which decrease it
+POSITIVE_ROOK_DIRECTIONS = [(1, 0), (0, 1)]
+NEGATIVE_ROOK_DIRECTIONS = [(-1, 0), (0, -1)]
+POSITIVE_BISHOP_DIRECTIONS = [(1, 1), (1, -1)]
+NEGATIVE_BISHOP_DIRECTIONS = [(-1, -1), (-1, 1)]
+
+KNIGHT_ATTACKS: list[Bitboard] = [_step_targets(square, KNIGHT_STEPS) for square in range(64)]
+KING_ATTACKS: list[Bitboard] = [_step_targets(square, KING_STEPS) for square in range(64)]
+# [Colour][Square]
+PAWN_ATTACKS: list[list[Bitboard]] = [[_step_targets(square, [(1, 1), (1, -1)]) for square in range(64)],
+                                      [_step_targets(square, [(-1, 1), (-1, -1)]) for square in range(64)]]
+# [Direction][Square]
+POSITIVE_ROOK_RAYS: list[list[Bitboard]] = [[_ray(square, *direction) for square in range(64)] for direction in POSITIVE_ROOK_DIRECTIONS]
+NEGATIVE_ROOK_RAYS: list[list[Bitboard]] = [[_ray(square, *direction) for square in range(64)] for direction in NEGATIVE_ROOK_DIRECTIONS]
+POSITIVE_BISHOP_RAYS: list[list[Bitboard]] = [[_ray(square, *direction) for square in range(64)] for direction in POSITIVE_BISHOP_DIRECTIONS]
+NEGATIVE_BISHOP_RAYS: list[list[Bitboard]] = [[_ray(square, *direction) for square in range(64)] for direction in NEGATIVE_BISHOP_DIRECTIONS]
+
+
+def _sliding_attacks(square: int, occupied: Bitboard, positive_rays: list[list[Bitboard]], negative_rays: list[list[Bitboard]]) -> Bitboard:
+    """Get the squares attacked along the given rays, stopping at (and including) the first blocker of each ray."""
+    attacks = 0
+    for rays in positive_rays:
+        ray = rays[square]
+        blockers = ray & occupied
+        if blockers:
+            ray ^= rays[(blockers & -blockers).bit_length() - 1]
+        attacks |= ray
+    for rays in negative_rays:
+        ray = rays[square]
+        blockers = ray & occupied
+        if blockers:
+            ray ^= rays[blockers.bit_length() - 1]
+        attacks |= ray
+    return attacks
+
+
+def _between(from_: int, to: int) -> Bitboard:
+    """Get a bitboard of the squares strictly between two squares on a rank, file or diagonal, or 0 if they aren't on one."""
+    for rays in POSITIVE_ROOK_RAYS + NEGATIVE_ROOK_RAYS + POSITIVE_BISHOP_RAYS + NEGATIVE_BISHOP_RAYS:
+        if rays[from_] >> to & 1:
+            return rays[from_] & ~rays[to] & ~(1 << to)
+    return 0
+
+
+# [From][To]
+BETWEEN: list[list[Bitboard]] = [[_between(from_, to) for to in range(64)] for from_ in range(64)]
+# [Square] squares attacked on an empty board
+ROOK_LINES: list[Bitboard] = [sum(rays[square] for rays in POSITIVE_ROOK_RAYS + NEGATIVE_ROOK_RAYS) for square in range(64)]
+BISHOP_LINES: list[Bitboard] = [sum(rays[square] for rays in POSITIVE_BISHOP_RAYS + NEGATIVE_BISHOP_RAYS) for square in range(64)]
+
+
+def rook_attacks(square: int, occupied: Bitboard) -> Bitboard:
+    """Get the squares attacked by a rook on the given square."""
+    return _sliding_attacks(square, occupied, POSITIVE_ROOK_RAYS, NEGATIVE_ROOK_RAYS)
+
+
+def bishop_attacks(square: int, occupied: Bitboard) -> Bitboard:
+    """Get the squares attacked by a bishop on the given square."""
+    return _sliding_attacks(square, occupied, POSITIVE_BISHOP_RAYS, NEGATIVE_BISHOP_RAYS)
+
+
+EMPTY_BOARD: list[int] = [EMPTY_SQUARE] * 64
+# [FEN character] piece code
+FEN_PIECE_CODES: dict[str, int] = {char: piece_code(piece) for char, piece in CHESS_PIECES.items()}
+
+
+class BitBoard:
+    """A chess board represented by 64-bit integer bitboards, one per piece type and colour, plus occupancy masks.
+
+    Exposes the same interface as core.board.Board, so either can back a Chess game.
+    """
+    # [Colour][PieceType]
+    pieces: list[list[Bitboard]]
+    # [Colour]
+    occupancy: list[Bitboard]
+    occupied: Bitboard
+    # [Square] piece code or EMPTY_SQUARE
+    mailbox: list[int]
+    side: int
+    en_passant: int
+    # Mask of the castling rights bits
+    castling_rights: int
+    # Halfmoves since the last capture or pawn move
+    halfmove_clock: int
+    legal_moves: list[BitMove]
+    undo_stack: UndoStack[BitBoardUndoRecord]
+    zobrist_hash: int
+    # Material and piece-square score, positive when white is better
+    score: int
+    # Check the incrementally updated hash and score against a full recomputation after every move
+    verify_hash: bool = False
+    verify_score: bool = False
+    legal_move_cache: LegalMoveCache[BitMove]
+    # The legal moves of the last position they were looked up in, indexed by move key
+    _legal_move_index: Optional[LegalMoveIndex[BitMove]]
+    _state: Optional[list[list[BoardSquare]]]
+
+    def __init__(self, fen: list[str], legal_move_cache_size: int = LEGAL_MOVE_CACHE_SIZE):
+        self.legal_move_cache = LegalMoveCache(legal_move_cache_size)
+        self._legal_move_index = None
+        self.undo_stack = UndoStack(BitBoardUndoRecord)
+        self.mailbox = [EMPTY_SQUARE] * 64
+        self.set_fen(fen)
+
+    def set_fen(self, fen: list[str]) -> None:
+        """Set-up the board from the board state, turn, castling, en-passant and optional halfmove clock fields of a FEN."""
+        board_state_fen, turn_fen, castling_fen, en_passant_fen = fen[:4]
+        self.halfmove_clock = int(fen[4]) if len(fen) > 4 else 0
+        self.pieces = [[0] * 6 for _ in ColourType]
+        self.occupancy = [0, 0]
+        self.occupied = 0
+        mailbox = self.mailbox
+        mailbox[:] = EMPTY_BOARD
+        self.legal_moves = []
+        self.undo_stack.clear()
+        self._state = None
+
+        # FEN lists the ranks from the 8th down to the 1st
+        square = 56
+        for pieces in board_state_fen.split("/"):
+            for char in pieces:
+                empty_squares = EMPTY_SQUARE_COUNTS.get(char)
+                if empty_squares is None:
+                    self._put_piece(square, FEN_PIECE_CODES[char])
+                    square += 1
+                else:
+                    square += empty_squares
+            square -= 16
+
+        self.side = WHITE if turn_fen == "w" else BLACK
+
+        self.castling_rights = read_castling_rights(castling_fen)
+
+        if en_passant_fen != "-":
+            ep_position = read_chess_notation(en_passant_fen)
+            self.en_passant = square_index(ep_position.rank, ep_position.file)
+        else:
+            self.en_passant = EMPTY_SQUARE
+
+        self.zobrist_hash = self.compute_hash()
+        self.score = self.compute_score()
+
+    def fen(self) -> str:
+        """Get the board state, turn, castling and en-passant fields of the FEN of the position."""
+        ranks = []
+        mailbox = self.mailbox
+        for rank_start in range(56, -8, -8):
+            rank_fen = ""
+            empty_squares = 0
+            for code in mailbox[rank_start:rank_start + 8]:
+                if code == EMPTY_SQUARE:
+                    empty_squares += 1
+                    continue
+                if empty_squares:
+                    rank_fen += str(empty_squares)
+                    empty_squares = 0
+                rank_fen += PIECES[code].fen
+            if empty_squares:
+                rank_fen += str(empty_squares)
+            ranks.append(rank_fen)
+        turn_fen = "w" if self.side == WHITE else "b"
+        en_passant_fen = write_chess_notation(Square(*divmod(self.en_passant, 8))) if self.en_passant != EMPTY_SQUARE else "-"
+        return f"{'/'.join(ranks)} {turn_fen} {write_castling_rights(self.castling_rights)} {en_passant_fen}"
+
+    def __repr__(self) -> str:
+        return board_state_str(self.state)
+
+    @property
+    def turn(self) -> ColourType:
+        return ColourType(self.side)
+
+    @property
+    def state(self) -> list[list[BoardSquare]]:
+        """An 8x8 [Rank][File] snapshot of the board as BoardSquares, rebuilt lazily after the position changes."""
+        if self._state is None:
+            self._state = [[BoardSquare(rank, file, self.piece_at(square_index(rank, file)))
+                            for file in range(8)]
+                           for rank in range(8)]
+        return self._state
+
+    @property
+    def en_passant_square(self) -> Optional[BoardSquare]:
+        if self.en_passant == EMPTY_SQUARE:
+            return None
+        rank, file = divmod(self.en_passant, 8)
+        return self.state[rank][file]
+
+    def piece_at(self, square: int) -> Optional[Piece]:
+        """Get the piece on the square of the given index, if any."""
+        code = self.mailbox[square]
+        return PIECES[code] if code != EMPTY_SQUARE else None
+
+    def _put_piece(self, square: int, code: int) -> None:
+        colour, piece_type = divmod(code, 6)
+        bit = 1 << square
+        self.pieces[colour][piece_type] |= bit
+        self.occupancy[colour] |= bit
+        self.occupied |= bit
+        self.mailbox[square] = code
+
+    def legal_move_index(self) -> LegalMoveIndex[BitMove]:
+        """Get the legal moves of the position indexed by move key and from-square, building the index on first use in the position."""
+        index = self._legal_move_index
+        if index is None or index.zobrist_hash != self.zobrist_hash:
+            self._generate_legal_moves()
+            index = LegalMoveIndex(self.zobrist_hash, self.legal_moves, [move & MOVE_KEY_MASK for move in self.legal_moves])
+            self._legal_move_index = index
+        return index
+
+    def move_key(self, move: BitMove) -> int:
+        """Get the key of a move, from | to << 6 | promotion << 12."""
+        return move & MOVE_KEY_MASK
+
+    def move_pieces(self, move: BitMove) -> tuple[int, int]:
+        """Get the PieceType values of the moving and captured pieces of a move, with -1 for no capture."""
+        if (move >> FLAGS_SHIFT) & EN_PASSANT_FLAG:
+            victim = PAWN
+        else:
+            captured = self.mailbox[(move >> TO_SHIFT) & FROM_MASK]
+            victim = captured % 6 if captured != EMPTY_SQUARE else -1
+        return self.mailbox[move & FROM_MASK] % 6, victim
+
+    def _make_move(self, move: BitMove) -> None:
+        from_ = move & FROM_MASK
+        to = (move >> TO_SHIFT) & FROM_MASK
+        promotion = (move >> PROMOTION_SHIFT) & 7
+        flags = move >> FLAGS_SHIFT
+        us = self.side
+        them = us ^ 1
+        mailbox = self.mailbox
+        code = mailbox[from_]
+
+        zobrist_hash = self.zobrist_hash
+        score = self.score
+
+        # Remove the captured piece
+        capture_square = to
+        if flags & EN_PASSANT_FLAG:
+            capture_square = to - 8 if us == WHITE else to + 8
+        captured = mailbox[capture_square]
+        if captured != EMPTY_SQUARE:
+            capture_bit = 1 << capture_square
+            self.pieces[them][captured - them * 6] ^= capture_bit
+            self.occupancy[them] ^= capture_bit
+            self.occupied ^= capture_bit
+            mailbox[capture_square] = EMPTY_SQUARE
+            zobrist_hash ^= ZOBRIST_PIECE_KEYS[captured][capture_square]
+            score -= PIECE_SQUARE_SCORES[captured][capture_square]
+
+        # Move the piece, replacing it with the promotion piece if promoting
+        from_bit = 1 << from_
+        to_bit = 1 << to
+        own_pieces = self.pieces[us]
+        own_pieces[code - us * 6] ^= from_bit
+        zobrist_hash ^= ZOBRIST_PIECE_KEYS[code][from_]
+        score -= PIECE_SQUARE_SCORES[code][from_]
+        if promotion:
+            code = us * 6 + promotion
+        own_pieces[code - us * 6] ^= to_bit
+        zobrist_hash ^= ZOBRIST_PIECE_KEYS[code][to]
+        score += PIECE_SQUARE_SCORES[code][to]
+        self.occupancy[us] ^= from_bit | to_bit
+        self.occupied ^= from_bit
+        self.occupied |= to_bit
+        mailbox[from_] = EMPTY_SQUARE
+        mailbox[to] = code
+
+        # Move the rook when castling
+        if flags & CASTLING_FLAG:
+            side = CASTLING_SIDE_BY_KING_TO[to]
+            rook = us * 6 + ROOK
+            rook_bits = (1 << side.rook_from) | (1 << side.rook_to)
+            own_pieces[ROOK] ^= rook_bits
+            self.occupancy[us] ^= rook_bits
+            self.occupied ^= rook_bits
+            mailbox[side.rook_from] = EMPTY_SQUARE
+            mailbox[side.rook_to] = rook
+            zobrist_hash ^= ZOBRIST_PIECE_KEYS[rook][side.rook_from] ^ ZOBRIST_PIECE_KEYS[rook][side.rook_to]
+            score += PIECE_SQUARE_SCORES[rook][side.rook_to] - PIECE_SQUARE_SCORES[rook][side.rook_from]
+
+        record = self.undo_stack.push()
+        record.move = move
+        record.captured_piece = captured
+        record.en_passant_square = self.en_passant
+        record.castling_rights = self.castling_rights
+        record.halfmove_clock = self.halfmove_clock
+        record.zobrist_hash = self.zobrist_hash
+        record.score = self.score
+        if captured != EMPTY_SQUARE or code - us * 6 == PAWN or promotion:
+            self.halfmove_clock = 0
+        else:
+            self.halfmove_clock += 1
+
+        # Moving a king or rook, or capturing a rook, loses its castling rights
+        castling_rights = self.castling_rights
+        if castling_rights:
+            castling_rights &= CASTLING_RIGHTS_MASKS[from_] & CASTLING_RIGHTS_MASKS[to]
+            if castling_rights != self.castling_rights:
+                zobrist_hash ^= castling_key(self.castling_rights) ^ castling_key(castling_rights)
+                self.castling_rights = castling_rights
+
+        self.legal_moves = []
+        self.score = score
+        if self.en_passant != EMPTY_SQUARE:
+            zobrist_hash ^= ZOBRIST_EN_PASSANT_KEYS[self.en_passant & 7]
+        if flags & DOUBLE_STEP_FLAG:
+            self.en_passant = (from_ + to) >> 1
+            zobrist_hash ^= ZOBRIST_EN_PASSANT_KEYS[to & 7]
+        else:
+            self.en_passant = EMPTY_SQUARE
+        self.side = them
+        self.zobrist_hash = zobrist_hash ^ ZOBRIST_BLACK_TO_MOVE
+        self._state = None
+        if self.verify_hash:
+            self._verify_hash()
+        if self.verify_score:
+            self._verify_score()
+
+    def undo_move(self) -> None:
+        try:
+            record = self.undo_stack.pop()
+        except IndexError:
+            print("No moves to undo!")
+            return
+        move = record.move
+        captured = record.captured_piece
+        from_ = move & FROM_MASK
+        to = (move >> TO_SHIFT) & FROM_MASK
+        promotion = (move >> PROMOTION_SHIFT) & 7
+        flags = move >> FLAGS_SHIFT
+        them = self.side
+        us = them ^ 1
+        mailbox = self.mailbox
+
+        # Move the piece back, replacing a promoted piece with the pawn
+        from_bit = 1 << from_
+        to_bit = 1 << to
+        own_pieces = self.pieces[us]
+        code = mailbox[to]
+        own_pieces[code - us * 6] ^= to_bit
+        if promotion:
+            code = us * 6 + PAWN
+        own_pieces[code - us * 6] ^= from_bit
+        self.occupancy[us] ^= from_bit | to_bit
+        self.occupied ^= to_bit
+        self.occupied |= from_bit
+        mailbox[to] = EMPTY_SQUARE
+        mailbox[from_] = code
+
+        # Move the rook back when castling
+        if flags & CASTLING_FLAG:
+            side = CASTLING_SIDE_BY_KING_TO[to]
+            rook_bits = (1 << side.rook_from) | (1 << side.rook_to)
+            own_pieces[ROOK] ^= rook_bits
+            self.occupancy[us] ^= rook_bits
+            self.occupied ^= rook_bits
+            mailbox[side.rook_to] = EMPTY_SQUARE
+            mailbox[side.rook_from] = us * 6 + ROOK
+
+        # Restore the captured piece
+        if captured != EMPTY_SQUARE:
+            capture_square = to
+            if flags & EN_PASSANT_FLAG:
+                capture_square = to - 8 if us == WHITE else to + 8
+            capture_bit = 1 << capture_square
+            self.pieces[them][captured - them * 6] |= capture_bit
+            self.occupancy[them] |= capture_bit
+            self.occupied |= capture_bit
+            mailbox[capture_square] = captured
+
+        self.en_passant = record.en_passant_square
+        self.castling_rights = record.castling_rights
+        self.halfmove_clock = record.halfmove_clock
+        self.side = us
+        self.zobrist_hash = record.zobrist_hash
+        self.score = record.score
+        self.legal_moves = []
+        self._state = None
+        if self.verify_hash:
+            self._verify_hash()
+        if self.verify_score:
+            self._verify_score()
+
+    def compute_hash(self) -> int:
+        """Compute the Zobrist hash of the position from scratch."""
+        zobrist_hash = 0
+        for square, code in enumerate(self.mailbox):
+            if code != EMPTY_SQUARE:
+                zobrist_hash ^= ZOBRIST_PIECE_KEYS[code][square]
+        if self.side == BLACK:
+            zobrist_hash ^= ZOBRIST_BLACK_TO_MOVE
+        zobrist_hash ^= castling_key(self.castling_rights)
+        if self.en_passant != EMPTY_SQUARE:
+            zobrist_hash ^= ZOBRIST_EN_PASSANT_KEYS[self.en_passant & 7]
+        return zobrist_hash
+
+    def compute_score(self) -> int:
+        """Compute the material and piece-square score of the position from scratch."""
+        score = 0
+        for square, code in enumerate(self.mailbox):
+            if code != EMPTY_SQUARE:
+                score += PIECE_SQUARE_SCORES[code][square]
+        return score
+
+    def _verify_hash(self) -> None:
+        assert self.zobrist_hash == self.compute_hash(), "Incremental Zobrist hash differs from the recomputed hash"
+
+    def evaluate(self) -> int:
+        """Get the material and piece-square score of the position from the side to move's perspective."""
+        return self.score if self.side == WHITE else -self.score
+
+    def _verify_score(self) -> None:
+        assert self.score == self.compute_score(), "Incremental score differs from the recomputed score"
+
+    def is_square_attacked(self, square: int, by: int, occupied: Optional[Bitboard] = None) -> bool:
+        """Check if the square of the given index is attacked by any piece of the given colour.
+
+        Sliding attacks are blocked by the given occupancy, which defaults to the board's.
+        """
+        if occupied is None:
+            occupied = self.occupied
+        pieces = self.pieces[by]
+        if KNIGHT_ATTACKS[square] & pieces[KNIGHT]:
+            return True
+        if KING_ATTACKS[square] & pieces[KING]:
+            return True
+        # A pawn attacks the square if a pawn of the opposite colour on the square would attack it
+        if PAWN_ATTACKS[by ^ 1][square] & pieces[PAWN]:
+            return True
+        diagonal = pieces[BISHOP] | pieces[QUEEN]
+        if diagonal and bishop_attacks(square, occupied) & diagonal:
+            return True
+        orthogonal = pieces[ROOK] | pieces[QUEEN]
+        return bool(orthogonal and rook_attacks(square, occupied) & orthogonal)
+
+    def _get_checks_and_pins(self, king_square: int) -> tuple[Bitboard, dict[int, Bitboard]]:
+        """Get the squares a non-king move must land on to answer a check, and the squares each pinned piece can move to.
+
+        The check mask is the whole board when not in check, the checker and the squares between it and the king when in
+        check, and empty in double check. Pinned pieces are indexed by square and can move along the pin, up to and
+        including the pinning piece.
+        """
+        us = self.side
+        them = us ^ 1
+        enemy_pieces = self.pieces[them]
+        occupied = self.occupied
+        diagonal = enemy_pieces[BISHOP] | enemy_pieces[QUEEN]
+        orthogonal = enemy_pieces[ROOK] | enemy_pieces[QUEEN]
+        checkers = (KNIGHT_ATTACKS[king_square] & enemy_pieces[KNIGHT] | PAWN_ATTACKS[us][king_square] & enemy_pieces[PAWN]
+                    | bishop_attacks(king_square, occupied) & diagonal | rook_attacks(king_square, occupied) & orthogonal)
+        if not checkers:
+            check_mask = FULL_BOARD
+        elif checkers & (checkers - 1):
+            check_mask = 0
+        else:
+            check_mask = checkers | BETWEEN[king_square][checkers.bit_length() - 1]
+
+        pins = {}
+        own = self.occupancy[us]
+        # Sliders which would attack the king on an empty board pin the only piece between them and the king, if it's ours
+        for sniper in iter_bits(BISHOP_LINES[king_square] & diagonal | ROOK_LINES[king_square] & orthogonal):
+            between = BETWEEN[king_square][sniper]
+            blockers = between & occupied
+            if blockers & own and not blockers & (blockers - 1):
+                pins[blockers.bit_length() - 1] = between | 1 << sniper
+        return check_mask, pins
+
+    def probe_tablebase(self, tablebases: Tablebases) -> Optional[TablebaseResult]:
+        """Look up the result of the position with perfect play, or None if there's no table for its material or castling is possible."""
+        if self.castling_rights:
+            return None
+        return tablebases.probe(((square, code) for square, code in enumerate(self.mailbox) if code != EMPTY_SQUARE), self.side)
+
+    def in_check(self) -> bool:
+        """Check if the king of the side to move is attacked."""
+        king = self.pieces[self.side][KING]
+        return bool(king) and self.is_square_attacked(king.bit_length() - 1, self.side ^ 1)
+
+    def has_insufficient_material(self) -> bool:
+        """Check if neither side can checkmate: bare kings, a single minor piece, or only bishops all on one colour of square."""
+        white, black = self.pieces
+        if white[PAWN] | black[PAWN] | white[ROOK] | black[ROOK] | white[QUEEN] | black[QUEEN]:
+            return False
+        knights = white[KNIGHT] | black[KNIGHT]
+        bishops = white[BISHOP] | black[BISHOP]
+        if popcount(knights | bishops) <= 1:
+            return True
+        return not knights and (not bishops & DARK_SQUARES or not bishops & ~DARK_SQUARES)
+
+    def _generate_legal_moves(self) -> None:
+        cached_moves = self.legal_move_cache.get(self.zobrist_hash)
+        if cached_moves is not None:
+            self.legal_moves = cached_moves
+            return
+        self.legal_moves = self._pin_aware_legal_moves(self._get_pseudo_legal_moves())
+        self.legal_move_cache.put(self.zobrist_hash, self.legal_moves)
+
+    def _is_legal_after_move(self, move: BitMove) -> bool:
+        """Check that a move doesn't leave the mover's king attacked by making and undoing it."""
+        self._make_move(move)
+        # After making the move it's the opponent's turn, so check the mover's king
+        king = self.pieces[self.side ^ 1][KING]
+        legal = not king or not self.is_square_attacked(king.bit_length() - 1, self.side)
+        self.undo_move()
+        return legal
+
+    def _brute_force_legal_moves(self, moves: list[BitMove]) -> list[BitMove]:
+        """Filter pseudo-legal moves down to the legal moves by making each one and checking if it leaves the king attacked."""
+        return [move for move in moves if self._is_legal_after_move(move)]
+
+    def _pin_aware_legal_moves(self, moves: list[BitMove]) -> list[BitMove]:
+        """Filter pseudo-legal moves down to the legal moves, using the checkers and pinned pieces of the position."""
+        us = self.side
+        them = us ^ 1
+        king = self.pieces[us][KING]
+        if not king:
+            return list(moves)
+        king_square = king.bit_length() - 1
+        check_mask, pins = self._get_checks_and_pins(king_square)
+        # The king doesn't block attacks along the ray it is stepping away from
+        king_occupied = self.occupied ^ king
+
+        legal_moves: list[BitMove] = []
+        for move in moves:
+            from_ = move & FROM_MASK
+            to = (move >> TO_SHIFT) & FROM_MASK
+            flags = move >> FLAGS_SHIFT
+            if from_ == king_square:
+                # castling is only generated when the king isn't attacked on its way
+                if flags & CASTLING_FLAG or not self.is_square_attacked(to, them, king_occupied):
+                    legal_moves.append(move)
+                continue
+            if flags & EN_PASSANT_FLAG:
+                # Removes two pieces from the board, so can uncover an attack along the rank
+                if self._is_legal_after_move(move):
+                    legal_moves.append(move)
+                continue
+            to_bit = 1 << to
+            if not to_bit & check_mask:
+                continue
+            pin = pins.get(from_)
+            if pin is not None and not to_bit & pin:
+                continue
+            legal_moves.append(move)
+        return legal_moves
+
+    def staged_moves(self, hash_key: Optional[int] = None, killers: Sequence[int] = (), history: Optional[list[int]] = None,
+                     quiets: bool = True) -> Iterator[BitMove]:
+        """Yield the legal moves in the stages of Board.staged_moves: the hash move, captures and promotions by MVV-LVA,
+        killer moves, then quiet moves by their history bonus.
+
+        The bitboard generates all its legal moves in one pass, so the stages only order them. Without quiets, only the
+        hash move, captures and promotions are yielded.
+        """
+        self._generate_legal_moves()
+        hash_move = None
+        captures = []
+        # [Move key] quiet move
+        quiet_moves = {}
+        for move in self.legal_moves:
+            key = move & MOVE_KEY_MASK
+            if key == hash_key:
+                hash_move = move
+            elif self.move_pieces(move)[1] != -1 or key >> PROMOTION_SHIFT:
+                captures.append(move)
+            elif quiets:
+                quiet_moves[key] = move
+        if hash_move is not None:
+            yield hash_move
+        captures.sort(key=lambda move: -mvv_lva_score(*self.move_pieces(move), move >> PROMOTION_SHIFT & 0x7))
+        yield from captures
+        for killer in killers:
+            killer_move = quiet_moves.pop(killer, None)
+            if killer_move is not None:
+                yield killer_move
+        ordered_quiet_moves = list(quiet_moves.values())
+        if history is not None:
+            ordered_quiet_moves.sort(key=lambda move: history[move & 0xFFF], reverse=True)
+        yield from ordered_quiet_moves
+
+    def _get_pseudo_legal_moves(self) -> list[BitMove]:
+        moves: list[BitMove] = []
+        us = self.side
+        own_pieces = self.pieces[us]
+        own = self.occupancy[us]
+        enemy = self.occupancy[us ^ 1]
+        occupied = self.occupied
+        empty = ~occupied & FULL_BOARD
+
+        # Pawn steps, double steps and promotions
+        pawns = own_pieces[PAWN]
+        if us == WHITE:
+            single_steps = (pawns << 8) & empty
+            double_steps = ((single_steps & RANK_3) << 8) & empty
+            forward = 8
+        else:
+            single_steps = (pawns >> 8) & empty
+            double_steps = ((single_steps & RANK_6) >> 8) & empty
+            forward = -8
+        for to in iter_bits(single_steps & ~PROMOTION_RANKS):
+            moves.append(pack_move(to - forward, to))
+        for to in iter_bits(single_steps & PROMOTION_RANKS):
+            for promotion in PROMOTION_PIECE_TYPES:
+                moves.append(pack_move(to - forward, to, promotion))
+        for to in iter_bits(double_steps):
+            moves.append(pack_move(to - 2 * forward, to, 0, DOUBLE_STEP_FLAG))
+
+        # Pawn captures, including en-passant
+        en_passant_bit = 1 << self.en_passant if self.en_passant != EMPTY_SQUARE else 0
+        pawn_attacks = PAWN_ATTACKS[us]
+        for from_ in iter_bits(pawns):
+            attacks = pawn_attacks[from_]
+            for to in iter_bits(attacks & enemy):
+                if (1 << to) & PROMOTION_RANKS:
+                    for promotion in PROMOTION_PIECE_TYPES:
+                        moves.append(pack_move(from_, to, promotion))
+                else:
+                    moves.append(pack_move(from_, to))
+            if attacks & en_passant_bit:
+                moves.append(pack_move(from_, self.en_passant, 0, EN_PASSANT_FLAG))
+
+        # Piece moves
+        not_own = ~own & FULL_BOARD
+        for from_ in iter_bits(own_pieces[KNIGHT]):
+            for to in iter_bits(KNIGHT_ATTACKS[from_] & not_own):
+                moves.append(pack_move(from_, to))
+        for from_ in iter_bits(own_pieces[BISHOP] | own_pieces[QUEEN]):
+            for to in iter_bits(bishop_attacks(from_, occupied) & not_own):
+                moves.append(pack_move(from_, to))
+        for from_ in iter_bits(own_pieces[ROOK] | own_pieces[QUEEN]):
+            for to in iter_bits(rook_attacks(from_, occupied) & not_own):
+                moves.append(pack_move(from_, to))
+        for from_ in iter_bits(own_pieces[KING]):
+            for to in iter_bits(KING_ATTACKS[from_] & not_own):
+                moves.append(pack_move(from_, to))
+
+        # Castling, which is only generated when the king isn't attacked on its way
+        if self.castling_rights:
+            for side in COLOUR_CASTLING_SIDES[us]:
+                if (self.castling_rights & side.right and (own_pieces[KING] >> side.king_from) & 1
+                        and (own_pieces[ROOK] >> side.rook_from) & 1 and not occupied & side.empty_mask
+                        and not any(self.is_square_attacked(square, us ^ 1) for square in side.safe_squares)):
+                    moves.append(pack_move(side.king_from, side.king_to, 0, CASTLING_FLAG))
+        return moves
+
+    def get_en_passant_capture_square(self) -> BoardSquare:
+        """Get the square which contains the captured piece in an en-passant move, determined from which colours' turn it is."""
+        assert self.en_passant != EMPTY_SQUARE, "Function should only be called when there is an en-passant square"
+        capture_square = self.en_passant - 8 if self.side == WHITE else self.en_passant + 8
+        rank, file = divmod(capture_square, 8)
+        return self.state[rank][file]
+
+    def get_en_passant_captured_piece(self) -> Optional[Piece]:
+        """Get the piece to be captured in an en-passant move, determined from which colours' turn it is."""
+        return self.get_en_passant_capture_square().piece
@@ -1,22 +1,75 @@
-import copy
+from collections.abc import Iterator
+from collections.abc import Sequence
 from typing import Optional
 
 from constants import UNICODE_WHITE_SPACE
+from core.attacks import BISHOP_RAYS
+from core.attacks import KING_ATTACKS
+from core.attacks import KNIGHT_ATTACKS
+from core.attacks import pawn_attacker_squares
+from core.attacks import ROOK_RAYS
+from core.castling import CASTLING_RIGHTS_MASKS
+from core.castling import CASTLING_SIDE_BY_KING_TO
+from core.castling import COLOUR_CASTLING_SIDES
+from core.castling import read_castling_rights
+from core.castling import write_castling_rights
+from core.evaluation import compute_score
+from core.evaluation import move_score_change
+from core.evaluation import mvv_lva_score
+from core.move import CastlingMove
 from core.move import EnPassantMove
 from core.move import Move
+from core.move import MOVE_KEY_MASK
+from core.move import PROMOTION_SHIFT
 from core.move import PromotionMove
+from core.move_index import LegalMoveIndex
 from core.piece import CHESS_PIECES
 from core.piece import ColourType
+from core.piece import get_piece
 from core.piece import Piece
+from core.piece import piece_code
 from core.piece import PieceType
+from core.potential_move import MOVE_RAYS
+from core.potential_move import PAWN_CAPTURES
+from core.potential_move import PAWN_DOUBLE_STEPS
+from core.potential_move import PAWN_PUSHES
 from core.potential_move import PawnCapturePotentialMove
 from core.potential_move import PawnStepPotentialMove
 from core.potential_move import POTENTIAL_MOVES
 from core.potential_move import PotentialMove
 from core.square import BoardSquare
+from core.square import Square
+from core.tablebase import TablebaseResult
+from core.tablebase import Tablebases
+from core.transposition import LegalMoveCache
+from core.undo import BoardUndoRecord
+from core.undo import UndoStack
+from core.zobrist import castling_key
+from core.zobrist import compute_zobrist_hash
+from core.zobrist import ZOBRIST_BLACK_TO_MOVE
+from core.zobrist import ZOBRIST_EN_PASSANT_KEYS
 from util import is_en_passant
 from util import is_pawn_promotion
 from util import read_chess_notation
+from util import write_chess_notation
+
+
+# The number of positions whose legal moves are cached by each board
+LEGAL_MOVE_CACHE_SIZE = 4096
+# ['1'...'8': 1...8]
+EMPTY_SQUARE_COUNTS: dict[str, int] = {str(i): i for i in range(1, 9)}
+# A set of (rank, file) pairs
+SquareSet = set[tuple[int, int]]
+PROMOTION_PIECE_TYPES: list[PieceType] = [PieceType.QUEEN, PieceType.ROOK, PieceType.BISHOP, PieceType.KNIGHT]
+# Stands in for the piece on a square treated as filled, attacking nothing
+FILLED_SQUARE_PIECE = object()
+
+
+def _capture_order_key(move: Move) -> int:
+    """Sort key putting captures and promotions in MVV-LVA order."""
+    captured_piece = move.captured_piece
+    return -mvv_lva_score(move.moved_piece.piece_type.value, captured_piece.piece_type.value if captured_piece is not None else -1,
+                          move.packed >> PROMOTION_SHIFT & 0x7)
 
 
 def get_blank_board() -> list[list[BoardSquare]]:
@@ -27,17 +80,56 @@ def get_blank_board() -> list[list[BoardSquare]]:
 def get_board_state(board_state_fen: str) -> list[list[BoardSquare]]:
     """Get an 8x8 chess board set-up according to the given board state FEN."""
     board = get_blank_board()
-    ranks = board_state_fen.split("/")
-    for rank, pieces in enumerate(ranks):
+    set_board_state(board, board_state_fen)
+    return board
+
+
+def set_board_state(board_state: list[list[BoardSquare]], board_state_fen: str) -> None:
+    """Set-up the squares of an existing 8x8 chess board according to the given board state FEN, with the shared pieces."""
+    # FEN lists the ranks from the 8th down to the 1st
+    for squares, pieces in zip(reversed(board_state), board_state_fen.split("/")):
         file = 0
         for char in pieces:
-            if char in [str(i) for i in range(1, 9)]:
-                file += int(char)
-            else:
-                piece = copy.deepcopy(CHESS_PIECES[char])
-                board[rank][file] = BoardSquare(rank, file, piece)
+            empty_squares = EMPTY_SQUARE_COUNTS.get(char)
+            if empty_squares is None:
+                squares[file].piece = CHESS_PIECES[char]
                 file += 1
-    return board
+            else:
+                for square in squares[file:file + empty_squares]:
+                    square.piece = None
+                file += empty_squares
+
+
+def get_board_state_fen(board_state: list[list[BoardSquare]]) -> str:
+    """Get the board state FEN of an 8x8 chess board."""
+    ranks = []
+    for squares in reversed(board_state):
+        rank_fen = ""
+        empty_squares = 0
+        for square in squares:
+            if square.piece is None:
+                empty_squares += 1
+                continue
+            if empty_squares:
+                rank_fen += str(empty_squares)
+                empty_squares = 0
+            rank_fen += square.piece.fen
+        if empty_squares:
+            rank_fen += str(empty_squares)
+        ranks.append(rank_fen)
+    return "/".join(ranks)
+
+
+def board_state_str(board_state: list[list[BoardSquare]]) -> str:
+    """Get a printable string of an 8x8 chess board, with the 8th rank first."""
+    board_str = ""
+    for rank in reversed(board_state):
+        for square in rank:
+            board_str += "|" + (str(square.piece)
+                                if square.piece is not None else
+                                UNICODE_WHITE_SPACE)
+        board_str += "|\n"
+    return board_str
 
 
 def is_off_board(rank: int, file: int) -> bool:
@@ -77,101 +169,289 @@ def en_passant_square_rank(colour: ColourType) -> int:
 class Board:
     # [Rank][File]
     state: list[list[BoardSquare]]
-    valid_moves: list[Move] = []
-    legal_moves: list[Move] = []
-    en_passant_square: Optional[BoardSquare] = None
-    castling_rights = "KQkq"
-    turn: ColourType = ColourType.WHITE
-    move_log: list[Move] = []
-
-    def __init__(self, fen: list[str]):
-        fen.reverse()
-        board_state_fen = fen.pop()
-        self.state = get_board_state(board_state_fen)
-
-        turn_fen = fen.pop()
+    valid_moves: list[Move]
+    legal_moves: list[Move]
+    en_passant_square: Optional[BoardSquare]
+    # Mask of the castling rights bits
+    castling_rights: int
+    turn: ColourType
+    # Halfmoves since the last capture or pawn move
+    halfmove_clock: int
+    undo_stack: UndoStack[BoardUndoRecord]
+    zobrist_hash: int
+    # Material and piece-square score, positive when white is better
+    score: int
+    # Check the incrementally updated hash and score against a full recomputation after every move
+    verify_hash: bool = False
+    verify_score: bool = False
+    legal_move_cache: LegalMoveCache[Move]
+    # The legal moves of the last position they were looked up in, indexed by move key
+    _legal_move_index: Optional[LegalMoveIndex[Move]]
+    # [Colour] square of each king, kept up to date as moves are made and undone
+    king_squares: list[Optional[BoardSquare]]
+    # Valid moves generated by staged move picking, and the legal moves it yielded
+    moves_generated: int
+    moves_consumed: int
+
+    def __init__(self, fen: list[str], legal_move_cache_size: int = LEGAL_MOVE_CACHE_SIZE):
+        # Cached moves refer to this board's squares, so the cache can't be shared between boards
+        self.legal_move_cache = LegalMoveCache(legal_move_cache_size)
+        self._legal_move_index = None
+        self.undo_stack = UndoStack(BoardUndoRecord)
+        self.moves_generated = 0
+        self.moves_consumed = 0
+        self.state = get_blank_board()
+        self.set_fen(fen)
+
+    def set_fen(self, fen: list[str]) -> None:
+        """Set-up the board from the board state, turn, castling, en-passant and optional halfmove clock fields of a FEN, reusing its squares."""
+        board_state_fen, turn_fen, castling_fen, en_passant_fen = fen[:4]
+        self.halfmove_clock = int(fen[4]) if len(fen) > 4 else 0
+        set_board_state(self.state, board_state_fen)
         self.turn = ColourType.WHITE if turn_fen == "w" else ColourType.BLACK
 
-        # TODO: handle castling
-        self.castling_rights = fen.pop()
+        self.castling_rights = read_castling_rights(castling_fen)
 
-        en_passant_fen = fen.pop()
         if en_passant_fen != "-":
             ep_position = read_chess_notation(en_passant_fen)
             self.en_passant_square = self.state[ep_position.rank][ep_position.file]
+        else:
+            self.en_passant_square = None
+
+        self.undo_stack.clear()
+        self.valid_moves = []
+        self.legal_moves = []
+        self.king_squares = self._find_king_squares()
+        self.zobrist_hash = self.compute_hash()
+        self.score = compute_score(self.state)
+
+    def fen(self) -> str:
+        """Get the board state, turn, castling and en-passant fields of the FEN of the position."""
+        turn_fen = "w" if self.turn == ColourType.WHITE else "b"
+        en_passant_fen = write_chess_notation(self.en_passant_square) if self.en_passant_square is not None else "-"
+        return f"{get_board_state_fen(self.state)} {turn_fen} {write_castling_rights(self.castling_rights)} {en_passant_fen}"
 
     def __repr__(self) -> str:
-        board_str = ""
-        for rank in reversed(self.state):
-            for square in rank:
-                board_str += "|" + (str(square.piece)
-                                    if square.piece is not None else
-                                    UNICODE_WHITE_SPACE)
-            board_str += "|\n"
-        return board_str
-
-    def try_move(self, move: Move) -> bool:
-        if self._move_is_legal(move):
-            self._make_move(move)
-            self.valid_moves = []
-            self.legal_moves = []
-            return True
-        else:
-            print("Illegal Move")
-            # TODO: fix bug where can get stuck after inputing weird moves/ undoing moves
-            # Regenerate legal moves as a temp fix
-            self.legal_moves = []
-            return False
-
-    def _move_is_legal(self, move: Move) -> bool:
-        if self.legal_moves == []:
+        return board_state_str(self.state)
+
+    def legal_move_index(self) -> LegalMoveIndex[Move]:
+        """Get the legal moves of the position indexed by move key and from-square, building the index on first use in the position."""
+        index = self._legal_move_index
+        if index is None or index.zobrist_hash != self.zobrist_hash:
             self._generate_legal_moves()
-            # TODO: check for checkmate/stalemate
-        return (move in self.legal_moves)
+            index = LegalMoveIndex(self.zobrist_hash, self.legal_moves, [move.packed & MOVE_KEY_MASK for move in self.legal_moves])
+            self._legal_move_index = index
+        return index
+
+    def move_key(self, move: Move) -> int:
+        """Get the key of a move, from | to << 6 | promotion << 12."""
+        return move.packed & MOVE_KEY_MASK
+
+    def move_pieces(self, move: Move) -> tuple[int, int]:
+        """Get the PieceType values of the moving and captured pieces of a move, with -1 for no capture."""
+        captured = move.captured_piece
+        return move.moved_piece.piece_type.value, captured.piece_type.value if captured is not None else -1
 
     def _make_move(self, move: Move) -> None:
-        move.make()
+        record = self.undo_stack.push()
+        record.move = move
+        record.captured_piece = move.captured_piece
+        record.en_passant_square = self.en_passant_square
+        record.castling_rights = self.castling_rights
+        record.halfmove_clock = self.halfmove_clock
+        record.zobrist_hash = self.zobrist_hash
+        record.score = self.score
+
+        if move.captured_piece is not None or move.moved_piece.piece_type == PieceType.PAWN:
+            self.halfmove_clock = 0
+        else:
+            self.halfmove_clock += 1
+        self.score += move_score_change(move)
+        zobrist_hash = move.make(self.zobrist_hash)
         # Update en-passant square
+        if self.en_passant_square is not None:
+            zobrist_hash ^= ZOBRIST_EN_PASSANT_KEYS[self.en_passant_square.file]
         if is_pawn_double_step(move.moved_piece.piece_type, move.to_.rank, move.from_.rank):
             en_passant_rank = en_passant_square_rank(move.moved_piece.colour_type)
             self.en_passant_square = self.state[en_passant_rank][move.to_.file]
+            zobrist_hash ^= ZOBRIST_EN_PASSANT_KEYS[move.to_.file]
         else:
             self.en_passant_square = None
+        # Moving a king or rook, or capturing a rook, loses its castling rights
+        castling_rights = self.castling_rights
+        if castling_rights:
+            castling_rights &= CASTLING_RIGHTS_MASKS[move.from_.rank * 8 + move.from_.file] & CASTLING_RIGHTS_MASKS[move.to_.rank * 8 + move.to_.file]
+            if castling_rights != self.castling_rights:
+                zobrist_hash ^= castling_key(self.castling_rights) ^ castling_key(castling_rights)
+                self.castling_rights = castling_rights
+        if move.moved_piece.piece_type == PieceType.KING:
+            self.king_squares[move.moved_piece.colour_type.value] = move.to_
         # Mark move as made and update the turn
-        self.move_log.append(move)
+        self.legal_moves = []
         self.turn = ColourType.WHITE if self.turn == ColourType.BLACK else ColourType.BLACK
+        self.zobrist_hash = zobrist_hash ^ ZOBRIST_BLACK_TO_MOVE
+        if self.verify_hash:
+            self._verify_hash()
+        if self.verify_score:
+            self._verify_score()
 
     def undo_move(self) -> None:
         try:
-            move = self.move_log.pop()
-        except IndexError as idx_err:
+            record = self.undo_stack.pop()
+        except IndexError:
             print("No moves to undo!")
-        else:
-            move.undo()
-            # Revert the en-passant square
-            self.en_passant_square = move.previous_en_passant_square
-            # Update the turn
-            self.turn = ColourType.WHITE if self.turn == ColourType.BLACK else ColourType.BLACK
+            return
+        move = record.move
+        move.undo()
+        if move.moved_piece.piece_type == PieceType.KING:
+            self.king_squares[move.moved_piece.colour_type.value] = move.from_
+        # Restore the irreversible state and update the turn
+        self.en_passant_square = record.en_passant_square
+        self.castling_rights = record.castling_rights
+        self.halfmove_clock = record.halfmove_clock
+        self.zobrist_hash = record.zobrist_hash
+        self.score = record.score
+        self.legal_moves = []
+        self.turn = ColourType.WHITE if self.turn == ColourType.BLACK else ColourType.BLACK
+        if self.verify_hash:
+            self._verify_hash()
+        if self.verify_score:
+            self._verify_score()
+
+    def compute_hash(self) -> int:
+        """Compute the Zobrist hash of the position from scratch."""
+        return compute_zobrist_hash(self.state, self.turn, self.castling_rights, self.en_passant_square)
+
+    def _verify_hash(self) -> None:
+        assert self.zobrist_hash == self.compute_hash(), "Incremental Zobrist hash differs from the recomputed hash"
+
+    def evaluate(self) -> int:
+        """Get the material and piece-square score of the position from the side to move's perspective."""
+        return self.score if self.turn == ColourType.WHITE else -self.score
+
+    def _verify_score(self) -> None:
+        assert self.score == compute_score(self.state), "Incremental score differs from the recomputed score"
 
     def _generate_legal_moves(self) -> None:
+        cached_moves = self.legal_move_cache.get(self.zobrist_hash)
+        if cached_moves is not None:
+            self.legal_moves = cached_moves
+            return
         self.valid_moves = self._get_valid_moves()
-        # TODO: Generate legal moves more efficiently
-        self.legal_moves = self._brute_force_legal_moves()
+        self.legal_moves = self._pin_aware_legal_moves()
+        self.legal_move_cache.put(self.zobrist_hash, self.legal_moves)
 
-    def _get_valid_moves(self) -> list[Move]:
+    def _get_valid_moves(self, captures: bool = True, quiets: bool = True) -> list[Move]:
+        """Get the valid moves of the side to move, optionally only the captures and promotions or only the quiet moves."""
         valid_moves = []
         for rank in self.state:
             for square in rank:
                 if square.piece is not None and square.piece.colour_type == self.turn:
-                    valid_moves += self._get_valid_moves_for_square(square)
+                    valid_moves += self._get_valid_moves_for_square(square, captures, quiets)
         return valid_moves
 
-    def _get_valid_moves_for_square(self, square: BoardSquare) -> list[Move]:
-        assert square.piece is not None
+    def _get_valid_moves_for_square(self, square: BoardSquare, captures: bool = True, quiets: bool = True) -> list[Move]:
+        """Get the valid moves of the piece on a square by walking its precomputed targets.
+
+        Captures includes promotions and quiets includes castling.
+        """
+        piece = square.piece
+        assert piece is not None
+        if piece.piece_type == PieceType.PAWN:
+            return self._get_valid_pawn_moves(square, captures, quiets)
+        state = self.state
         valid_moves: list[Move] = []
-        for potential_move in POTENTIAL_MOVES[square.piece.piece_type.value]:
-            # check pawn for en-passant and capture
-            valid_moves += self._check_move(square, potential_move)
+        for ray in MOVE_RAYS[piece.piece_type.value][piece.colour_type.value][square.rank * 8 + square.file]:
+            for to_rank, to_file in ray:
+                to_square = state[to_rank][to_file]
+                captured_piece = to_square.piece
+                if captured_piece is not None:
+                    # moves must not make a capture of the same colour
+                    if captures and captured_piece.colour_type != piece.colour_type:
+                        valid_moves.append(Move(square, to_square))
+                    break
+                if quiets:
+                    valid_moves.append(Move(square, to_square))
+        if quiets and piece.piece_type == PieceType.KING and self.castling_rights:
+            valid_moves += self._get_castling_moves(square)
+        return valid_moves
+
+    def _get_castling_moves(self, square: BoardSquare) -> list[Move]:
+        """Get the castling moves of the king on a square which has the right to castle and nothing in the way.
+
+        Whether the king is attacked on its way is left to the legal move filter.
+        """
+        king = square.piece
+        assert king is not None
+        state = self.state
+        index = square.rank * 8 + square.file
+        rook = get_piece(PieceType.ROOK, king.colour_type)
+        castling_moves: list[Move] = []
+        for side in COLOUR_CASTLING_SIDES[king.colour_type.value]:
+            if not self.castling_rights & side.right or index != side.king_from:
+                continue
+            rook_from = state[side.rook_from // 8][side.rook_from % 8]
+            if rook_from.piece is not rook:
+                continue
+            if any(state[empty // 8][empty % 8].piece is not None for empty in side.empty_squares):
+                continue
+            castling_moves.append(CastlingMove(square, state[side.king_to // 8][side.king_to % 8],
+                                               rook_from, state[side.rook_to // 8][side.rook_to % 8]))
+        return castling_moves
+
+    def _castling_is_legal(self, move: CastlingMove, opponent: ColourType) -> bool:
+        """Check that the king isn't attacked on the square it castles from, passes through or lands on."""
+        side = CASTLING_SIDE_BY_KING_TO[move.to_.rank * 8 + move.to_.file]
+        return not any(self._is_square_attacked(Square(*divmod(square, 8)), opponent) for square in side.safe_squares)
+
+    def _get_valid_pawn_moves(self, square: BoardSquare, captures: bool = True, quiets: bool = True) -> list[Move]:
+        """Get the valid pushes, double steps, captures and en-passant captures of the pawn on a square.
+
+        Captures includes pushes which promote.
+        """
+        piece = square.piece
+        assert piece is not None
+        colour = piece.colour_type.value
+        index = square.rank * 8 + square.file
+        state = self.state
+        en_passant_square = self.en_passant_square
+        to_squares: list[BoardSquare] = []
+        push = PAWN_PUSHES[colour][index]
+        if push is not None and state[push[0]][push[1]].piece is None:
+            if is_pawn_promotion(push[0], piece):
+                if captures:
+                    to_squares.append(state[push[0]][push[1]])
+            elif quiets:
+                to_squares.append(state[push[0]][push[1]])
+                double_step = PAWN_DOUBLE_STEPS[colour][index]
+                if double_step is not None and state[double_step[0]][double_step[1]].piece is None:
+                    to_squares.append(state[double_step[0]][double_step[1]])
+        valid_moves: list[Move] = []
+        if captures:
+            for to_rank, to_file in PAWN_CAPTURES[colour][index]:
+                to_square = state[to_rank][to_file]
+                if to_square is en_passant_square:
+                    valid_moves.append(EnPassantMove(square, to_square, self.get_en_passant_capture_square()))
+                elif to_square.piece is not None and to_square.piece.colour_type != piece.colour_type:
+                    to_squares.append(to_square)
+        for to_square in to_squares:
+            if is_pawn_promotion(to_square.rank, piece):
+                for piece_type in PROMOTION_PIECE_TYPES:
+                    valid_moves.append(PromotionMove(square, to_square, piece_type))
+            else:
+                valid_moves.append(Move(square, to_square))
+        return valid_moves
+
+    def _get_iterated_valid_moves(self) -> list[Move]:
+        """Get the valid moves by driving the potential move iterators, the reference for the precomputed tables."""
+        valid_moves = []
+        for rank in self.state:
+            for square in rank:
+                if square.piece is not None and square.piece.colour_type == self.turn:
+                    for potential_move in POTENTIAL_MOVES[square.piece.piece_type.value]:
+                        valid_moves += self._check_move(square, potential_move)
+                    if square.piece.piece_type == PieceType.KING and self.castling_rights:
+                        valid_moves += self._get_castling_moves(square)
         return valid_moves
 
     def _check_move(self, from_square: BoardSquare, potential_move: PotentialMove) -> list[Move]:
@@ -183,7 +463,6 @@ class Board:
             to_rank, to_file = (from_square.rank + i * rank_change,
                                 from_square.file + i * file_change)
             if is_off_board(to_rank, to_file):
-                # TODO: use this to check if castling is legal
                 break
             to_square = self.state[to_rank][to_file]
             if is_en_passant(from_square.piece.piece_type, to_square, self.en_passant_square):
@@ -211,17 +490,13 @@ class Board:
                 for piece_type in PieceType:
                     if piece_type == PieceType.KING or piece_type == PieceType.PAWN:
                         continue
-                    move = PromotionMove(
-                        from_square, to_square,
-                        self.en_passant_square, piece_type)
+                    move = PromotionMove(from_square, to_square, piece_type)
                     valid_moves.append(move)
             elif is_en_passant(from_square.piece.piece_type, to_square, self.en_passant_square):
-                move = EnPassantMove(
-                    from_square, to_square, self.en_passant_square,
-                    self.get_en_passant_capture_square())
+                move = EnPassantMove(from_square, to_square, self.get_en_passant_capture_square())
                 valid_moves.append(move)
             else:
-                move = Move(from_square, to_square, self.en_passant_square)
+                move = Move(from_square, to_square)
                 valid_moves.append(move)
 
             # break after appending the move if a capture occurs
@@ -231,21 +506,274 @@ class Board:
         return valid_moves
 
     def _brute_force_legal_moves(self) -> list[Move]:
+        """Filter the valid moves down to the legal moves by making each one and checking if it leaves the king attacked."""
         legal_moves = []
+        colour = self.turn
+        opponent = ColourType.WHITE if colour == ColourType.BLACK else ColourType.BLACK
         for move in self.valid_moves:
+            if isinstance(move, CastlingMove) and not self._castling_is_legal(move, opponent):
+                continue
             self._make_move(move)
-            next_moves = self._get_valid_moves()
-            legal = True
-            for next_move in next_moves:
-                if next_move.captured_piece is None or next_move.captured_piece.piece_type != PieceType.KING:
-                    continue
-                legal = False
-                break
-            if legal:
+            king_square = self.get_king_square(colour)
+            if king_square is None or not self.is_square_attacked(king_square, opponent):
                 legal_moves.append(move)
             self.undo_move()
         return legal_moves
 
+    def _pin_aware_legal_moves(self) -> list[Move]:
+        """Filter the valid moves down to the legal moves, using the checkers and pinned pieces of the position."""
+        king_square = self.get_king_square(self.turn)
+        if king_square is None:
+            return list(self.valid_moves)
+        check_squares, pins = self._get_checks_and_pins(king_square)
+        return self._filter_legal_moves(self.valid_moves, king_square, check_squares, pins)
+
+    def _filter_legal_moves(self, moves: list[Move], king_square: Optional[BoardSquare], check_squares: Optional[SquareSet],
+                            pins: dict[tuple[int, int], SquareSet]) -> list[Move]:
+        """Filter valid moves down to the legal moves, given the checkers and pinned pieces of the side to move's king."""
+        if king_square is None:
+            return list(moves)
+        opponent = ColourType.WHITE if self.turn == ColourType.BLACK else ColourType.BLACK
+        # The king doesn't block attacks along the ray it is stepping away from
+        king_empty_squares = {(king_square.rank, king_square.file)}
+
+        legal_moves: list[Move] = []
+        for move in moves:
+            to_ = move.to_
+            if isinstance(move, CastlingMove):
+                if self._castling_is_legal(move, opponent):
+                    legal_moves.append(move)
+                continue
+            if move.moved_piece.piece_type == PieceType.KING:
+                if not self._is_square_attacked(to_, opponent, king_empty_squares):
+                    legal_moves.append(move)
+                continue
+            if isinstance(move, EnPassantMove):
+                # Removes two pieces from the board, so can uncover an attack along the rank
+                if not self._is_square_attacked(king_square, opponent,
+                                                {(move.from_.rank, move.from_.file), (move.capture_square.rank, move.capture_square.file)},
+                                                {(to_.rank, to_.file)}):
+                    legal_moves.append(move)
+                continue
+            if check_squares is not None and (to_.rank, to_.file) not in check_squares:
+                continue
+            pin = pins.get((move.from_.rank, move.from_.file))
+            if pin is not None and (to_.rank, to_.file) not in pin:
+                continue
+            legal_moves.append(move)
+        return legal_moves
+
+    def staged_moves(self, hash_key: Optional[int] = None, killers: Sequence[int] = (), history: Optional[list[int]] = None,
+                     quiets: bool = True) -> Iterator[Move]:
+        """Yield the legal moves in stages: the hash move, captures and promotions by MVV-LVA, killer moves, then quiet moves.
+
+        Moves are identified by their packed keys (from | to << 6 | promotion << 12), and quiet moves are ordered by their
+        history bonus, indexed by from | to << 6. Each stage is generated only once the previous one is used up, so a
+        caller which stops early, e.g. on a beta cut-off, skips the later stages. Without quiets, only the hash move,
+        captures and promotions are yielded. The position must be restored before the next move is taken.
+        """
+        state = self.state
+        king_square = self.get_king_square(self.turn)
+        check_squares, pins = self._get_checks_and_pins(king_square) if king_square is not None else (None, {})
+        yielded_keys: list[int] = []
+
+        if hash_key is not None:
+            from_ = hash_key & 0x3F
+            square = state[from_ // 8][from_ % 8]
+            if square.piece is not None and square.piece.colour_type == self.turn:
+                valid_moves = self._get_valid_moves_for_square(square)
+                self.moves_generated += len(valid_moves)
+                for move in self._filter_legal_moves([move for move in valid_moves if move.packed & MOVE_KEY_MASK == hash_key],
+                                                     king_square, check_squares, pins):
+                    yielded_keys.append(hash_key)
+                    self.moves_consumed += 1
+                    yield move
+
+        captures = self._get_valid_moves(quiets=False)
+        self.moves_generated += len(captures)
+        captures = self._filter_legal_moves(captures, king_square, check_squares, pins)
+        captures.sort(key=_capture_order_key)
+        for move in captures:
+            if move.packed & MOVE_KEY_MASK != hash_key:
+                self.moves_consumed += 1
+                yield move
+        if not quiets:
+            return
+
+        for killer in killers:
+            if killer == hash_key:
+                continue
+            from_ = killer & 0x3F
+            square = state[from_ // 8][from_ % 8]
+            if square.piece is None or square.piece.colour_type != self.turn:
+                continue
+            valid_moves = self._get_valid_moves_for_square(square, captures=False)
+            self.moves_generated += len(valid_moves)
+            for move in self._filter_legal_moves([move for move in valid_moves if move.packed & MOVE_KEY_MASK == killer],
+                                                 king_square, check_squares, pins):
+                yielded_keys.append(killer)
+                self.moves_consumed += 1
+                yield move
+
+        quiet_moves = self._get_valid_moves(captures=False)
+        self.moves_generated += len(quiet_moves)
+        quiet_moves = self._filter_legal_moves(quiet_moves, king_square, check_squares, pins)
+        if history is not None:
+            quiet_moves.sort(key=lambda move: history[move.packed & 0xFFF], reverse=True)
+        for move in quiet_moves:
+            if move.packed & MOVE_KEY_MASK not in yielded_keys:
+                self.moves_consumed += 1
+                yield move
+
+    def reset_move_counters(self) -> None:
+        """Reset the counts of moves generated and consumed by staged move picking."""
+        self.moves_generated = 0
+        self.moves_consumed = 0
+
+    def in_check(self) -> bool:
+        """Check if the king of the side to move is attacked."""
+        king_square = self.get_king_square(self.turn)
+        opponent = ColourType.WHITE if self.turn == ColourType.BLACK else ColourType.BLACK
+        return king_square is not None and self.is_square_attacked(king_square, opponent)
+
+    def get_king_square(self, colour: ColourType) -> Optional[BoardSquare]:
+        """Get the square of the king of the given colour, if it is on the board."""
+        return self.king_squares[colour.value]
+
+    def _find_king_squares(self) -> list[Optional[BoardSquare]]:
+        """Search the board for the square of each colour's king, indexed by colour."""
+        king_squares: list[Optional[BoardSquare]] = [None, None]
+        for rank in self.state:
+            for square in rank:
+                if square.piece is not None and square.piece.piece_type == PieceType.KING:
+                    king_squares[square.piece.colour_type.value] = square
+        return king_squares
+
+    def has_insufficient_material(self) -> bool:
+        """Check if neither side can checkmate: bare kings, a single minor piece, or only bishops all on one colour of square."""
+        minor_pieces: list[tuple[PieceType, int]] = []
+        for rank in self.state:
+            for square in rank:
+                piece = square.piece
+                if piece is None or piece.piece_type == PieceType.KING:
+                    continue
+                if piece.piece_type in (PieceType.QUEEN, PieceType.ROOK, PieceType.PAWN):
+                    return False
+                minor_pieces.append((piece.piece_type, (square.rank + square.file) % 2))
+        if len(minor_pieces) <= 1:
+            return True
+        return all(piece_type == PieceType.BISHOP for piece_type, _ in minor_pieces) and len({colour for _, colour in minor_pieces}) == 1
+
+    def probe_tablebase(self, tablebases: Tablebases) -> Optional[TablebaseResult]:
+        """Look up the result of the position with perfect play, or None if there's no table for its material or castling is possible."""
+        if self.castling_rights:
+            return None
+        pieces = [(square.rank * 8 + square.file, piece_code(square.piece)) for rank in self.state for square in rank if square.piece is not None]
+        return tablebases.probe(pieces, self.turn.value)
+
+    def is_square_attacked(self, square: Square, colour: ColourType) -> bool:
+        """Check if a square is attacked by any piece of the given colour."""
+        return self._is_square_attacked(square, colour)
+
+    def get_attackers(self, square: Square, colour: ColourType) -> list[BoardSquare]:
+        """Get the squares of the pieces of the given colour which attack a square."""
+        return self._get_attackers(square, colour)
+
+    def _get_checks_and_pins(self, king_square: BoardSquare) -> tuple[Optional[SquareSet], dict[tuple[int, int], SquareSet]]:
+        """Get the squares a non-king move must land on to resolve check, and the rays each pinned piece is confined to.
+
+        The check squares are None when the king is not in check, and empty in double check.
+        """
+        assert king_square.piece is not None
+        colour = king_square.piece.colour_type
+        opponent = ColourType.WHITE if colour == ColourType.BLACK else ColourType.BLACK
+        state = self.state
+        index = king_square.rank * 8 + king_square.file
+        check_squares: Optional[SquareSet] = None
+        pins: dict[tuple[int, int], SquareSet] = {}
+
+        def add_checker(squares: SquareSet) -> None:
+            nonlocal check_squares
+            check_squares = squares if check_squares is None else set()
+
+        # Sliding pieces, walking outwards from the king along each ray
+        queen = get_piece(PieceType.QUEEN, opponent)
+        for rays, slider in ((ROOK_RAYS[index], get_piece(PieceType.ROOK, opponent)),
+                             (BISHOP_RAYS[index], get_piece(PieceType.BISHOP, opponent))):
+            for ray in rays:
+                pinned_square: Optional[tuple[int, int]] = None
+                for i, (rank, file) in enumerate(ray):
+                    piece = state[rank][file].piece
+                    if piece is None:
+                        continue
+                    if piece.colour_type == colour:
+                        if pinned_square is not None:
+                            break
+                        pinned_square = (rank, file)
+                        continue
+                    if piece is queen or piece is slider:
+                        if pinned_square is None:
+                            add_checker(set(ray[:i + 1]))
+                        else:
+                            pins[pinned_square] = set(ray[:i + 1])
+                    break
+
+        # Knights and pawns, which can only be captured to resolve check
+        for attacker_squares, attacker in ((KNIGHT_ATTACKS[index], get_piece(PieceType.KNIGHT, opponent)),
+                                           (pawn_attacker_squares(index, opponent), get_piece(PieceType.PAWN, opponent))):
+            for rank, file in attacker_squares:
+                if state[rank][file].piece is attacker:
+                    add_checker({(rank, file)})
+        return check_squares, pins
+
+    def _is_square_attacked(self, square: Square, colour: ColourType, empty_squares: Optional[SquareSet] = None, filled_squares: Optional[SquareSet] = None) -> bool:
+        """Check if a square is attacked by any piece of the given colour.
+
+        The board is treated as if the empty squares had no piece and the filled squares had a non-attacking piece.
+        """
+        return bool(self._get_attackers(square, colour, empty_squares, filled_squares, first_only=True))
+
+    def _get_attackers(self, square: Square, colour: ColourType, empty_squares: Optional[SquareSet] = None,
+                       filled_squares: Optional[SquareSet] = None, first_only: bool = False) -> list[BoardSquare]:
+        """Get the squares of the pieces of the given colour which attack a square, looked up from the attack tables.
+
+        The board is treated as if the empty squares had no piece and the filled squares had a non-attacking piece.
+        Stops at the first attacker found if first only is set.
+        """
+        state = self.state
+        index = square.rank * 8 + square.file
+        attackers: list[BoardSquare] = []
+
+        def piece_at(rank: int, file: int) -> Optional[object]:
+            if empty_squares and (rank, file) in empty_squares:
+                return None
+            if filled_squares and (rank, file) in filled_squares:
+                return FILLED_SQUARE_PIECE
+            return state[rank][file].piece
+
+        queen = get_piece(PieceType.QUEEN, colour)
+        for attacker_squares, attacker in ((KNIGHT_ATTACKS[index], get_piece(PieceType.KNIGHT, colour)),
+                                           (pawn_attacker_squares(index, colour), get_piece(PieceType.PAWN, colour)),
+                                           (KING_ATTACKS[index], get_piece(PieceType.KING, colour))):
+            for rank, file in attacker_squares:
+                if piece_at(rank, file) is attacker:
+                    attackers.append(state[rank][file])
+                    if first_only:
+                        return attackers
+        for rays, slider in ((ROOK_RAYS[index], get_piece(PieceType.ROOK, colour)),
+                             (BISHOP_RAYS[index], get_piece(PieceType.BISHOP, colour))):
+            for ray in rays:
+                for rank, file in ray:
+                    piece = piece_at(rank, file)
+                    if piece is None:
+                        continue
+                    if piece is queen or piece is slider:
+                        attackers.append(state[rank][file])
+                        if first_only:
+                            return attackers
+                    break
+        return attackers
+
     def get_en_passant_capture_square(self) -> BoardSquare:
         """Get the square which contains the captured piece in an en-passant move, determined from which colours' turn it is."""
         assert self.en_passant_square is not None, "Function should only be called when there is an en-passant square"
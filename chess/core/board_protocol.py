@@ -0,0 +1,67 @@
+from collections.abc import Iterator
+from collections.abc import Sequence
+from typing import Any
+from typing import Optional
+from typing import Protocol
+from typing import TypeVar
+from typing import Union
+
+from core.move import Move
+from core.move_index import LegalMoveIndex
+from core.piece import ColourType
+from core.square import BoardSquare
+from core.tablebase import TablebaseResult
+from core.tablebase import Tablebases
+from core.undo import UndoStack
+
+# The move type of a board backend: Move for the object board, a packed int for the bitboard
+MoveT = TypeVar("MoveT", bound=Union[Move, int])
+
+
+class ChessBoard(Protocol[MoveT]):
+    """The position interface shared by the board backends, typed by the backend's move type."""
+    legal_moves: list[MoveT]
+    # Mask of the castling rights bits
+    castling_rights: int
+    # Halfmoves since the last capture or pawn move
+    halfmove_clock: int
+    zobrist_hash: int
+
+    @property
+    def turn(self) -> ColourType: ...
+
+    @property
+    def state(self) -> list[list[BoardSquare]]: ...
+
+    @property
+    def en_passant_square(self) -> Optional[BoardSquare]: ...
+
+    @property
+    def undo_stack(self) -> UndoStack[Any]: ...
+
+    def set_fen(self, fen: list[str]) -> None: ...
+
+    def fen(self) -> str: ...
+
+    def legal_move_index(self) -> LegalMoveIndex[MoveT]: ...
+
+    def _generate_legal_moves(self) -> None: ...
+
+    def _make_move(self, move: MoveT) -> None: ...
+
+    def undo_move(self) -> None: ...
+
+    def move_key(self, move: MoveT) -> int: ...
+
+    def move_pieces(self, move: MoveT) -> tuple[int, int]: ...
+
+    def staged_moves(self, hash_key: Optional[int] = None, killers: Sequence[int] = (), history: Optional[list[int]] = None,
+                     quiets: bool = True) -> Iterator[MoveT]: ...
+
+    def evaluate(self) -> int: ...
+
+    def in_check(self) -> bool: ...
+
+    def has_insufficient_material(self) -> bool: ...
+
+    def probe_tablebase(self, tablebases: Tablebases) -> Optional[TablebaseResult]: ...
@@ -0,0 +1,76 @@
+# Castling rights bits
+WHITE_KINGSIDE = 1
+WHITE_QUEENSIDE = 2
+BLACK_KINGSIDE = 4
+BLACK_QUEENSIDE = 8
+NO_CASTLING = 0
+ALL_CASTLING = WHITE_KINGSIDE | WHITE_QUEENSIDE | BLACK_KINGSIDE | BLACK_QUEENSIDE
+
+# [FEN character] castling right, in the order FEN lists them
+CASTLING_FEN: dict[str, int] = {"K": WHITE_KINGSIDE,
+                                "Q": WHITE_QUEENSIDE,
+                                "k": BLACK_KINGSIDE,
+                                "q": BLACK_QUEENSIDE}
+
+
+class CastlingSide:
+    """The squares involved in castling with one of the castling rights, as square indices (rank * 8 + file)."""
+    right: int
+    king_from: int
+    king_to: int
+    rook_from: int
+    rook_to: int
+    # Squares between the king and rook, which must be empty
+    empty_squares: list[int]
+    empty_mask: int
+    # Squares the king starts on, passes through and lands on, which must not be attacked
+    safe_squares: list[int]
+
+    def __init__(self, right: int, rank: int, king_to_file: int, rook_from_file: int, rook_to_file: int):
+        self.right = right
+        self.king_from = rank * 8 + 4
+        self.king_to = rank * 8 + king_to_file
+        self.rook_from = rank * 8 + rook_from_file
+        self.rook_to = rank * 8 + rook_to_file
+        self.empty_squares = list(range(min(self.king_from, self.rook_from) + 1, max(self.king_from, self.rook_from)))
+        self.empty_mask = 0
+        for square in self.empty_squares:
+            self.empty_mask |= 1 << square
+        step = 1 if self.king_to > self.king_from else -1
+        self.safe_squares = list(range(self.king_from, self.king_to + step, step))
+
+
+CASTLING_SIDES: list[CastlingSide] = [CastlingSide(WHITE_KINGSIDE, 0, 6, 7, 5),
+                                      CastlingSide(WHITE_QUEENSIDE, 0, 2, 0, 3),
+                                      CastlingSide(BLACK_KINGSIDE, 7, 6, 7, 5),
+                                      CastlingSide(BLACK_QUEENSIDE, 7, 2, 0, 3)]
+# [Colour]
+COLOUR_CASTLING_SIDES: list[list[CastlingSide]] = [CASTLING_SIDES[:2], CASTLING_SIDES[2:]]
+# [King destination square index] castling side
+CASTLING_SIDE_BY_KING_TO: dict[int, CastlingSide] = {side.king_to: side for side in CASTLING_SIDES}
+
+
+def _castling_rights_mask(square: int) -> int:
+    """Get the castling rights kept when a piece moves from or to a square, so moving or capturing a king or rook loses its rights."""
+    mask = ALL_CASTLING
+    for side in CASTLING_SIDES:
+        if square in (side.king_from, side.rook_from):
+            mask &= ~side.right
+    return mask
+
+
+# [Square index] castling rights kept when a piece moves from or to the square
+CASTLING_RIGHTS_MASKS: list[int] = [_castling_rights_mask(square) for square in range(64)]
+
+
+def read_castling_rights(castling_fen: str) -> int:
+    """Convert the castling field of a FEN into a castling rights mask."""
+    rights = NO_CASTLING
+    for char in castling_fen:
+        rights |= CASTLING_FEN.get(char, NO_CASTLING)
+    return rights
+
+
+def write_castling_rights(castling_rights: int) -> str:
+    """Convert a castling rights mask into the castling field of a FEN."""
+    return "".join(char for char, right in CASTLING_FEN.items() if castling_rights & right) or "-"
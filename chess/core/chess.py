@@ -1,56 +1,140 @@
+from enum import Enum
+from typing import Any
 from typing import Optional
 
+from core.bitboard import BitBoard
 from core.board import Board
-from core.move import EnPassantMove
-from core.move import Move
-from core.move import PromotionMove
+from core.board_protocol import ChessBoard
+from core.move import MOVE_KEY_MASK
+from core.move import pack_move
+from core.move import PackedMove
+from core.notation import san_to_move
+from core.notation import uci_to_move
+from core.piece import ColourType
 from core.piece import Piece
 from core.piece import PieceType
 from core.square import BoardSquare
 from core.square import Square
-from util import is_en_passant
+from core.status import game_status
+from core.status import GameStatus
 from util import is_pawn_promotion
 from util import read_chess_notation
 
 
+# A board of either backend, chosen when the game is created
+AnyBoard = ChessBoard[Any]
+
+
+class BoardBackend(Enum):
+    """The position representation backing a game of chess"""
+    OBJECT = 0
+    BITBOARD = 1
+
+
+BOARD_BACKENDS: dict[BoardBackend, type] = {BoardBackend.OBJECT: Board,
+                                            BoardBackend.BITBOARD: BitBoard}
+
+
+def make_board(fen: str, backend: BoardBackend = BoardBackend.OBJECT) -> AnyBoard:
+    """Construct a board of the given backend from a FEN, without the fullmove number a Chess game keeps."""
+    return BOARD_BACKENDS[backend](fen.split()[:5])
+
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+
 class Chess:
     # [Rank][File]
-    board: Board
+    board: AnyBoard
     # State variables
-    fullmove_number: int = 1
-    halfmove_number: int = 0
+    fullmove_number: int
+    # The status of the game, cached for the position of the (Zobrist hash, ply) key
+    _status: GameStatus
+    _status_key: Optional[tuple[int, int]]
 
-    def __init__(self, fen: str = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"):
+    def __init__(self, fen: str = START_FEN, backend: BoardBackend = BoardBackend.OBJECT):
         # TODO: verify fen
         fen_split = fen.split()
         self.fullmove_number = int(fen_split.pop())
-        self.halfmove_number = int(fen_split.pop())
-        self.board = Board(fen_split)
-        print(self.board)
+        self.board = BOARD_BACKENDS[backend](fen_split)
+        self._status_key = None
+
+    def set_fen(self, fen: str) -> None:
+        """Set-up the game from a FEN, reusing the board."""
+        fen_split = fen.split()
+        self.fullmove_number = int(fen_split.pop())
+        self.board.set_fen(fen_split)
+        self._status_key = None
+
+    @property
+    def halfmove_number(self) -> int:
+        """Halfmoves since the last capture or pawn move, kept by the board."""
+        return self.board.halfmove_clock
+
+    def status(self) -> GameStatus:
+        """Get the status of the game, which is computed once per position."""
+        status_key = (self.board.zobrist_hash, len(self.board.undo_stack))
+        if status_key != self._status_key:
+            self._status = game_status(self.board)
+            self._status_key = status_key
+        return self._status
+
+    def is_game_over(self) -> bool:
+        return self.status() != GameStatus.IN_PROGRESS
+
+    def fen(self) -> str:
+        return f"{self.board.fen()} {self.halfmove_number} {self.fullmove_number}"
 
     def undo_move(self) -> None:
-        # TODO: logic involving fullmove and halfmove number
+        # white to move means black made the last move
+        if self.board.undo_stack and self.board.turn == ColourType.WHITE:
+            self.fullmove_number -= 1
         self.board.undo_move()
 
+    def _update_fullmove_number(self) -> None:
+        """Count the move if black made it."""
+        if self.board.turn == ColourType.WHITE:
+            self.fullmove_number += 1
+
+    def move_from_san(self, san: str) -> None:
+        """Make a move given in standard algebraic notation. Raises a ValueError if it isn't a legal move."""
+        move = san_to_move(self.board, san)
+        self.board._make_move(move)
+        self._update_fullmove_number()
+
+    def move_from_uci(self, uci: str) -> None:
+        """Make a move given in long algebraic notation, e.g. e2e4 or e7e8q. Raises a ValueError if it isn't a legal move."""
+        move = uci_to_move(self.board, uci)
+        self.board._make_move(move)
+        self._update_fullmove_number()
+
     def move_from_notation(self, from_position: str, to_position: str) -> None:
         from_square = read_chess_notation(from_position)
         to_square = read_chess_notation(to_position)
         self.move_from_position(from_square, to_square)
 
     def move_from_position(self, from_square: Square, to_square: Square, promotion_piece_type: PieceType = PieceType.QUEEN) -> bool:
-        from_ = self.get_board_square_at(from_square)
-        to_ = self.get_board_square_at(to_square)
-        if from_.piece is None:
+        piece = self.get_piece_at(from_square)
+        if piece is None:
+            return False
+        promotion = promotion_piece_type.value if is_pawn_promotion(to_square.rank, piece) else 0
+        return self._move_from_key(pack_move(from_square.rank * 8 + from_square.file, to_square.rank * 8 + to_square.file, promotion))
+
+    def move_from_packed(self, packed_move: PackedMove) -> bool:
+        return self._move_from_key(packed_move & MOVE_KEY_MASK)
+
+    def _move_from_key(self, key: int) -> bool:
+        """Make the legal move with a move key, from | to << 6 | promotion << 12, returning False if there is none."""
+        move = self.board.legal_move_index().get(key)
+        if move is None:
             return False
-        move: Move
-        if is_pawn_promotion(to_.rank, from_.piece):
-            move = PromotionMove(from_, to_, self.board.en_passant_square, promotion_piece_type)
-        elif is_en_passant(from_.piece.piece_type, to_, self.board.en_passant_square):
-            capture_square = self.board.get_en_passant_capture_square()
-            move = EnPassantMove(from_, to_, self.board.en_passant_square, capture_square)
-        else:
-            move = Move(from_, to_, self.board.en_passant_square)
-        return self.board.try_move(move)
+        self.board._make_move(move)
+        self._update_fullmove_number()
+        return True
+
+    def legal_destinations(self, square: Square) -> list[Square]:
+        """Get the squares the piece on a square can legally move to."""
+        return [Square(*divmod(to, 8)) for to in self.board.legal_move_index().destinations(square.rank * 8 + square.file)]
 
     def get_board_square_at(self, square: Square) -> BoardSquare:
         return self.board.state[square.rank][square.file]
@@ -0,0 +1,129 @@
+from core.move import CastlingMove
+from core.move import EnPassantMove
+from core.move import Move
+from core.move import PromotionMove
+from core.piece import ColourType
+from core.piece import Piece
+from core.square import BoardSquare
+from core.square import Square
+
+# [PieceType] centipawn values
+PIECE_VALUES: list[int] = [0, 900, 500, 330, 320, 100]
+# [PieceType] values of the capturing piece for MVV-LVA ordering, so the king captures last
+ATTACKER_VALUES: list[int] = [2000, 900, 500, 330, 320, 100]
+
+# [PieceType] piece-square tables from white's perspective, listed from a8 to h1 as the board is printed
+# https://www.chessprogramming.org/Simplified_Evaluation_Function
+PIECE_SQUARE_TABLES: list[list[int]] = [
+    # King
+    [-30, -40, -40, -50, -50, -40, -40, -30,
+     -30, -40, -40, -50, -50, -40, -40, -30,
+     -30, -40, -40, -50, -50, -40, -40, -30,
+     -30, -40, -40, -50, -50, -40, -40, -30,
+     -20, -30, -30, -40, -40, -30, -30, -20,
+     -10, -20, -20, -20, -20, -20, -20, -10,
+     20, 20, 0, 0, 0, 0, 20, 20,
+     20, 30, 10, 0, 0, 10, 30, 20],
+    # Queen
+    [-20, -10, -10, -5, -5, -10, -10, -20,
+     -10, 0, 0, 0, 0, 0, 0, -10,
+     -10, 0, 5, 5, 5, 5, 0, -10,
+     -5, 0, 5, 5, 5, 5, 0, -5,
+     0, 0, 5, 5, 5, 5, 0, -5,
+     -10, 5, 5, 5, 5, 5, 0, -10,
+     -10, 0, 5, 0, 0, 0, 0, -10,
+     -20, -10, -10, -5, -5, -10, -10, -20],
+    # Rook
+    [0, 0, 0, 0, 0, 0, 0, 0,
+     5, 10, 10, 10, 10, 10, 10, 5,
+     -5, 0, 0, 0, 0, 0, 0, -5,
+     -5, 0, 0, 0, 0, 0, 0, -5,
+     -5, 0, 0, 0, 0, 0, 0, -5,
+     -5, 0, 0, 0, 0, 0, 0, -5,
+     -5, 0, 0, 0, 0, 0, 0, -5,
+     0, 0, 0, 5, 5, 0, 0, 0],
+    # Bishop
+    [-20, -10, -10, -10, -10, -10, -10, -20,
+     -10, 0, 0, 0, 0, 0, 0, -10,
+     -10, 0, 5, 10, 10, 5, 0, -10,
+     -10, 5, 5, 10, 10, 5, 5, -10,
+     -10, 0, 10, 10, 10, 10, 0, -10,
+     -10, 10, 10, 10, 10, 10, 10, -10,
+     -10, 5, 0, 0, 0, 0, 5, -10,
+     -20, -10, -10, -10, -10, -10, -10, -20],
+    # Knight
+    [-50, -40, -30, -30, -30, -30, -40, -50,
+     -40, -20, 0, 0, 0, 0, -20, -40,
+     -30, 0, 10, 15, 15, 10, 0, -30,
+     -30, 5, 15, 20, 20, 15, 5, -30,
+     -30, 0, 15, 20, 20, 15, 0, -30,
+     -30, 5, 10, 15, 15, 10, 5, -30,
+     -40, -20, 0, 5, 5, 0, -20, -40,
+     -50, -40, -30, -30, -30, -30, -40, -50],
+    # Pawn
+    [0, 0, 0, 0, 0, 0, 0, 0,
+     50, 50, 50, 50, 50, 50, 50, 50,
+     10, 10, 20, 30, 30, 20, 10, 10,
+     5, 5, 10, 25, 25, 10, 5, 5,
+     0, 0, 0, 20, 20, 0, 0, 0,
+     5, -5, -10, 0, 0, -10, -5, 5,
+     5, 10, 10, -20, -20, 10, 10, 5,
+     0, 0, 0, 0, 0, 0, 0, 0],
+]
+
+
+def _piece_square_scores(piece_type: int, colour: ColourType) -> list[int]:
+    """Get the signed material and piece-square score of a piece on each square, indexed rank * 8 + file."""
+    table = PIECE_SQUARE_TABLES[piece_type]
+    sign = 1 if colour == ColourType.WHITE else -1
+    scores = []
+    for square in range(64):
+        rank, file = divmod(square, 8)
+        # the tables list the 8th rank first, and black's are the mirror image of white's
+        row = 7 - rank if colour == ColourType.WHITE else rank
+        scores.append(sign * (PIECE_VALUES[piece_type] + table[row * 8 + file]))
+    return scores
+
+
+# [Piece code][Square] signed score of a piece on a square, positive for white, where the piece code is colour * 6 + piece type
+PIECE_SQUARE_SCORES: list[list[int]] = [_piece_square_scores(piece_type, colour) for colour in ColourType for piece_type in range(6)]
+
+
+def square_score(piece: Piece, square: Square) -> int:
+    """Get the signed material and piece-square score of a piece on a square, positive for white."""
+    return PIECE_SQUARE_SCORES[piece.colour_type.value * 6 + piece.piece_type.value][square.rank * 8 + square.file]
+
+
+def compute_score(state: list[list[BoardSquare]]) -> int:
+    """Compute the material and piece-square score of a board from scratch, positive when white is better."""
+    score = 0
+    for rank in state:
+        for square in rank:
+            if square.piece is not None:
+                score += square_score(square.piece, square)
+    return score
+
+
+def move_score_change(move: Move) -> int:
+    """Get the change in the material and piece-square score of a board when the move is made."""
+    arriving_piece = move.promotion_piece if isinstance(move, PromotionMove) else move.moved_piece
+    change = square_score(arriving_piece, move.to_) - square_score(move.moved_piece, move.from_)
+    if move.captured_piece is not None:
+        capture_square = move.capture_square if isinstance(move, EnPassantMove) else move.to_
+        change -= square_score(move.captured_piece, capture_square)
+    if isinstance(move, CastlingMove):
+        change += square_score(move.rook, move.rook_to) - square_score(move.rook, move.rook_from)
+    return change
+
+
+def mvv_lva_score(attacker: int, victim: int, promotion: int) -> int:
+    """Score a capture or promotion by the most valuable victim, then the least valuable attacker.
+
+    Takes PieceType values, with -1 for no victim and 0 for no promotion.
+    """
+    score = -ATTACKER_VALUES[attacker]
+    if victim != -1:
+        score += 10 * PIECE_VALUES[victim]
+    if promotion:
+        score += PIECE_VALUES[promotion]
+    return score
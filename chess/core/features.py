@@ -0,0 +1,79 @@
+from collections.abc import Iterable
+from collections.abc import Sequence
+from typing import Optional
+
+import numpy as np
+from core.bitboard import BitBoard
+from core.bitboard import FEN_PIECE_CODES
+from core.board import Board
+from core.board import EMPTY_SQUARE_COUNTS
+from core.evaluation import PIECE_SQUARE_SCORES
+
+# One plane per piece code, colour * 6 + piece type
+PLANE_COUNT = 12
+# [Piece code * 64 + square index] signed material and piece-square score, positive for white
+PIECE_SQUARE_WEIGHTS: np.ndarray = np.array(PIECE_SQUARE_SCORES, dtype=np.int32).reshape(PLANE_COUNT * 64)
+
+
+def bitboard_array(boards: Sequence[BitBoard]) -> np.ndarray:
+    """Pack the piece bitboards of boards into an (N, 12) uint64 array of bit-planes, indexed by piece code."""
+    return np.array([board.pieces[0] + board.pieces[1] for board in boards], dtype=np.uint64).reshape(-1, PLANE_COUNT)
+
+
+def fen_bitboard_array(fens: Iterable[str]) -> np.ndarray:
+    """Pack the board state field of FENs into an (N, 12) uint64 array of bit-planes, indexed by piece code."""
+    rows = []
+    for fen in fens:
+        bitboards = [0] * PLANE_COUNT
+        # FEN lists the ranks from the 8th down to the 1st
+        square = 56
+        for pieces in fen.split(" ", 1)[0].split("/"):
+            for char in pieces:
+                empty_squares = EMPTY_SQUARE_COUNTS.get(char)
+                if empty_squares is None:
+                    bitboards[FEN_PIECE_CODES[char]] |= 1 << square
+                    square += 1
+                else:
+                    square += empty_squares
+            square -= 16
+        rows.append(bitboards)
+    return np.array(rows, dtype=np.uint64).reshape(-1, PLANE_COUNT)
+
+
+def unpack_planes(bitboards: np.ndarray) -> np.ndarray:
+    """Unpack an (N, 12) array of bitboards into an (N, 12, 8, 8) uint8 array of 0s and 1s, indexed [board, piece code, rank, file]."""
+    # Little-endian bytes, and bits within them, run from square 0 (a1) to square 63 (h8)
+    square_bytes = np.ascontiguousarray(bitboards, dtype="<u8").view(np.uint8)
+    return np.unpackbits(square_bytes, axis=1, bitorder="little").reshape(-1, PLANE_COUNT, 8, 8)
+
+
+def pack_planes(boards: Sequence[BitBoard]) -> np.ndarray:
+    """Get the (N, 12, 8, 8) uint8 feature planes of boards from their bitboards, without visiting their squares."""
+    return unpack_planes(bitboard_array(boards))
+
+
+def pack_fens(fens: Iterable[str]) -> np.ndarray:
+    """Get the (N, 12, 8, 8) uint8 feature planes of the positions of FENs."""
+    return unpack_planes(fen_bitboard_array(fens))
+
+
+def board_planes(board: Board) -> np.ndarray:
+    """Get the (12, 8, 8) uint8 feature planes of an object board by visiting each square."""
+    planes = np.zeros((PLANE_COUNT, 8, 8), dtype=np.uint8)
+    for rank in board.state:
+        for square in rank:
+            piece = square.piece
+            if piece is not None:
+                planes[piece.colour_type.value * 6 + piece.piece_type.value, square.rank, square.file] = 1
+    return planes
+
+
+def evaluate_batch(planes: np.ndarray, sides: Optional[np.ndarray] = None) -> np.ndarray:
+    """Score a batch of feature planes by material and piece-square tables, matching Board.score.
+
+    Scores are positive when white is better, or from the side to move's perspective when given the sides to move (0 white, 1 black).
+    """
+    scores = planes.reshape(len(planes), PLANE_COUNT * 64).astype(np.int32) @ PIECE_SQUARE_WEIGHTS
+    if sides is not None:
+        scores = np.where(np.asarray(sides) == 0, scores, -scores)
+    return scores
@@ -1,83 +1,225 @@
 from typing import Optional
 
+from core.castling import CASTLING_SIDE_BY_KING_TO
+from core.piece import get_piece
 from core.piece import Piece
 from core.piece import PieceType
 from core.square import BoardSquare
+from core.square import Square
+from core.zobrist import piece_key
+from util import write_chess_notation
+
+# Packed move layout: from (6 bits) | to (6 bits) | promotion PieceType (3 bits) | flags
+FROM_MASK = 0x3F
+TO_SHIFT = 6
+PROMOTION_SHIFT = 12
+FLAGS_SHIFT = 15
+# Masks out the flags, leaving from, to and promotion
+MOVE_KEY_MASK = (1 << FLAGS_SHIFT) - 1
+
+# Packed move flags
+EN_PASSANT_FLAG = 1
+DOUBLE_STEP_FLAG = 2
+CASTLING_FLAG = 4
+
+PROMOTION_NOTATION: dict[int, str] = {PieceType.QUEEN.value: "q",
+                                      PieceType.ROOK.value: "r",
+                                      PieceType.BISHOP.value: "b",
+                                      PieceType.KNIGHT.value: "n"}
+
+
+def pack_move(from_: int, to: int, promotion: int = 0, flags: int = 0) -> int:
+    """Pack a move's square indices (rank * 8 + file), promotion PieceType value and flags into an int.
+
+    A promotion of 0, the KING value, means no promotion.
+    """
+    return from_ | (to << TO_SHIFT) | (promotion << PROMOTION_SHIFT) | (flags << FLAGS_SHIFT)
+
+
+class PackedMove(int):
+    """An immutable move packed into an int, which is hashable and compares as cheaply as an int."""
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        promotion = self.promotion
+        return (write_chess_notation(self.from_square) + write_chess_notation(self.to_square)
+                + (PROMOTION_NOTATION[promotion.value] if promotion is not None else ""))
+
+    @property
+    def from_index(self) -> int:
+        return self & FROM_MASK
+
+    @property
+    def to_index(self) -> int:
+        return (self >> TO_SHIFT) & FROM_MASK
+
+    @property
+    def from_square(self) -> Square:
+        return Square(*divmod(self.from_index, 8))
+
+    @property
+    def to_square(self) -> Square:
+        return Square(*divmod(self.to_index, 8))
+
+    @property
+    def promotion(self) -> Optional[PieceType]:
+        promotion = (self >> PROMOTION_SHIFT) & 7
+        return PieceType(promotion) if promotion else None
+
+    @property
+    def flags(self) -> int:
+        return self >> FLAGS_SHIFT
+
+    @property
+    def key(self) -> "PackedMove":
+        """The move without its flags, identifying it by from, to and promotion."""
+        return PackedMove(self & MOVE_KEY_MASK)
+
+    @classmethod
+    def from_move(cls, move: "Move") -> "PackedMove":
+        return cls(move.packed)
+
+    def to_move(self, state: list[list[BoardSquare]]) -> "Move":
+        """Convert to a Move on the squares of a board's state, in the position the move is to be made from."""
+        from_rank, from_file = divmod(self.from_index, 8)
+        to_rank, to_file = divmod(self.to_index, 8)
+        from_ = state[from_rank][from_file]
+        to_ = state[to_rank][to_file]
+        promotion = self.promotion
+        if promotion is not None:
+            return PromotionMove(from_, to_, promotion)
+        if self.flags & EN_PASSANT_FLAG:
+            return EnPassantMove(from_, to_, state[from_rank][to_file])
+        if self.flags & CASTLING_FLAG:
+            side = CASTLING_SIDE_BY_KING_TO[self.to_index]
+            return CastlingMove(from_, to_, state[from_rank][side.rook_from % 8], state[from_rank][side.rook_to % 8])
+        return Move(from_, to_)
 
 
 class Move:
     """Represents a generic move."""
+    __slots__ = ("from_", "to_", "moved_piece", "captured_piece", "packed")
     from_: BoardSquare
     to_: BoardSquare
     moved_piece: Piece
     captured_piece: Optional[Piece]
-    previous_en_passant_square: Optional[BoardSquare]
+    # The PackedMove layout as a plain int, used for cheap comparison and hashing
+    packed: int
 
-    def __init__(self, from_: BoardSquare, to_: BoardSquare, previous_en_passant_square: Optional[BoardSquare]):
+    def __init__(self, from_: BoardSquare, to_: BoardSquare):
         assert from_.piece is not None, "A piece to move is required."
         self.from_ = from_
         self.to_ = to_
         self.moved_piece = from_.piece
         self.captured_piece = to_.piece
-        self.previous_en_passant_square = previous_en_passant_square
+        double_step = self.moved_piece.piece_type == PieceType.PAWN and abs(from_.rank - to_.rank) == 2
+        self.packed = pack_move(from_.rank * 8 + from_.file, to_.rank * 8 + to_.file,
+                                flags=DOUBLE_STEP_FLAG if double_step else 0)
 
     def __repr__(self) -> str:
         return f"From {str(self.from_)} | To {str(self.to_)}\n"
 
     def __eq__(self, other: object) -> bool:
         if isinstance(other, type(self)):
-            return (self.from_ == other.from_) and (self.to_ == other.to_)
+            return self.packed == other.packed
         return NotImplemented
 
-    def make(self) -> None:
+    def __hash__(self) -> int:
+        return hash(self.packed)
+
+    def make(self, zobrist_hash: int) -> int:
+        """Make the move, returning the Zobrist hash updated for the moved and captured pieces."""
+        zobrist_hash ^= piece_key(self.moved_piece, self.from_) ^ piece_key(self.moved_piece, self.to_)
+        if self.captured_piece is not None:
+            zobrist_hash ^= piece_key(self.captured_piece, self.to_)
         self.to_.piece = self.moved_piece
         self.from_.piece = None
+        return zobrist_hash
 
     def undo(self) -> None:
+        """Undo the move. The board restores its Zobrist hash from the undo record, so it isn't updated here."""
         self.from_.piece = self.moved_piece
         self.to_.piece = self.captured_piece
 
 
 class PromotionMove(Move):
     """Represents a move where a pawn promotes to a given PieceType."""
+    __slots__ = ("promotion_piece",)
     promotion_piece: Piece
 
-    def __init__(self, from_: BoardSquare, to_: BoardSquare, previous_en_passant_square: Optional[BoardSquare], promotion_piece_type: PieceType):
-        super().__init__(from_, to_, previous_en_passant_square)
-        self.promotion_piece = Piece(promotion_piece_type, self.moved_piece.colour_type)
-
-    def __eq__(self, other: object) -> bool:
-        if isinstance(other, type(self)):
-            return (self.from_ == other.from_) and (self.to_ == other.to_) and (self.promotion_piece == other.promotion_piece)
-        return NotImplemented
+    def __init__(self, from_: BoardSquare, to_: BoardSquare, promotion_piece_type: PieceType):
+        super().__init__(from_, to_)
+        self.promotion_piece = get_piece(promotion_piece_type, self.moved_piece.colour_type)
+        self.packed |= promotion_piece_type.value << PROMOTION_SHIFT
 
-    def make(self) -> None:
+    def make(self, zobrist_hash: int) -> int:
+        zobrist_hash ^= piece_key(self.moved_piece, self.from_) ^ piece_key(self.promotion_piece, self.to_)
+        if self.captured_piece is not None:
+            zobrist_hash ^= piece_key(self.captured_piece, self.to_)
         self.to_.piece = self.promotion_piece
         self.from_.piece = None
+        return zobrist_hash
+
+    def undo(self) -> None:
+        self.from_.piece = self.moved_piece
+        self.to_.piece = self.captured_piece
 
 
 class EnPassantMove(Move):
     """Represents a move where a pawn makes an en-passant capture."""
+    __slots__ = ("capture_square",)
     capture_square: BoardSquare
 
-    def __init__(self, from_: BoardSquare, to_: BoardSquare, previous_en_passant_square: Optional[BoardSquare], capture_square: BoardSquare):
-        super().__init__(from_, to_, previous_en_passant_square)
+    def __init__(self, from_: BoardSquare, to_: BoardSquare, capture_square: BoardSquare):
+        super().__init__(from_, to_)
         self.capture_square = capture_square
         self.captured_piece = capture_square.piece
+        self.packed |= EN_PASSANT_FLAG << FLAGS_SHIFT
 
     def __repr__(self) -> str:
         return f"From {str(self.from_)} | To {str(self.to_)} | Captured {str(self.capture_square)}\n"
 
-    def __eq__(self, other: object) -> bool:
-        if isinstance(other, type(self)):
-            return (self.from_ == other.from_) and (self.to_ == other.to_) and (self.capture_square == other.capture_square)
-        return NotImplemented
-
-    def make(self) -> None:
-        super().make()
+    def make(self, zobrist_hash: int) -> int:
+        assert self.captured_piece is not None
+        zobrist_hash ^= piece_key(self.moved_piece, self.from_) ^ piece_key(self.moved_piece, self.to_)
+        zobrist_hash ^= piece_key(self.captured_piece, self.capture_square)
+        self.to_.piece = self.moved_piece
+        self.from_.piece = None
         self.capture_square.piece = None
+        return zobrist_hash
 
     def undo(self) -> None:
         self.from_.piece = self.moved_piece
         self.capture_square.piece = self.captured_piece
         self.to_.piece = None
+
+
+class CastlingMove(Move):
+    """Represents a king's castling move, which also moves the rook."""
+    __slots__ = ("rook_from", "rook_to", "rook")
+    rook_from: BoardSquare
+    rook_to: BoardSquare
+    rook: Piece
+
+    def __init__(self, from_: BoardSquare, to_: BoardSquare, rook_from: BoardSquare, rook_to: BoardSquare):
+        super().__init__(from_, to_)
+        assert rook_from.piece is not None, "A rook to castle with is required."
+        self.rook_from = rook_from
+        self.rook_to = rook_to
+        self.rook = rook_from.piece
+        self.packed |= CASTLING_FLAG << FLAGS_SHIFT
+
+    def __repr__(self) -> str:
+        return f"From {str(self.from_)} | To {str(self.to_)} | Rook From {str(self.rook_from)} | Rook To {str(self.rook_to)}\n"
+
+    def make(self, zobrist_hash: int) -> int:
+        zobrist_hash = super().make(zobrist_hash)
+        zobrist_hash ^= piece_key(self.rook, self.rook_from) ^ piece_key(self.rook, self.rook_to)
+        self.rook_to.piece = self.rook
+        self.rook_from.piece = None
+        return zobrist_hash
+
+    def undo(self) -> None:
+        super().undo()
+        self.rook_from.piece = self.rook
+        self.rook_to.piece = None
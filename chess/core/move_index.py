@@ -0,0 +1,32 @@
+from typing import Generic
+from typing import Optional
+from typing import TypeVar
+
+from core.move import FROM_MASK
+from core.move import TO_SHIFT
+
+T = TypeVar("T")
+
+
+class LegalMoveIndex(Generic[T]):
+    """The legal moves of a position indexed by move key, from | to << 6 | promotion << 12, and grouped by from-square index."""
+    zobrist_hash: int
+    # [Move key] legal move
+    by_key: dict[int, T]
+    # [From-square index] keys of the legal moves from the square
+    keys_by_from_square: dict[int, list[int]]
+
+    def __init__(self, zobrist_hash: int, moves: list[T], keys: list[int]):
+        self.zobrist_hash = zobrist_hash
+        self.by_key = dict(zip(keys, moves))
+        self.keys_by_from_square = {}
+        for key in keys:
+            self.keys_by_from_square.setdefault(key & FROM_MASK, []).append(key)
+
+    def get(self, key: int) -> Optional[T]:
+        """Get the legal move with a move key, or None if there is none."""
+        return self.by_key.get(key)
+
+    def destinations(self, square: int) -> list[int]:
+        """Get the square indices the piece on a square can legally move to, listing each once for promotions."""
+        return list(dict.fromkeys((key >> TO_SHIFT) & FROM_MASK for key in self.keys_by_from_square.get(square, [])))
@@ -0,0 +1,100 @@
+import re
+from typing import Union
+
+from constants import FILE_NOTATION
+from constants import RANK_NOTATION
+from core.bitboard import BitMove
+from core.board_protocol import ChessBoard
+from core.board_protocol import MoveT
+from core.move import CASTLING_FLAG
+from core.move import FLAGS_SHIFT
+from core.move import FROM_MASK
+from core.move import Move
+from core.move import pack_move
+from core.move import PackedMove
+from core.move import PROMOTION_SHIFT
+from core.move import TO_SHIFT
+from core.piece import PieceType
+
+AnyMove = Union[Move, BitMove]
+
+# [SAN piece letter] PieceType value, where a move without a letter is a pawn move
+SAN_PIECE_TYPES: dict[str, int] = {"K": PieceType.KING.value,
+                                   "Q": PieceType.QUEEN.value,
+                                   "R": PieceType.ROOK.value,
+                                   "B": PieceType.BISHOP.value,
+                                   "N": PieceType.KNIGHT.value}
+
+# Piece letter, from file and rank disambiguation, capture, destination, promotion
+SAN_PATTERN = re.compile(r"([KQRBN])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([QRBN]))?")
+UCI_PATTERN = re.compile(r"[a-h][1-8][a-h][1-8][qrbn]?")
+# [SAN castling] file the king castles to
+SAN_CASTLING: dict[str, int] = {"O-O": 6, "O-O-O": 2, "0-0": 6, "0-0-0": 2}
+
+
+def packed_move(move: AnyMove) -> int:
+    """Get the packed int of a move of either board backend, with its flags."""
+    return move.packed if isinstance(move, Move) else move
+
+
+def move_notation(move: AnyMove) -> str:
+    """Get the long algebraic notation of a move of either board backend, e.g. e2e4 or e7e8q."""
+    return repr(PackedMove(packed_move(move)))
+
+
+def uci_to_move(board: ChessBoard[MoveT], uci: str) -> MoveT:
+    """Resolve long algebraic notation, e.g. e2e4 or e7e8q, to the matching legal move of the board.
+
+    Raises a ValueError if the notation is malformed or matches no legal move.
+    """
+    if UCI_PATTERN.fullmatch(uci) is None:
+        raise ValueError(f"Invalid UCI move: {uci}")
+    from_index = RANK_NOTATION[uci[1]] * 8 + FILE_NOTATION[uci[0]]
+    to_index = RANK_NOTATION[uci[3]] * 8 + FILE_NOTATION[uci[2]]
+    promotion = SAN_PIECE_TYPES[uci[4].upper()] if len(uci) == 5 else 0
+    move = board.legal_move_index().get(pack_move(from_index, to_index, promotion))
+    if move is None:
+        raise ValueError(f"Illegal move: {uci}")
+    return move
+
+
+def san_to_move(board: ChessBoard[MoveT], san: str) -> MoveT:
+    """Resolve standard algebraic notation, e.g. Nbd7 or exd8=Q+, to the matching legal move of the board.
+
+    Raises a ValueError if the notation is malformed, ambiguous or matches no legal move.
+    """
+    san = san.rstrip("+#!?")
+    board._generate_legal_moves()
+    castling_file = SAN_CASTLING.get(san)
+    if castling_file is not None:
+        for move in board.legal_moves:
+            packed = packed_move(move)
+            if (packed >> FLAGS_SHIFT) & CASTLING_FLAG and (packed >> TO_SHIFT) & 7 == castling_file:
+                return move
+        raise ValueError(f"Illegal move: {san}")
+    match = SAN_PATTERN.fullmatch(san)
+    if match is None:
+        raise ValueError(f"Invalid SAN: {san}")
+    piece_letter, from_file, from_rank, to_notation, promotion_letter = match.groups()
+    piece_type = SAN_PIECE_TYPES[piece_letter] if piece_letter is not None else PieceType.PAWN.value
+    to_index = RANK_NOTATION[to_notation[1]] * 8 + FILE_NOTATION[to_notation[0]]
+    promotion = SAN_PIECE_TYPES[promotion_letter] if promotion_letter is not None else 0
+
+    matches = []
+    for move in board.legal_moves:
+        packed = packed_move(move)
+        moved_piece_type = board.move_pieces(move)[0]
+        if ((packed >> TO_SHIFT) & FROM_MASK != to_index or moved_piece_type != piece_type
+                or (packed >> PROMOTION_SHIFT) & 0x7 != promotion):
+            continue
+        rank, file = divmod(packed & FROM_MASK, 8)
+        if from_file is not None and FILE_NOTATION[from_file] != file:
+            continue
+        if from_rank is not None and RANK_NOTATION[from_rank] != rank:
+            continue
+        matches.append(move)
+    if not matches:
+        raise ValueError(f"Illegal move: {san}")
+    if len(matches) > 1:
+        raise ValueError(f"Ambiguous move: {san}")
+    return matches[0]
@@ -0,0 +1,87 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from core.board_protocol import ChessBoard
+from core.board_protocol import MoveT
+from core.chess import BoardBackend
+from core.chess import make_board
+from core.move import PackedMove
+from core.notation import move_notation
+from core.notation import packed_move
+from core.perft import perft
+from core.perft import PerftResult
+from core.search import search
+from core.search import SearchInfo
+from core.search import SearchLimits
+
+
+def _perft_task(fen: str, depth: int, backend: BoardBackend) -> int:
+    return perft(make_board(fen, backend), depth)
+
+
+def _search_task(fen: str, limits: SearchLimits, backend: BoardBackend) -> Optional[SearchInfo]:
+    result = search(make_board(fen, backend), limits, report=None)
+    if result is not None:
+        # board moves refer to the worker's squares, so send back packed moves
+        result.pv = [PackedMove(packed_move(move)) for move in result.pv]
+    return result
+
+
+def _split_moves(board: ChessBoard[MoveT], root_move: str, remaining_depth: int, tasks: list[tuple[str, str]]) -> None:
+    """Add a (root move notation, FEN) task for each line of moves from the board's position to the remaining depth."""
+    if remaining_depth == 0:
+        tasks.append((root_move, board.fen()))
+        return
+    board._generate_legal_moves()
+    for move in board.legal_moves:
+        board._make_move(move)
+        _split_moves(board, root_move or move_notation(move), remaining_depth - 1, tasks)
+        board.undo_move()
+
+
+def split_perft(fen: str, depth: int, split_depth: int, backend: BoardBackend = BoardBackend.OBJECT) -> list[tuple[str, str]]:
+    """Split a perft into (root move notation, FEN) tasks, one per line of moves to the split depth.
+
+    Splitting deeper than the first ply gives more, smaller tasks to balance across workers.
+    """
+    assert 0 < split_depth <= depth, "The split depth must be within the perft depth"
+    tasks: list[tuple[str, str]] = []
+    _split_moves(make_board(fen, backend), "", split_depth, tasks)
+    return tasks
+
+
+def parallel_perft(fen: str, depth: int, workers: Optional[int] = None, split_depth: int = 1,
+                   backend: BoardBackend = BoardBackend.OBJECT) -> PerftResult:
+    """Run perft with the subtrees below the split depth spread across a process pool.
+
+    The divide node counts are merged in root move order, so the result doesn't depend on the number of workers.
+    """
+    start = time.perf_counter()
+    tasks = split_perft(fen, depth, split_depth, backend)
+    with ProcessPoolExecutor(workers) as executor:
+        node_counts = executor.map(_perft_task,
+                                   [task_fen for _, task_fen in tasks],
+                                   [depth - split_depth] * len(tasks),
+                                   [backend] * len(tasks))
+        divide: dict[str, int] = {}
+        for (root_move, _), nodes in zip(tasks, node_counts):
+            divide[root_move] = divide.get(root_move, 0) + nodes
+    return PerftResult(sum(divide.values()), time.perf_counter() - start, divide)
+
+
+def batch_perft(fens: list[str], depth: int, workers: Optional[int] = None,
+                backend: BoardBackend = BoardBackend.OBJECT) -> list[int]:
+    """Run perft on many positions across a process pool, returning the node counts in the order of the FENs."""
+    with ProcessPoolExecutor(workers) as executor:
+        return list(executor.map(_perft_task, fens, [depth] * len(fens), [backend] * len(fens)))
+
+
+def batch_search(fens: list[str], limits: SearchLimits, workers: Optional[int] = None,
+                 backend: BoardBackend = BoardBackend.OBJECT) -> list[Optional[SearchInfo]]:
+    """Search many positions across a process pool, returning the results in the order of the FENs.
+
+    The principal variations hold PackedMoves, and a result is None where the side to move has no legal moves.
+    """
+    with ProcessPoolExecutor(workers) as executor:
+        return list(executor.map(_search_task, fens, [limits] * len(fens), [backend] * len(fens)))
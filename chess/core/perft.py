@@ -0,0 +1,109 @@
+import time
+
+from core.board_protocol import ChessBoard
+from core.board_protocol import MoveT
+from core.chess import BoardBackend
+from core.chess import make_board
+from core.notation import move_notation
+
+
+class PerftPosition:
+    """A perft test position with its reference leaf node counts, indexed from depth 1."""
+    name: str
+    fen: str
+    node_counts: list[int]
+
+    def __init__(self, name: str, fen: str, node_counts: list[int]):
+        self.name = name
+        self.fen = fen
+        self.node_counts = node_counts
+
+    def expected_nodes(self, depth: int) -> int:
+        return self.node_counts[depth - 1]
+
+
+class PerftResult:
+    """The leaf node count of a perft run, how long it took and the node count of each root move."""
+    nodes: int
+    elapsed: float
+    divide: dict[str, int]
+
+    def __init__(self, nodes: int, elapsed: float, divide: dict[str, int]):
+        self.nodes = nodes
+        self.elapsed = elapsed
+        self.divide = divide
+
+    def __repr__(self) -> str:
+        return f"Nodes {self.nodes} | Time {self.elapsed:.3f}s | NPS {self.nps:.0f}"
+
+    @property
+    def nps(self) -> float:
+        return self.nodes / self.elapsed if self.elapsed > 0 else 0.0
+
+
+# https://www.chessprogramming.org/Perft_Results
+PERFT_SUITE: list[PerftPosition] = [
+    PerftPosition("Start position", "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+                  [20, 400, 8902, 197281, 4865609, 119060324]),
+    PerftPosition("Kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+                  [48, 2039, 97862, 4085603, 193690690]),
+    PerftPosition("Position 3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+                  [14, 191, 2812, 43238, 674624, 11030083]),
+    PerftPosition("Position 4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+                  [6, 264, 9467, 422333, 15833292]),
+    PerftPosition("Position 4 mirrored", "r2q1rk1/pP1p2pp/Q4n2/bbp1p3/Np6/1B3NBn/pPPP1PPP/R3K2R b KQ - 0 1",
+                  [6, 264, 9467, 422333, 15833292]),
+    PerftPosition("Position 5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+                  [44, 1486, 62379, 2103487, 89941194]),
+    PerftPosition("Position 6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+                  [46, 2079, 89890, 3894594, 164075551]),
+]
+
+
+def perft(board: ChessBoard[MoveT], depth: int) -> int:
+    """Count the leaf nodes of the legal move tree of a board to the given depth."""
+    if depth == 0:
+        return 1
+    board._generate_legal_moves()
+    moves = board.legal_moves
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        board._make_move(move)
+        nodes += perft(board, depth - 1)
+        board.undo_move()
+    return nodes
+
+
+def divide(board: ChessBoard[MoveT], depth: int) -> PerftResult:
+    """Run perft to the given depth, recording the leaf node count below each root move."""
+    assert depth > 0, "Divide requires at least one ply"
+    start = time.perf_counter()
+    board._generate_legal_moves()
+    moves = board.legal_moves
+    node_counts = {}
+    for move in moves:
+        board._make_move(move)
+        node_counts[move_notation(move)] = perft(board, depth - 1)
+        board.undo_move()
+    elapsed = time.perf_counter() - start
+    return PerftResult(sum(node_counts.values()), elapsed, node_counts)
+
+
+def perft_fen(fen: str, depth: int, backend: BoardBackend = BoardBackend.OBJECT) -> PerftResult:
+    """Run a timed perft with per-move divide output on the position of a FEN."""
+    return divide(make_board(fen, backend), depth)
+
+
+def run_suite(max_depth: int, backend: BoardBackend = BoardBackend.OBJECT) -> list[tuple[PerftPosition, int, PerftResult]]:
+    """Run perft on each suite position up to the given depth, printing the node counts against the reference counts."""
+    results = []
+    for position in PERFT_SUITE:
+        for depth in range(1, min(max_depth, len(position.node_counts)) + 1):
+            result = perft_fen(position.fen, depth, backend)
+            expected = position.expected_nodes(depth)
+            status = "PASS" if result.nodes == expected else "FAIL"
+            print(f"{status} {position.name:<20} depth {depth} | Expected {expected} | {result}")
+            results.append((position, depth, result))
+    return results
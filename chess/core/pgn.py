@@ -0,0 +1,133 @@
+import mmap
+import re
+from collections.abc import Iterable
+from collections.abc import Iterator
+from typing import Optional
+
+from core.chess import BoardBackend
+from core.chess import Chess
+from core.chess import START_FEN
+
+# [Name "Value"]
+TAG_PATTERN = re.compile(r'\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+# Comments, variations and NAGs are tokens of their own so they can be skipped
+MOVETEXT_TOKEN_PATTERN = re.compile(r"[{};()]|\$\d+|[^\s{};()]+")
+MOVE_NUMBER_PATTERN = re.compile(r"\d+\.+")
+GAME_RESULTS = ("1-0", "0-1", "1/2-1/2", "*")
+
+
+class PgnError(ValueError):
+    """Raised when a game of a PGN can't be replayed."""
+    pass
+
+
+class PgnGame:
+    """The tags, SAN moves and result of a game read from a PGN."""
+    tags: dict[str, str]
+    moves: list[str]
+    result: Optional[str]
+
+    def __init__(self, tags: dict[str, str], moves: list[str], result: Optional[str]):
+        self.tags = tags
+        self.moves = moves
+        self.result = result
+
+    def __repr__(self) -> str:
+        return f"{self.tags.get('White', '?')} - {self.tags.get('Black', '?')} {self.result or '*'} ({len(self.moves)} plies)"
+
+    @property
+    def fen(self) -> str:
+        """The FEN of the game's starting position."""
+        return self.tags.get("FEN", START_FEN)
+
+
+def parse_games(lines: Iterable[str]) -> Iterator[PgnGame]:
+    """Parse PGN games one at a time from lines of text, skipping comments, variations and NAGs."""
+    tags: dict[str, str] = {}
+    moves: list[str] = []
+    in_comment = False
+    variation_depth = 0
+    for line in lines:
+        if in_comment:
+            end = line.find("}")
+            if end == -1:
+                continue
+            line = line[end + 1:]
+            in_comment = False
+        stripped = line.strip()
+        if not stripped or stripped.startswith("%"):
+            continue
+        if stripped.startswith("[") and variation_depth == 0:
+            if moves:
+                # a new game started without the last one ending in a result
+                yield PgnGame(tags, moves, None)
+                tags, moves = {}, []
+            tag = TAG_PATTERN.match(stripped)
+            if tag is not None:
+                tags[tag.group(1)] = tag.group(2).replace('\\"', '"').replace("\\\\", "\\")
+            continue
+        for token in MOVETEXT_TOKEN_PATTERN.findall(stripped):
+            if in_comment:
+                in_comment = token != "}"
+            elif token == "{":
+                in_comment = True
+            elif token == ";":
+                break
+            elif token == "(":
+                variation_depth += 1
+            elif token == ")":
+                variation_depth -= 1
+            elif variation_depth > 0 or token.startswith("$"):
+                continue
+            elif token in GAME_RESULTS:
+                yield PgnGame(tags, moves, token)
+                tags, moves = {}, []
+            else:
+                # move numbers may be written on their move, e.g. 1.e4 or 12...Nf6
+                san = MOVE_NUMBER_PATTERN.sub("", token)
+                if san:
+                    moves.append(san)
+    if tags or moves:
+        yield PgnGame(tags, moves, None)
+
+
+def read_games(path: str) -> Iterator[PgnGame]:
+    """Stream the games of a PGN file through a memory map, without reading the whole file into memory."""
+    with open(path, "rb") as pgn_file:
+        try:
+            pgn_map = mmap.mmap(pgn_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # an empty file can't be mapped
+            return
+        with pgn_map:
+            lines = (line.decode("utf-8", errors="replace") for line in iter(pgn_map.readline, b""))
+            yield from parse_games(lines)
+
+
+def replay_game(game: PgnGame, chess: Optional[Chess] = None, backend: BoardBackend = BoardBackend.OBJECT) -> Iterator[Chess]:
+    """Replay a game, yielding the game at its starting position and after each move.
+
+    The same Chess is yielded each time, and is reused from the given one when possible. Raises a PgnError if a move is illegal.
+    """
+    if chess is None:
+        chess = Chess(game.fen, backend)
+    else:
+        chess.set_fen(game.fen)
+    yield chess
+    for ply, san in enumerate(game.moves):
+        try:
+            chess.move_from_san(san)
+        except ValueError as error:
+            raise PgnError(f"{game}: ply {ply + 1}: {error}") from error
+        yield chess
+
+
+def iter_fens(path: str, backend: BoardBackend = BoardBackend.OBJECT) -> Iterator[str]:
+    """Stream the FEN of every position of every game of a PGN file, skipping the rest of a game after an illegal move."""
+    chess: Optional[Chess] = None
+    for game in read_games(path):
+        try:
+            for chess in replay_game(game, chess, backend):
+                yield chess.fen()
+        except PgnError:
+            continue
@@ -1,6 +1,7 @@
 from enum import Enum
 
 from constants import piece_str
+from constants import PIECE_STRS
 from constants import UNICODE_PIECE_SYMBOLS
 
 
@@ -21,13 +22,23 @@ class PieceType(Enum):
 
 
 class Piece:
-    """Represents a chess piece of a given type and colour"""
+    """Represents an immutable chess piece of a given type and colour. Use the shared PIECES rather than constructing new ones."""
+    __slots__ = ("piece_type", "colour_type", "fen")
     piece_type: PieceType
     colour_type: ColourType
+    fen: piece_str
 
     def __init__(self, piece_type: PieceType, colour_type: ColourType):
-        self.piece_type = piece_type
-        self.colour_type = colour_type
+        object.__setattr__(self, "piece_type", piece_type)
+        object.__setattr__(self, "colour_type", colour_type)
+        object.__setattr__(self, "fen", PIECE_STRS[piece_type.value][colour_type.value])
+
+    def __setattr__(self, name: str, value: object) -> None:
+        raise AttributeError("Pieces are immutable")
+
+    def __reduce__(self) -> tuple[object, tuple[PieceType, ColourType]]:
+        # pickling and copying go through get_piece, which returns the shared piece rather than setting attributes
+        return get_piece, (self.piece_type, self.colour_type)
 
     def __repr__(self) -> str:
         return UNICODE_PIECE_SYMBOLS[self.piece_type.value][self.colour_type.value]
@@ -37,11 +48,22 @@ class Piece:
             return (self.piece_type == other.piece_type) and (self.colour_type == other.colour_type)
         return NotImplemented
 
+    def __hash__(self) -> int:
+        return hash((self.piece_type, self.colour_type))
+
+
+def piece_code(piece: Piece) -> int:
+    """Get the 0...11 code of a piece, with the white pieces first."""
+    return piece.colour_type.value * 6 + piece.piece_type.value
+
+
+# [Piece code] the shared flyweight pieces
+PIECES: list[Piece] = [Piece(piece_type, colour_type) for colour_type in ColourType for piece_type in PieceType]
+
+
+def get_piece(piece_type: PieceType, colour_type: ColourType) -> Piece:
+    """Get the shared piece of a given type and colour."""
+    return PIECES[colour_type.value * 6 + piece_type.value]
 
-CHESS_PIECES: dict[piece_str, Piece] = {"k": Piece(PieceType.KING, ColourType.WHITE), "q": Piece(PieceType.QUEEN, ColourType.WHITE),
-                                        "r": Piece(PieceType.ROOK, ColourType.WHITE), "b": Piece(PieceType.BISHOP, ColourType.WHITE),
-                                        "n": Piece(PieceType.KNIGHT, ColourType.WHITE), "p": Piece(PieceType.PAWN, ColourType.WHITE),
 
-                                        "K": Piece(PieceType.KING, ColourType.BLACK), "Q": Piece(PieceType.QUEEN, ColourType.BLACK),
-                                        "R": Piece(PieceType.ROOK, ColourType.BLACK), "B": Piece(PieceType.BISHOP, ColourType.BLACK),
-                                        "N": Piece(PieceType.KNIGHT, ColourType.BLACK), "P": Piece(PieceType.PAWN, ColourType.BLACK)}
+CHESS_PIECES: dict[piece_str, Piece] = {piece.fen: piece for piece in PIECES}
@@ -0,0 +1,166 @@
+import mmap
+import os
+import random
+import struct
+from typing import Any
+from typing import Optional
+
+from core.board import EMPTY_SQUARE_COUNTS
+from core.board_protocol import ChessBoard
+from core.move import pack_move
+from core.move import PackedMove
+from core.piece import PieceType
+from core.polyglot_random import POLYGLOT_RANDOM_64
+from util import read_chess_notation
+
+# Big-endian key, move, weight and learn fields of a book entry
+ENTRY_STRUCT = struct.Struct(">QHHI")
+KEY_STRUCT = struct.Struct(">Q")
+# [FEN character] Polyglot piece kind, black pawn 0, white pawn 1, black knight 2 ... white king 11
+POLYGLOT_PIECE_KINDS: dict[str, int] = {char: 2 * kind + char.isupper() for kind, chars in enumerate(["pP", "nN", "bB", "rR", "qQ", "kK"]) for char in chars}
+# [FEN castling character] offset of its key
+POLYGLOT_CASTLING_OFFSETS: dict[str, int] = {"K": 768, "Q": 769, "k": 770, "q": 771}
+POLYGLOT_EN_PASSANT_OFFSET = 772
+POLYGLOT_TURN_OFFSET = 780
+# [Polyglot promotion] PieceType value, where 0 means no promotion
+POLYGLOT_PROMOTIONS: list[int] = [0, PieceType.KNIGHT.value, PieceType.BISHOP.value, PieceType.ROOK.value, PieceType.QUEEN.value]
+# [(King from, rook square)] square the king castles to, as Polyglot writes castling as the king capturing its rook
+POLYGLOT_CASTLING_MOVES: dict[tuple[int, int], int] = {(4, 7): 6, (4, 0): 2, (60, 63): 62, (60, 56): 58}
+
+
+class BookEntry:
+    """A move of an opening book in a position, with its weight among the position's moves."""
+    move: PackedMove
+    weight: int
+    learn: int
+
+    def __init__(self, move: PackedMove, weight: int, learn: int):
+        self.move = move
+        self.weight = weight
+        self.learn = learn
+
+    def __repr__(self) -> str:
+        return f"{self.move!r} weight {self.weight}"
+
+
+def read_fen_pieces(board_state_fen: str) -> dict[int, str]:
+    """Get the FEN characters of the pieces of a FEN board state by square index (rank * 8 + file)."""
+    pieces = {}
+    # FEN lists the ranks from the 8th down to the 1st
+    square = 56
+    for rank_pieces in board_state_fen.split("/"):
+        for char in rank_pieces:
+            empty_squares = EMPTY_SQUARE_COUNTS.get(char)
+            if empty_squares is None:
+                pieces[square] = char
+                square += 1
+            else:
+                square += empty_squares
+        square -= 16
+    return pieces
+
+
+def polyglot_key(fen: str) -> int:
+    """Compute the Polyglot key of the position of a FEN.
+
+    The en-passant file only counts when a pawn of the side to move stands beside the pawn which double-stepped.
+    """
+    board_state_fen, turn_fen, castling_fen, en_passant_fen = fen.split()[:4]
+    pieces = read_fen_pieces(board_state_fen)
+    key = 0
+    for square, char in pieces.items():
+        key ^= POLYGLOT_RANDOM_64[64 * POLYGLOT_PIECE_KINDS[char] + square]
+    for char in castling_fen:
+        if char in POLYGLOT_CASTLING_OFFSETS:
+            key ^= POLYGLOT_RANDOM_64[POLYGLOT_CASTLING_OFFSETS[char]]
+    if en_passant_fen != "-":
+        en_passant = read_chess_notation(en_passant_fen)
+        pawn_rank, capturing_pawn = (4, "P") if turn_fen == "w" else (3, "p")
+        if any(pieces.get(pawn_rank * 8 + file) == capturing_pawn for file in (en_passant.file - 1, en_passant.file + 1) if 0 <= file < 8):
+            key ^= POLYGLOT_RANDOM_64[POLYGLOT_EN_PASSANT_OFFSET + en_passant.file]
+    if turn_fen == "w":
+        key ^= POLYGLOT_RANDOM_64[POLYGLOT_TURN_OFFSET]
+    return key
+
+
+def decode_move(polyglot_move: int, pieces: dict[int, str]) -> PackedMove:
+    """Convert a Polyglot move to a PackedMove, given the pieces of the position it is played in."""
+    to = polyglot_move & 0x3F
+    from_ = (polyglot_move >> 6) & 0x3F
+    promotion = POLYGLOT_PROMOTIONS[(polyglot_move >> 12) & 0x7]
+    if pieces.get(from_) in ("K", "k") and (from_, to) in POLYGLOT_CASTLING_MOVES:
+        to = POLYGLOT_CASTLING_MOVES[(from_, to)]
+    return PackedMove(pack_move(from_, to, promotion))
+
+
+class PolyglotBook:
+    """A Polyglot .bin opening book, memory-mapped so it opens instantly and is only paged in where it's searched.
+
+    Entries are sorted by key, so the entries of a position are found by binary search.
+    """
+    path: str
+    entry_count: int
+    _mmap: Optional[mmap.mmap]
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as file:
+            # an empty file can't be mapped
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(file.fileno()).st_size else None
+        self.entry_count = len(self._mmap) // ENTRY_STRUCT.size if self._mmap is not None else 0
+
+    def __len__(self) -> int:
+        return self.entry_count
+
+    def __enter__(self) -> "PolyglotBook":
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def _key_at(self, index: int) -> int:
+        assert self._mmap is not None
+        return KEY_STRUCT.unpack_from(self._mmap, index * ENTRY_STRUCT.size)[0]
+
+    def raw_entries(self, key: int) -> list[tuple[int, int, int]]:
+        """Get the (Polyglot move, weight, learn) fields of the entries of a Polyglot key."""
+        if self._mmap is None:
+            return []
+        low, high = 0, self.entry_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        entries = []
+        for index in range(low, self.entry_count):
+            entry_key, move, weight, learn = ENTRY_STRUCT.unpack_from(self._mmap, index * ENTRY_STRUCT.size)
+            if entry_key != key:
+                break
+            entries.append((move, weight, learn))
+        return entries
+
+    def entries(self, board: ChessBoard[Any]) -> list[BookEntry]:
+        """Get the book's legal moves in a board's position, which a Chess game can make with move_from_packed."""
+        fen = board.fen()
+        pieces = read_fen_pieces(fen.split()[0])
+        legal_move_index = board.legal_move_index()
+        entries = []
+        for move, weight, learn in self.raw_entries(polyglot_key(fen)):
+            packed_move = decode_move(move, pieces)
+            if legal_move_index.get(packed_move) is not None:
+                entries.append(BookEntry(packed_move, weight, learn))
+        return entries
+
+    def choose(self, board: ChessBoard[Any], rng: Optional[random.Random] = None) -> Optional[PackedMove]:
+        """Choose a book move in a board's position at random in proportion to the weights, or None if it's out of book."""
+        entries = [entry for entry in self.entries(board) if entry.weight > 0]
+        if not entries:
+            return None
+        return (rng if rng is not None else random).choices([entry.move for entry in entries], [entry.weight for entry in entries])[0]
@@ -1,6 +1,7 @@
 from collections.abc import Iterator
 from itertools import permutations
 from itertools import product
+from typing import Optional
 
 from core.piece import ColourType
 
@@ -98,3 +99,50 @@ POTENTIAL_MOVES = [sliding_moves[0],  # K
                    sliding_moves[3],  # B
                    knight_moves,      # N
                    pawn_moves]        # P
+
+RankFile = tuple[int, int]
+
+
+def _move_rays(potential_moves: list[PotentialMove], colour: ColourType, square: int) -> list[list[RankFile]]:
+    """Walk each potential move from a square until it leaves the board, skipping any which can't move at all."""
+    rank, file = divmod(square, 8)
+    rays = []
+    for potential_move in potential_moves:
+        rank_change, file_change = potential_move.get_rank_file_change(colour)
+        ray = []
+        for i in potential_move:
+            to_rank, to_file = rank + i * rank_change, file + i * file_change
+            if not (0 <= to_rank < 8 and 0 <= to_file < 8):
+                break
+            ray.append((to_rank, to_file))
+        if ray:
+            rays.append(ray)
+    return rays
+
+
+# [PieceType][Colour][Square index] rays of (rank, file) targets nearest first, where the square index is rank * 8 + file.
+# Pieces which step rather than slide have a single target in each ray. Pawns use the pawn tables instead.
+MOVE_RAYS: list[list[list[list[list[RankFile]]]]] = [
+    [[_move_rays(potential_moves, colour, square) for square in range(64)] for colour in ColourType]
+    for potential_moves in POTENTIAL_MOVES[:5]
+]
+
+
+def _pawn_step(colour: ColourType, square: int, steps: int) -> Optional[RankFile]:
+    rank, file = divmod(square, 8)
+    to_rank = rank + (steps if colour == ColourType.WHITE else -steps)
+    return (to_rank, file) if 0 <= to_rank < 8 else None
+
+
+# [Colour][Square index] single step target of a pawn, if any
+PAWN_PUSHES: list[list[Optional[RankFile]]] = [[_pawn_step(colour, square, 1) for square in range(64)] for colour in ColourType]
+# [Colour][Square index] double step target of a pawn on its starting rank, if any
+PAWN_DOUBLE_STEPS: list[list[Optional[RankFile]]] = [
+    [_pawn_step(colour, square, 2) if square // 8 == (1 if colour == ColourType.WHITE else 6) else None for square in range(64)]
+    for colour in ColourType
+]
+# [Colour][Square index] capture targets of a pawn
+PAWN_CAPTURES: list[list[list[RankFile]]] = [
+    [[target for ray in _move_rays(pawn_moves[1:], colour, square) for target in ray] for square in range(64)]
+    for colour in ColourType
+]
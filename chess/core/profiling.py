@@ -0,0 +1,136 @@
+import marshal
+import time
+from collections.abc import Callable
+from typing import Any
+from typing import Optional
+
+from core.chess import AnyBoard
+
+# The board methods counted and timed by default
+PROFILED_METHODS: list[str] = ["_generate_legal_moves", "_get_valid_moves", "_check_move", "_pin_aware_legal_moves",
+                               "_brute_force_legal_moves", "_make_move", "undo_move"]
+# (Filename, first line number, function name), the key pstats uses for a function
+FunctionKey = tuple[str, int, str]
+
+
+class MethodStats:
+    """The calls of a profiled method, its total time including and excluding the profiled methods it calls, and its callers."""
+    key: FunctionKey
+    calls: int
+    total_time: float
+    cumulative_time: float
+    # [Caller key] calls and times of the calls from each profiled method
+    callers: dict[FunctionKey, "MethodStats"]
+
+    def __init__(self, key: FunctionKey):
+        self.key = key
+        self.calls = 0
+        self.total_time = 0.0
+        self.cumulative_time = 0.0
+        self.callers = {}
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"calls": self.calls,
+                "total_time": self.total_time,
+                "cumulative_time": self.cumulative_time,
+                "time_per_call": self.cumulative_time / self.calls if self.calls else 0.0}
+
+    def add_call(self, elapsed: float, child_time: float) -> None:
+        self.calls += 1
+        self.cumulative_time += elapsed
+        self.total_time += elapsed - child_time
+
+    def pstats_tuple(self) -> tuple[int, int, float, float]:
+        """Get the primitive calls, calls, total time and cumulative time, as pstats keeps them."""
+        return self.calls, self.calls, self.total_time, self.cumulative_time
+
+
+class BoardProfiler:
+    """Counts and times the hot methods of one board.
+
+    Enabling it shadows the methods with timing wrappers on the board instance, and disabling it removes them,
+    so a board that isn't being profiled runs its methods unwrapped at no cost.
+    """
+    board: AnyBoard
+    method_names: list[str]
+    # [Method name] stats
+    stats: dict[str, MethodStats]
+    # The time spent in the profiled methods called by each active method, innermost last
+    _child_times: list[float]
+    _active_keys: list[FunctionKey]
+
+    def __init__(self, board: AnyBoard, method_names: Optional[list[str]] = None):
+        self.board = board
+        # methods the board doesn't have, e.g. those only the object board uses, are skipped
+        self.method_names = [name for name in (method_names if method_names is not None else PROFILED_METHODS)
+                             if callable(getattr(type(board), name, None))]
+        self.stats = {}
+        for name in self.method_names:
+            code = getattr(type(board), name).__code__
+            self.stats[name] = MethodStats((code.co_filename, code.co_firstlineno, code.co_name))
+        self._child_times = []
+        self._active_keys = []
+
+    def __enter__(self) -> "BoardProfiler":
+        self.enable()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.disable()
+
+    @property
+    def enabled(self) -> bool:
+        return any(name in vars(self.board) for name in self.method_names)
+
+    def enable(self) -> None:
+        for name in self.method_names:
+            setattr(self.board, name, self._wrap(getattr(type(self.board), name).__get__(self.board), self.stats[name]))
+
+    def disable(self) -> None:
+        for name in self.method_names:
+            vars(self.board).pop(name, None)
+
+    def reset(self) -> None:
+        for name, stats in self.stats.items():
+            self.stats[name] = MethodStats(stats.key)
+
+    def _wrap(self, method: Callable[..., Any], stats: MethodStats) -> Callable[..., Any]:
+        child_times = self._child_times
+        active_keys = self._active_keys
+
+        def profiled(*args: Any, **kwargs: Any) -> Any:
+            caller = active_keys[-1] if active_keys else None
+            child_times.append(0.0)
+            active_keys.append(stats.key)
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                active_keys.pop()
+                child_time = child_times.pop()
+                stats.add_call(elapsed, child_time)
+                if caller is not None:
+                    caller_stats = stats.callers.get(caller)
+                    if caller_stats is None:
+                        caller_stats = stats.callers[caller] = MethodStats(caller)
+                    caller_stats.add_call(elapsed, child_time)
+                if child_times:
+                    child_times[-1] += elapsed
+        return profiled
+
+    def as_dict(self) -> dict[str, dict[str, Any]]:
+        """Get the calls and times of each profiled method, in seconds."""
+        return {name: stats.as_dict() for name, stats in self.stats.items()}
+
+    def pstats_dict(self) -> dict[FunctionKey, tuple[int, int, float, float, dict[FunctionKey, tuple[int, int, float, float]]]]:
+        """Get the stats in the form pstats loads: function key to primitive calls, calls, total time, cumulative time and callers,
+        with the same four numbers for the calls from each caller."""
+        return {stats.key: (*stats.pstats_tuple(),
+                            {caller: caller_stats.pstats_tuple() for caller, caller_stats in stats.callers.items()})
+                for stats in self.stats.values() if stats.calls}
+
+    def dump_stats(self, path: str) -> None:
+        """Write the stats to a file which pstats.Stats can load, as written by cProfile."""
+        with open(path, "wb") as file:
+            marshal.dump(self.pstats_dict(), file)
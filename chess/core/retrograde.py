@@ -0,0 +1,295 @@
+import os
+from collections.abc import Iterable
+from collections.abc import Iterator
+
+import numpy as np
+from core.bitboard import bishop_attacks
+from core.bitboard import KING_ATTACKS
+from core.bitboard import KING_STEPS
+from core.bitboard import KNIGHT_ATTACKS
+from core.bitboard import KNIGHT_STEPS
+from core.bitboard import NEGATIVE_BISHOP_DIRECTIONS
+from core.bitboard import NEGATIVE_ROOK_DIRECTIONS
+from core.bitboard import PAWN_ATTACKS
+from core.bitboard import POSITIVE_BISHOP_DIRECTIONS
+from core.bitboard import POSITIVE_ROOK_DIRECTIONS
+from core.bitboard import rook_attacks
+from core.bitboard import WHITE
+from core.tablebase import TABLEBASE_ENDINGS
+from core.tablebase import TABLEBASE_EXTENSION
+from core.tablebase import write_tablebase
+
+# Positions processed at once, bounding the size of the temporary arrays
+CHUNK_SIZE = 1 << 20
+# Stands in for the square beyond the edge of the board, stepping to itself and attacking nothing
+OFF_BOARD = 64
+# Added to the move count of positions where the lone king can capture, as capturing leaves too little material to checkmate
+ESCAPE_MOVES = 64
+# Pieces which a promotion can win with, as a lone bishop or knight can only draw
+PROMOTION_LETTERS = "QR"
+SLIDING_LETTERS = "QRB"
+
+ROOK_DIRECTIONS = POSITIVE_ROOK_DIRECTIONS + NEGATIVE_ROOK_DIRECTIONS
+BISHOP_DIRECTIONS = POSITIVE_BISHOP_DIRECTIONS + NEGATIVE_BISHOP_DIRECTIONS
+
+
+def _step_table(steps: list[tuple[int, int]]) -> np.ndarray:
+    """Get the [step][square index] square a step away, or OFF_BOARD."""
+    table = np.full((len(steps), OFF_BOARD + 1), OFF_BOARD, dtype=np.int64)
+    for step, (rank_change, file_change) in enumerate(steps):
+        for square in range(64):
+            rank, file = divmod(square, 8)
+            if 0 <= rank + rank_change < 8 and 0 <= file + file_change < 8:
+                table[step, square] = square + rank_change * 8 + file_change
+    return table
+
+
+def _between_masks() -> np.ndarray:
+    """Get the [from square, to square] bitboard of the squares strictly between two squares on a rank, file or diagonal."""
+    masks = np.zeros((OFF_BOARD + 1, OFF_BOARD + 1), dtype=np.uint64)
+    for square in range(64):
+        for target in range(64):
+            for attacks in (rook_attacks, bishop_attacks):
+                if attacks(square, 0) >> target & 1:
+                    masks[square, target] = attacks(square, 1 << target) & attacks(target, 1 << square)
+    return masks
+
+
+# [Piece letter] [step][square index] square one step, or one step along a ray, away
+STEP_TABLES: dict[str, np.ndarray] = {"K": _step_table(KING_STEPS), "N": _step_table(KNIGHT_STEPS), "R": _step_table(ROOK_DIRECTIONS),
+                                      "B": _step_table(BISHOP_DIRECTIONS), "Q": _step_table(ROOK_DIRECTIONS + BISHOP_DIRECTIONS)}
+# [Square index] bitboard of the square
+SQUARE_BITS: np.ndarray = np.array([1 << square for square in range(64)] + [0], dtype=np.uint64)
+# [Piece letter][square index] squares a white piece attacks on an empty board
+ATTACK_MASKS: dict[str, np.ndarray] = {letter: np.array(list(attacks) + [0], dtype=np.uint64) for letter, attacks in (
+    ("K", KING_ATTACKS), ("N", KNIGHT_ATTACKS), ("P", PAWN_ATTACKS[WHITE]),
+    ("R", [rook_attacks(square, 0) for square in range(64)]),
+    ("B", [bishop_attacks(square, 0) for square in range(64)]),
+    ("Q", [rook_attacks(square, 0) | bishop_attacks(square, 0) for square in range(64)]))}
+BETWEEN_MASKS: np.ndarray = _between_masks()
+
+
+def _decode(indices: np.ndarray, piece_count: int) -> list[np.ndarray]:
+    """Get the square indices of each piece of entries, in the order of the ending's name."""
+    return [(indices >> 6 * (piece_count - 1 - piece)) & 63 for piece in range(piece_count)]
+
+
+def _encode(squares: list[np.ndarray], side: int) -> np.ndarray:
+    """Get the entries of positions from the square indices of each piece and the side to move, as tablebase_index does."""
+    indices = np.full(len(squares[0]), side, dtype=np.int64)
+    for piece_squares in squares:
+        indices = indices << 6 | piece_squares
+    return indices
+
+
+def _occupancy(squares: list[np.ndarray]) -> np.ndarray:
+    occupied = np.zeros(len(squares[0]), dtype=np.uint64)
+    for piece_squares in squares:
+        occupied |= SQUARE_BITS[piece_squares]
+    return occupied
+
+
+def _attacked(targets: np.ndarray, letters: str, squares: list[np.ndarray], occupied: np.ndarray) -> np.ndarray:
+    """Check which target squares the white pieces attack, with sliding pieces blocked by the occupied squares."""
+    target_bits = SQUARE_BITS[targets]
+    attacked = np.zeros(len(targets), dtype=bool)
+    for letter, piece_squares in zip(letters, squares):
+        hits = (ATTACK_MASKS[letter][piece_squares] & target_bits) != 0
+        if letter in SLIDING_LETTERS:
+            hits &= (BETWEEN_MASKS[piece_squares, targets] & occupied) == 0
+        attacked |= hits
+    return attacked
+
+
+def _is_legal(letters: str, squares: list[np.ndarray], side: int) -> np.ndarray:
+    """Check which placements are legal positions: one piece per square, kings apart, no pawns on the back ranks,
+    and with white to move, black not in check."""
+    legal = np.ones(len(squares[0]), dtype=bool)
+    for piece in range(len(squares)):
+        for other in range(piece):
+            legal &= squares[piece] != squares[other]
+    legal &= (ATTACK_MASKS["K"][squares[0]] & SQUARE_BITS[squares[-1]]) == 0
+    for letter, piece_squares in zip(letters, squares):
+        if letter == "P":
+            legal &= (piece_squares >= 8) & (piece_squares < 56)
+    if side == WHITE:
+        legal &= ~_attacked(squares[-1], letters, squares[:-1], _occupancy(squares[:-1]))
+    return legal
+
+
+def _chunks(indices: np.ndarray, size: int) -> Iterator[np.ndarray]:
+    for start in range(0, len(indices), size):
+        yield indices[start:start + size]
+
+
+def _count_black_moves(letters: str) -> tuple[np.ndarray, np.ndarray]:
+    """Count the legal moves of the lone king in every black to move position, and find the checkmated positions."""
+    piece_count = len(letters) + 1
+    side_size = 1 << 6 * piece_count
+    counts = np.zeros(side_size, dtype=np.int8)
+    mated = []
+    for start in range(0, side_size, CHUNK_SIZE):
+        indices = np.arange(start, min(start + CHUNK_SIZE, side_size), dtype=np.int64)
+        squares = _decode(indices, piece_count)
+        white, lone_king = squares[:-1], squares[-1]
+        occupied = _occupancy(white)
+        moves = np.zeros(len(indices), dtype=np.int8)
+        escapes = np.zeros(len(indices), dtype=bool)
+        for steps in STEP_TABLES["K"]:
+            targets = steps[lone_king]
+            safe = (targets != OFF_BOARD) & ~_attacked(targets, letters, white, occupied)
+            moves += safe
+            for piece_squares in white[1:]:
+                escapes |= safe & (targets == piece_squares)
+        moves[escapes] += ESCAPE_MOVES
+        legal = _is_legal(letters, squares, 1)
+        counts[start:start + len(indices)] = np.where(legal, moves, 0)
+        mated.append(indices[legal & (moves == 0) & _attacked(lone_king, letters, white, occupied)])
+    return counts, np.concatenate(mated)
+
+
+def _retracted_squares(letter: str, squares: np.ndarray, occupied: np.ndarray) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+    """Yield (possible, square) arrays of the empty squares a white piece could have moved from to reach its square."""
+    if letter == "P":
+        single = np.maximum(squares - 8, 0)
+        possible = (squares >= 16) & ((SQUARE_BITS[single] & occupied) == 0)
+        yield possible, single
+        double = np.maximum(squares - 16, 0)
+        yield possible & (squares >> 3 == 3) & ((SQUARE_BITS[double] & occupied) == 0), double
+        return
+    for steps in STEP_TABLES[letter]:
+        origins = squares
+        possible = np.ones(len(squares), dtype=bool)
+        while True:
+            origins = steps[origins]
+            possible &= (origins != OFF_BOARD) & ((SQUARE_BITS[origins] & occupied) == 0)
+            if not possible.any():
+                break
+            yield possible, origins
+            if letter not in SLIDING_LETTERS:
+                break
+
+
+def _white_predecessors(letters: str, indices: np.ndarray) -> np.ndarray:
+    """Get the legal white to move positions with a move reaching black to move positions, by taking back each white move."""
+    piece_count = len(letters) + 1
+    squares = _decode(indices, piece_count)
+    occupied = _occupancy(squares)
+    predecessors = []
+    for piece, letter in enumerate(letters):
+        for possible, origins in _retracted_squares(letter, squares[piece], occupied):
+            retracted = [piece_squares[possible] for piece_squares in squares]
+            retracted[piece] = origins[possible]
+            legal = ~_attacked(retracted[-1], letters, retracted[:-1], _occupancy(retracted[:-1]))
+            if letter == "K":
+                legal &= (ATTACK_MASKS["K"][retracted[0]] & SQUARE_BITS[retracted[-1]]) == 0
+            predecessors.append(_encode([piece_squares[legal] for piece_squares in retracted], WHITE))
+    return np.concatenate(predecessors) if predecessors else np.zeros(0, dtype=np.int64)
+
+
+def _black_predecessors(letters: str, indices: np.ndarray) -> np.ndarray:
+    """Get the black to move positions with a king move reaching white to move positions, by taking back each king move."""
+    squares = _decode(indices, len(letters) + 1)
+    occupied = _occupancy(squares)
+    predecessors = []
+    for steps in STEP_TABLES["K"]:
+        origins = steps[squares[-1]]
+        possible = ((origins != OFF_BOARD) & ((SQUARE_BITS[origins] & occupied) == 0)
+                    & ((ATTACK_MASKS["K"][squares[0]] & SQUARE_BITS[origins]) == 0))
+        predecessors.append(_encode([piece_squares[possible] for piece_squares in squares[:-1]] + [origins[possible]], 1))
+    return np.concatenate(predecessors)
+
+
+def _promotion_wins(ending: str, solved: dict[str, np.ndarray]) -> dict[int, np.ndarray]:
+    """Find the white to move positions which win by promoting a pawn, by the plies to checkmate through the best promotion.
+
+    The tables of the endings promoted into are looked up in solved.
+    """
+    letters = ending[:-1]
+    if "P" not in letters:
+        return {}
+    pawn = letters.index("P")
+    piece_count = len(ending)
+    # only the positions with the pawn on the seventh rank
+    indices = np.arange(1 << 6 * piece_count, dtype=np.int64)
+    indices = indices[(indices >> 6 * (piece_count - 1 - pawn) & 63) >> 3 == 6]
+    squares = _decode(indices, piece_count)
+    promotion_squares = squares[pawn] + 8
+    legal = _is_legal(letters, squares, WHITE)
+    for piece_squares in squares:
+        legal &= piece_squares != promotion_squares
+    indices = indices[legal]
+    squares = [piece_squares[legal] for piece_squares in squares]
+    squares[pawn] = promotion_squares[legal]
+    best_plies = np.full(len(indices), np.iinfo(np.int64).max)
+    for letter in PROMOTION_LETTERS:
+        values = solved[ending.replace("P", letter)][_encode(squares, 1)].astype(np.int64)
+        # black is lost when the plies to checkmate, the value minus one, are even, and white mates a ply later
+        lost = (values > 0) & (values % 2 == 1)
+        best_plies = np.where(lost, np.minimum(best_plies, values), best_plies)
+    return {int(plies): indices[best_plies == plies] for plies in np.unique(best_plies[best_plies < np.iinfo(np.int64).max])}
+
+
+def generate_tablebase(ending: str, solved: dict[str, np.ndarray]) -> np.ndarray:
+    """Solve an ending by retrograde analysis over every placement of its pieces, returning its entries as decode_value reads them.
+
+    Working back from the checkmates one ply at a time, white wins where a move reaches a position where black is lost,
+    and black is lost once all of its legal moves reach positions where white wins. The positions left are draws.
+    Pawn endings look up the tables of the endings a promotion leads to in solved.
+    """
+    letters = ending[:-1]
+    side_size = 1 << 6 * len(ending)
+    values = np.zeros(2 * side_size, dtype=np.uint8)
+    # [Black to move entry - side_size] legal moves not yet known to reach a position where white wins
+    counts, black_frontier = _count_black_moves(letters)
+    black_frontier += side_size
+    values[black_frontier] = 1
+    promotion_wins = _promotion_wins(ending, solved)
+    # [White to move entry] whether the position was reached this ply, collecting them without sorting
+    reached_white = np.zeros(side_size, dtype=bool)
+    plies = 0
+    while len(black_frontier) or promotion_wins:
+        plies += 1
+        for chunk in _chunks(black_frontier, CHUNK_SIZE // 32):
+            reached_white[_white_predecessors(letters, chunk)] = True
+        if plies in promotion_wins:
+            reached_white[promotion_wins.pop(plies)] = True
+        white_frontier = np.flatnonzero(reached_white)
+        reached_white[white_frontier] = False
+        white_frontier = white_frontier[values[white_frontier] == 0]
+        values[white_frontier] = plies + 1
+
+        plies += 1
+        # [Black to move entry - side_size] moves reaching positions where white wins this ply
+        reached_black = np.zeros(side_size, dtype=np.int8)
+        for chunk in _chunks(white_frontier, CHUNK_SIZE // 8):
+            reached_black += np.bincount(_black_predecessors(letters, chunk) - side_size, minlength=side_size).astype(np.int8)
+        offsets = np.flatnonzero(reached_black)
+        counts[offsets] -= reached_black[offsets]
+        black_frontier = offsets[(counts[offsets] == 0) & (values[offsets + side_size] == 0)] + side_size
+        values[black_frontier] = plies + 1
+    return values
+
+
+def pack_values(values: np.ndarray) -> tuple[int, bytes]:
+    """Pack entries into the fewest bits which hold the largest, least significant bit first, returning the bits per entry and the data."""
+    value_bits = max(int(values.max()).bit_length(), 1)
+    bits = np.unpackbits(values[:, np.newaxis], axis=1, count=value_bits, bitorder="little")
+    return value_bits, np.packbits(bits.reshape(-1), bitorder="little").tobytes()
+
+
+def generation_order(endings: Iterable[str]) -> list[str]:
+    """Get the endings to generate for the given ones, adding the endings their promotions lead to, in the order to generate them."""
+    required = set()
+    for ending in endings:
+        required.add(ending)
+        if "P" in ending:
+            required.update(ending.replace("P", letter) for letter in PROMOTION_LETTERS)
+    return [ending for ending in TABLEBASE_ENDINGS if ending in required]
+
+
+def save_tablebase(directory: str, ending: str, values: np.ndarray) -> str:
+    """Write the bit-packed table of an ending to the directory, returning its path."""
+    path = os.path.join(directory, ending + TABLEBASE_EXTENSION)
+    write_tablebase(path, ending, *pack_values(values))
+    return path
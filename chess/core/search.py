@@ -0,0 +1,296 @@
+import threading
+import time
+from collections.abc import Callable
+from collections.abc import Iterable
+from collections.abc import Sequence
+from typing import Generic
+from typing import Optional
+
+from core.board_protocol import ChessBoard
+from core.board_protocol import MoveT
+from core.move import PROMOTION_SHIFT
+from core.notation import AnyMove
+from core.notation import move_notation
+from core.tablebase import TablebaseResult
+from core.tablebase import Tablebases
+from core.tablebase import Wdl
+
+INFINITE_SCORE = 1000000
+MATE_SCORE = 100000
+MAX_PLY = 128
+# How many nodes to search between checks of the clock and the stop flag
+CHECK_INTERVAL = 1024
+# The number of positions whose best move is remembered for ordering
+HASH_MOVE_TABLE_SIZE = 1 << 18
+
+
+class SearchAborted(Exception):
+    """Raised inside the search when it reaches a limit or is stopped."""
+    pass
+
+
+class SearchLimits:
+    """The hard limits of a search. The time limit is in seconds."""
+    depth: int
+    nodes: Optional[int]
+    movetime: Optional[float]
+    # Whether the search only ends when stopped, holding its result back if it finishes first
+    infinite: bool
+
+    def __init__(self, depth: int = MAX_PLY, nodes: Optional[int] = None, movetime: Optional[float] = None, infinite: bool = False):
+        self.depth = min(depth, MAX_PLY)
+        self.nodes = nodes
+        self.movetime = movetime
+        self.infinite = infinite
+
+
+class SearchInfo:
+    """The result of a completed iteration of the search, with the score from the side to move's perspective."""
+    depth: int
+    score: int
+    nodes: int
+    elapsed: float
+    pv: Sequence[AnyMove]
+
+    def __init__(self, depth: int, score: int, nodes: int, elapsed: float, pv: Sequence[AnyMove]):
+        self.depth = depth
+        self.score = score
+        self.nodes = nodes
+        self.elapsed = elapsed
+        self.pv = pv
+
+    def __repr__(self) -> str:
+        if abs(self.score) >= MATE_SCORE - MAX_PLY:
+            mate_in = (MATE_SCORE - abs(self.score) + 1) // 2
+            score = f"mate {mate_in if self.score > 0 else -mate_in}"
+        else:
+            score = f"cp {self.score}"
+        return (f"info depth {self.depth} score {score} nodes {self.nodes} nps {self.nps:.0f} "
+                f"time {self.elapsed * 1000:.0f} pv {' '.join(move_notation(move) for move in self.pv)}")
+
+    @property
+    def nps(self) -> float:
+        return self.nodes / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def best_move(self) -> Optional[AnyMove]:
+        return self.pv[0] if self.pv else None
+
+
+def tablebase_score(result: TablebaseResult, ply: int) -> int:
+    """Convert the tablebase result of a position at a ply of the search to a search score,
+    scoring a checkmate by its distance from the root as the search does."""
+    if result.wdl == Wdl.DRAW or result.dtm is None:
+        return 0
+    return MATE_SCORE - ply - result.dtm if result.wdl == Wdl.WIN else -MATE_SCORE + ply + result.dtm
+
+
+class Search(Generic[MoveT]):
+    """A negamax alpha-beta search with iterative deepening and quiescence search on captures, or on every evasion in check.
+
+    Moves are ordered by the best move previously found in the position, then captures by MVV-LVA,
+    then killer moves, then the history heuristic. The boards pick them in stages, so the object board
+    never generates the quiet moves of a node cut off by the earlier stages.
+    Positions in the endgame tablebases are answered from them without searching.
+    """
+    board: ChessBoard[MoveT]
+    limits: SearchLimits
+    report: Optional[Callable[[SearchInfo], None]]
+    tablebases: Optional[Tablebases]
+    nodes: int
+    # [Ply] up to two quiet moves which caused a beta cut-off
+    killers: list[list[int]]
+    # [From | To << 6] bonus of quiet moves which caused a beta cut-off
+    history: list[int]
+    # Zobrist hash to the key of the best move found in the position
+    hash_moves: dict[int, int]
+    # [Ply] principal variation from the ply
+    _pv: list[list[MoveT]]
+    _stop_event: threading.Event
+    _start: float
+    _deadline: float
+    _max_nodes: float
+
+    def __init__(self, board: ChessBoard[MoveT], limits: Optional[SearchLimits] = None, report: Optional[Callable[[SearchInfo], None]] = print,
+                 tablebases: Optional[Tablebases] = None):
+        self.board = board
+        self.limits = limits if limits is not None else SearchLimits()
+        self.report = report
+        self.tablebases = tablebases
+        self.nodes = 0
+        self.killers = [[] for _ in range(MAX_PLY + 1)]
+        self.history = [0] * 4096
+        self.hash_moves = {}
+        self._pv = [[] for _ in range(MAX_PLY + 2)]
+        self._stop_event = threading.Event()
+
+    def stop(self) -> None:
+        """Stop the search as soon as possible. Safe to call from another thread."""
+        self._stop_event.set()
+
+    def ponderhit(self, movetime: float) -> None:
+        """Limit a search started without a time limit, e.g. on the opponent's time, to a move time from now.
+
+        Safe to call from another thread.
+        """
+        self.limits.movetime = movetime
+        self._deadline = time.perf_counter() + movetime
+
+    def run(self) -> Optional[SearchInfo]:
+        """Search with iterative deepening until a limit is reached, returning the last completed iteration.
+
+        An infinite search doesn't return until it is stopped. Returns None if the side to move has no legal moves.
+        """
+        result = self._iterative_deepening()
+        if self.limits.infinite:
+            self._stop_event.wait()
+        return result
+
+    def _iterative_deepening(self) -> Optional[SearchInfo]:
+        self._start = time.perf_counter()
+        self._deadline = self._start + self.limits.movetime if self.limits.movetime is not None else float("inf")
+        self._max_nodes = self.limits.nodes if self.limits.nodes is not None else float("inf")
+        self.nodes = 0
+
+        self.board._generate_legal_moves()
+        root_moves = list(self.board.legal_moves)
+        if not root_moves:
+            return None
+        result = self._probe_tablebases(root_moves)
+        if result is not None:
+            if self.report is not None:
+                self.report(result)
+            return result
+        for depth in range(1, self.limits.depth + 1):
+            try:
+                score = self._negamax(depth, 0, -INFINITE_SCORE, INFINITE_SCORE)
+            except SearchAborted:
+                break
+            result = SearchInfo(depth, score, self.nodes, time.perf_counter() - self._start, list(self._pv[0]))
+            if self.report is not None:
+                self.report(result)
+            # a forced mate won't be improved on by searching deeper
+            if abs(score) >= MATE_SCORE - MAX_PLY:
+                break
+        if result is None:
+            # stopped before the first iteration completed, so fall back on the best ordered move
+            best_move = next(iter(self._ordered_moves(0, quiets=True)))
+            result = SearchInfo(0, 0, self.nodes, time.perf_counter() - self._start, [best_move])
+        return result
+
+    def _probe_tablebases(self, root_moves: list[MoveT]) -> Optional[SearchInfo]:
+        """Pick the root move which keeps the best result with perfect play, or None if a position after a move isn't in the tablebases."""
+        if self.tablebases is None:
+            return None
+        board = self.board
+        best_move = root_moves[0]
+        best_score = -INFINITE_SCORE
+        for move in root_moves:
+            board._make_move(move)
+            try:
+                result = board.probe_tablebase(self.tablebases)
+            finally:
+                board.undo_move()
+            if result is None:
+                return None
+            score = -tablebase_score(result, 1)
+            if score > best_score:
+                best_move = move
+                best_score = score
+        return SearchInfo(1, best_score, len(root_moves), time.perf_counter() - self._start, [best_move])
+
+    def _count_node(self) -> None:
+        self.nodes += 1
+        if self.nodes >= self._max_nodes:
+            raise SearchAborted()
+        if self.nodes % CHECK_INTERVAL == 0 and (self._stop_event.is_set() or time.perf_counter() >= self._deadline):
+            raise SearchAborted()
+
+    def _negamax(self, depth: int, ply: int, alpha: int, beta: int) -> int:
+        if depth <= 0:
+            return self._quiescence(ply, alpha, beta)
+        self._count_node()
+        self._pv[ply] = []
+        board = self.board
+        if ply >= MAX_PLY:
+            return board.evaluate()
+
+        best_score = -INFINITE_SCORE
+        best_key = None
+        moves_searched = 0
+        for move in self._ordered_moves(ply, quiets=True):
+            moves_searched += 1
+            board._make_move(move)
+            try:
+                score = -self._negamax(depth - 1, ply + 1, -beta, -alpha)
+            finally:
+                board.undo_move()
+            if score > best_score:
+                best_score = score
+            if score > alpha:
+                alpha = score
+                best_key = board.move_key(move)
+                self._pv[ply] = [move] + self._pv[ply + 1]
+                if alpha >= beta:
+                    self._update_quiet_move_heuristics(move, best_key, depth, ply)
+                    break
+        if not moves_searched:
+            return -MATE_SCORE + ply if board.in_check() else 0
+        if best_key is not None:
+            if len(self.hash_moves) >= HASH_MOVE_TABLE_SIZE:
+                self.hash_moves.clear()
+            self.hash_moves[board.zobrist_hash] = best_key
+        return best_score
+
+    def _quiescence(self, ply: int, alpha: int, beta: int) -> int:
+        self._count_node()
+        self._pv[ply] = []
+        board = self.board
+        # In check there's no standing pat, as every evasion has to be searched to see whether it is checkmate
+        in_check = board.in_check()
+        if ply >= MAX_PLY:
+            return board.evaluate()
+        if not in_check:
+            stand_pat = board.evaluate()
+            if stand_pat >= beta:
+                return stand_pat
+            if stand_pat > alpha:
+                alpha = stand_pat
+
+        moves_searched = 0
+        for move in self._ordered_moves(ply, quiets=in_check):
+            moves_searched += 1
+            board._make_move(move)
+            try:
+                score = -self._quiescence(ply + 1, -beta, -alpha)
+            finally:
+                board.undo_move()
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+        if in_check and not moves_searched:
+            return -MATE_SCORE + ply
+        return alpha
+
+    def _ordered_moves(self, ply: int, quiets: bool) -> Iterable[MoveT]:
+        """Get the legal moves of the position in search order, or only the captures and promotions without quiets."""
+        board = self.board
+        hash_key = self.hash_moves.get(board.zobrist_hash) if quiets else None
+        return board.staged_moves(hash_key, self.killers[ply], self.history, quiets)
+
+    def _update_quiet_move_heuristics(self, move: MoveT, key: int, depth: int, ply: int) -> None:
+        """Remember a quiet move which caused a beta cut-off as a killer and in the history table."""
+        if self.board.move_pieces(move)[1] != -1 or key >> PROMOTION_SHIFT:
+            return
+        killers = self.killers[ply]
+        if key not in killers:
+            killers.insert(0, key)
+            del killers[2:]
+        self.history[key & 0xFFF] += depth * depth
+
+
+def search(board: ChessBoard[MoveT], limits: Optional[SearchLimits] = None, report: Optional[Callable[[SearchInfo], None]] = print,
+           tablebases: Optional[Tablebases] = None) -> Optional[SearchInfo]:
+    """Search a board for the best move within the limits, reporting each completed iteration."""
+    return Search(board, limits, report, tablebases).run()
@@ -27,7 +27,7 @@ class BoardSquare(Square):
     file: int
     piece: Optional[Piece]
 
-    def __init__(self, rank: int, file: int, piece: Piece = None):
+    def __init__(self, rank: int, file: int, piece: Optional[Piece] = None):
         super().__init__(rank, file)
         self.piece = piece
 
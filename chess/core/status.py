@@ -0,0 +1,52 @@
+from enum import Enum
+from typing import Any
+
+from core.board_protocol import ChessBoard
+
+# Halfmoves without a capture or pawn move after which the game is drawn
+FIFTY_MOVE_RULE_HALFMOVES = 100
+REPETITIONS_TO_DRAW = 3
+
+
+class GameStatus(Enum):
+    """The status of a game of chess"""
+    IN_PROGRESS = 0
+    CHECKMATE = 1
+    STALEMATE = 2
+    THREEFOLD_REPETITION = 3
+    FIFTY_MOVE_RULE = 4
+    INSUFFICIENT_MATERIAL = 5
+
+    @property
+    def is_draw(self) -> bool:
+        return self not in (GameStatus.IN_PROGRESS, GameStatus.CHECKMATE)
+
+
+def repetition_count(board: ChessBoard[Any]) -> int:
+    """Count the occurrences of the current position, comparing its Zobrist hash with those kept in the undo records.
+
+    Only positions since the last capture or pawn move, with the same side to move, can repeat it.
+    """
+    undo_stack = board.undo_stack
+    records = undo_stack.records
+    oldest = max(len(undo_stack) - board.halfmove_clock, 0)
+    count = 1
+    for i in range(len(undo_stack) - 2, oldest - 1, -2):
+        if records[i].zobrist_hash == board.zobrist_hash:
+            count += 1
+    return count
+
+
+def game_status(board: ChessBoard[Any]) -> GameStatus:
+    """Get the status of the game in the board's position, using its cached legal moves when it has them."""
+    board._generate_legal_moves()
+    if not board.legal_moves:
+        return GameStatus.CHECKMATE if board.in_check() else GameStatus.STALEMATE
+    if board.has_insufficient_material():
+        return GameStatus.INSUFFICIENT_MATERIAL
+    if board.halfmove_clock >= FIFTY_MOVE_RULE_HALFMOVES:
+        return GameStatus.FIFTY_MOVE_RULE
+    # returning to a position takes at least two moves by each side
+    if board.halfmove_clock >= 4 * (REPETITIONS_TO_DRAW - 1) and repetition_count(board) >= REPETITIONS_TO_DRAW:
+        return GameStatus.THREEFOLD_REPETITION
+    return GameStatus.IN_PROGRESS
@@ -0,0 +1,171 @@
+import mmap
+import os
+import struct
+from collections.abc import Iterable
+from collections.abc import Sequence
+from enum import Enum
+from typing import Optional
+
+from core.piece import PieceType
+
+# Endings with tables, named by the pieces of the side with material then the lone king, in generation order:
+# KPK promotes into KQK and KRK so they are generated first
+TABLEBASE_ENDINGS: list[str] = ["KQK", "KRK", "KPK", "KBNK"]
+TABLEBASE_EXTENSION = ".tb"
+# Order of the pieces after the king in an ending's name
+MATERIAL_ORDER = "QRBNP"
+# [PieceType value] piece letter
+PIECE_LETTERS: list[str] = ["K", "Q", "R", "B", "N", "P"]
+# Magic, ending name and bits per entry
+HEADER_STRUCT = struct.Struct("<4s8sB3x")
+TABLEBASE_MAGIC = b"CHTB"
+# Entries are read two bytes at a time, so the data is padded for the last one
+PADDING = b"\x00"
+
+
+class Wdl(Enum):
+    """The result of a tablebase position with perfect play, for the side to move"""
+    LOSS = -1
+    DRAW = 0
+    WIN = 1
+
+
+class TablebaseResult:
+    """The result of a position with perfect play, and the plies to checkmate when it isn't drawn."""
+    wdl: Wdl
+    dtm: Optional[int]
+
+    def __init__(self, wdl: Wdl, dtm: Optional[int] = None):
+        self.wdl = wdl
+        self.dtm = dtm
+
+    def __repr__(self) -> str:
+        return self.wdl.name if self.dtm is None else f"{self.wdl.name} mate in {self.dtm} plies"
+
+
+DRAW_RESULT = TablebaseResult(Wdl.DRAW)
+
+
+def tablebase_size(ending: str) -> int:
+    """Get the number of entries in the table of an ending: a square for each piece, for each side to move."""
+    return 2 << 6 * len(ending)
+
+
+def tablebase_index(squares: Iterable[int], side: int) -> int:
+    """Get the entry of a position from the square indices of its pieces, in the order of the ending's name, and the side to move.
+
+    The side to move is the highest bit and each square takes six bits, so the last piece's square is the lowest.
+    """
+    index = side
+    for square in squares:
+        index = index << 6 | square
+    return index
+
+
+def decode_value(value: int) -> TablebaseResult:
+    """Decode an entry, which is 0 for a draw, otherwise the plies to checkmate plus one.
+
+    The side to move wins if the plies to checkmate are odd, as it gives the checkmate, and loses if they are even.
+    """
+    if value == 0:
+        return DRAW_RESULT
+    dtm = value - 1
+    return TablebaseResult(Wdl.WIN if dtm % 2 else Wdl.LOSS, dtm)
+
+
+def write_tablebase(path: str, ending: str, value_bits: int, data: bytes) -> None:
+    """Write the bit-packed entries of an ending's table, with its header."""
+    with open(path, "wb") as file:
+        file.write(HEADER_STRUCT.pack(TABLEBASE_MAGIC, ending.encode(), value_bits))
+        file.write(data)
+        file.write(PADDING)
+
+
+class Tablebase:
+    """The table of an ending, memory-mapped so only the pages which are probed are read.
+
+    Entries are packed into value_bits bits each, least significant bit first, and indexed by tablebase_index.
+    """
+    ending: str
+    value_bits: int
+    _mask: int
+    _mmap: mmap.mmap
+
+    def __init__(self, path: str):
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, ending, self.value_bits = HEADER_STRUCT.unpack_from(self._mmap)
+        if magic != TABLEBASE_MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a tablebase")
+        self.ending = ending.rstrip(b"\x00").decode()
+        self._mask = (1 << self.value_bits) - 1
+
+    def close(self) -> None:
+        self._mmap.close()
+
+    def value(self, index: int) -> int:
+        """Get the entry with the given index."""
+        bit = index * self.value_bits
+        offset = HEADER_STRUCT.size + (bit >> 3)
+        return int.from_bytes(self._mmap[offset:offset + 2], "little") >> (bit & 7) & self._mask
+
+    def probe(self, squares: Sequence[int], side: int) -> TablebaseResult:
+        """Look up a position from the square indices of its pieces, in the order of the ending's name, and the side to move."""
+        return decode_value(self.value(tablebase_index(squares, side)))
+
+
+class Tablebases:
+    """The tables of the endings found in a directory."""
+    directory: str
+    # [Ending] table
+    tables: dict[str, Tablebase]
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.tables = {}
+        for ending in TABLEBASE_ENDINGS:
+            path = os.path.join(directory, ending + TABLEBASE_EXTENSION)
+            if os.path.exists(path):
+                self.tables[ending] = Tablebase(path)
+
+    def __enter__(self) -> "Tablebases":
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        for table in self.tables.values():
+            table.close()
+        self.tables = {}
+
+    def probe(self, pieces: Iterable[tuple[int, int]], side: int) -> Optional[TablebaseResult]:
+        """Look up a position from the (square index, piece code) of each piece and the side to move.
+
+        Positions with a colour's pieces are looked up with the colours swapped and the board flipped when they are black's.
+        Returns None if there is no table for the material.
+        """
+        # [Colour] (piece letter, square index) of each piece other than the king
+        material: list[list[tuple[str, int]]] = [[], []]
+        king_squares = [0, 0]
+        for square, code in pieces:
+            colour, piece_type = divmod(code, 6)
+            if piece_type == PieceType.KING.value:
+                king_squares[colour] = square
+            else:
+                material[colour].append((PIECE_LETTERS[piece_type], square))
+        if material[0] and material[1]:
+            return None
+        strong = 0 if material[0] else 1
+        letters = sorted(material[strong], key=lambda piece: MATERIAL_ORDER.index(piece[0]))
+        if not letters or (len(letters) == 1 and letters[0][0] in ("B", "N")):
+            # a lone minor piece can't checkmate
+            return DRAW_RESULT
+        table = self.tables.get("K" + "".join(letter for letter, _ in letters) + "K")
+        if table is None:
+            return None
+        squares = [king_squares[strong]] + [square for _, square in letters] + [king_squares[1 - strong]]
+        if strong:
+            squares = [square ^ 56 for square in squares]
+        return table.probe(squares, side ^ strong)
@@ -0,0 +1,54 @@
+from collections import OrderedDict
+from typing import Generic
+from typing import Optional
+from typing import TypeVar
+
+T = TypeVar("T")
+
+
+class LegalMoveCache(Generic[T]):
+    """A bounded cache from a position's Zobrist hash to its legal moves, evicting the least recently used position."""
+    max_size: int
+    entries: "OrderedDict[int, list[T]]"
+    hits: int
+    misses: int
+
+    def __init__(self, max_size: int):
+        assert max_size > 0, "The cache must hold at least one position"
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __repr__(self) -> str:
+        return f"Positions {len(self)}/{self.max_size} | Hits {self.hits} | Misses {self.misses} | Hit rate {self.hit_rate:.1%}"
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, zobrist_hash: int) -> Optional[list[T]]:
+        """Get the cached legal moves of a position, marking it as the most recently used."""
+        moves = self.entries.get(zobrist_hash)
+        if moves is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(zobrist_hash)
+        return moves
+
+    def put(self, zobrist_hash: int, moves: list[T]) -> None:
+        """Cache the legal moves of a position, evicting the least recently used position when full."""
+        self.entries[zobrist_hash] = moves
+        self.entries.move_to_end(zobrist_hash)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
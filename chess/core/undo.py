@@ -0,0 +1,97 @@
+from typing import Generic
+from typing import Optional
+from typing import TypeVar
+
+from core.move import Move
+from core.piece import Piece
+from core.square import BoardSquare
+
+# The number of records preallocated, enough for most games before the stack has to grow
+UNDO_STACK_SIZE = 512
+
+
+class UndoRecord:
+    """The irreversible state of a position before a move, restored when the move is undone.
+
+    Each board backend extends it with the move and the state it keeps in its own representation.
+    """
+    __slots__ = ("castling_rights", "halfmove_clock", "zobrist_hash", "score")
+    castling_rights: int
+    halfmove_clock: int
+    zobrist_hash: int
+    score: int
+
+    def __init__(self):
+        self.castling_rights = 0
+        self.halfmove_clock = 0
+        self.zobrist_hash = 0
+        self.score = 0
+
+
+class BoardUndoRecord(UndoRecord):
+    """The undo record of the object board, with its move, captured piece and en-passant square.
+
+    The move is set when the record is pushed.
+    """
+    __slots__ = ("move", "captured_piece", "en_passant_square")
+    move: Move
+    captured_piece: Optional[Piece]
+    en_passant_square: Optional[BoardSquare]
+
+    def __init__(self):
+        super().__init__()
+        self.captured_piece = None
+        self.en_passant_square = None
+
+
+class BitBoardUndoRecord(UndoRecord):
+    """The undo record of the bitboard, with its packed move, captured piece code and en-passant square index."""
+    __slots__ = ("move", "captured_piece", "en_passant_square")
+    move: int
+    captured_piece: int
+    en_passant_square: int
+
+    def __init__(self):
+        super().__init__()
+        self.move = 0
+        self.captured_piece = -1
+        self.en_passant_square = -1
+
+
+RecordT = TypeVar("RecordT", bound=UndoRecord)
+
+
+class UndoStack(Generic[RecordT]):
+    """A stack of undo records preallocated per board and filled in place, so making a move doesn't allocate."""
+    record_type: type[RecordT]
+    records: list[RecordT]
+    size: int
+
+    def __init__(self, record_type: type[RecordT], capacity: int = UNDO_STACK_SIZE):
+        self.record_type = record_type
+        self.records = [record_type() for _ in range(capacity)]
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def push(self) -> RecordT:
+        """Get the next record to fill in, growing the stack when it is full."""
+        if self.size == len(self.records):
+            self.records.extend(self.record_type() for _ in range(len(self.records)))
+        record = self.records[self.size]
+        self.size += 1
+        return record
+
+    def pop(self) -> RecordT:
+        """Get the most recent record, which is reused by the next push. Raises an IndexError if the stack is empty."""
+        if self.size == 0:
+            raise IndexError("pop from empty undo stack")
+        self.size -= 1
+        return self.records[self.size]
+
+    def peek(self) -> Optional[RecordT]:
+        return self.records[self.size - 1] if self.size else None
+
+    def clear(self) -> None:
+        self.size = 0
@@ -0,0 +1,54 @@
+import random
+from typing import Optional
+
+from core.castling import CASTLING_FEN
+from core.piece import ColourType
+from core.piece import Piece
+from core.square import BoardSquare
+from core.square import Square
+
+# Fixed seed so that hashes are reproducible between runs and processes
+_random = random.Random(0x5EED)
+# [Piece code][Square], where the piece code is colour * 6 + piece type and the square is rank * 8 + file
+ZOBRIST_PIECE_KEYS: list[list[int]] = [[_random.getrandbits(64) for _ in range(64)] for _ in range(12)]
+ZOBRIST_BLACK_TO_MOVE: int = _random.getrandbits(64)
+ZOBRIST_CASTLING_KEYS: dict[str, int] = {right: _random.getrandbits(64) for right in "KQkq"}
+# [File]
+ZOBRIST_EN_PASSANT_KEYS: list[int] = [_random.getrandbits(64) for _ in range(8)]
+
+
+def _castling_rights_key(castling_rights: int) -> int:
+    key = 0
+    for char, right in CASTLING_FEN.items():
+        if castling_rights & right:
+            key ^= ZOBRIST_CASTLING_KEYS[char]
+    return key
+
+
+# [Castling rights mask] combined key of the rights in the mask
+ZOBRIST_CASTLING_RIGHTS_KEYS: list[int] = [_castling_rights_key(castling_rights) for castling_rights in range(16)]
+
+
+def piece_key(piece: Piece, square: Square) -> int:
+    """Get the Zobrist key of a piece on a square."""
+    return ZOBRIST_PIECE_KEYS[piece.colour_type.value * 6 + piece.piece_type.value][square.rank * 8 + square.file]
+
+
+def castling_key(castling_rights: int) -> int:
+    """Get the combined Zobrist key of a castling rights mask."""
+    return ZOBRIST_CASTLING_RIGHTS_KEYS[castling_rights]
+
+
+def compute_zobrist_hash(state: list[list[BoardSquare]], turn: ColourType, castling_rights: int, en_passant_square: Optional[Square]) -> int:
+    """Compute the Zobrist hash of a position from scratch."""
+    zobrist_hash = 0
+    for rank in state:
+        for square in rank:
+            if square.piece is not None:
+                zobrist_hash ^= piece_key(square.piece, square)
+    if turn == ColourType.BLACK:
+        zobrist_hash ^= ZOBRIST_BLACK_TO_MOVE
+    zobrist_hash ^= castling_key(castling_rights)
+    if en_passant_square is not None:
+        zobrist_hash ^= ZOBRIST_EN_PASSANT_KEYS[en_passant_square.file]
+    return zobrist_hash
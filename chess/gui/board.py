@@ -1,10 +1,20 @@
+from collections.abc import Iterable
 from typing import Optional
 
 import pyglet
+from core.castling import CASTLING_SIDE_BY_KING_TO
 from core.chess import Chess
+from core.move import CASTLING_FLAG
+from core.move import EN_PASSANT_FLAG
+from core.move import FLAGS_SHIFT
+from core.move import FROM_MASK
+from core.move import TO_SHIFT
+from core.notation import move_notation
+from core.notation import packed_move
 from core.piece import ColourType
 from core.piece import PieceType
 from core.square import Square
+from gui.engine import EngineWorker
 from gui.layout import Layout
 from gui.sprites import board_sprites_generator
 from gui.sprites import piece_sprites_generator
@@ -12,21 +22,34 @@ from gui.sprites import PieceSprite
 from gui.sprites import RectangleSprite
 from util import is_pawn_promotion
 
+# Colour and opacity of the highlights on the squares the selected piece can move to
+HIGHLIGHT_COLOUR = (120, 170, 90)
+HIGHLIGHT_OPACITY = 160
+
 
 class Board:
     """The graphical board of the game, which interfaces with the chess core."""
     main_batch = pyglet.graphics.Batch()
     board_group = pyglet.graphics.OrderedGroup(0)
-    pieces_group = pyglet.graphics.OrderedGroup(1)
+    highlight_group = pyglet.graphics.OrderedGroup(1)
+    pieces_group = pyglet.graphics.OrderedGroup(2)
     board_sprites: list[RectangleSprite]
+    highlight_sprites: list[RectangleSprite]
+    # [Rank][File]
     piece_sprites: list[list[Optional[PieceSprite]]]
+    # [Piece symbol] hidden piece sprites, reused when a piece of the symbol moves to a square
+    sprite_pool: dict[str, list[PieceSprite]]
     layout: Layout
     selected_squares: list[Square] = []
     auto_queen: bool = False
     promotion_colour: Optional[ColourType] = None
+    # The colour the engine plays, or None when both sides are played from the GUI
+    engine_colour: Optional[ColourType]
+    engine: Optional[EngineWorker]
 
-    def __init__(self, fen: str, layout: Layout):
+    def __init__(self, fen: str, layout: Layout, engine_colour: Optional[ColourType] = None):
         self.chess = Chess(fen)
+        print(self.chess.board)
         self.layout = layout
         self.board_sprites = board_sprites_generator(
             self.layout.square_size,
@@ -39,32 +62,69 @@ class Board:
             self.main_batch,
             self.pieces_group
         )
+        self.sprite_pool = {}
+        self.highlight_sprites = []
+        self.engine_colour = engine_colour
+        self.engine = EngineWorker(self.engine_move) if engine_colour is not None else None
+        if self.engine is not None and self.engine_to_move and not self.chess.is_game_over():
+            self.engine.think(self.chess.fen())
+
+    @property
+    def engine_to_move(self) -> bool:
+        return self.engine_colour is not None and self.chess.board.turn == self.engine_colour
 
     def draw(self):
         self.main_batch.draw()
 
-    def brute_force_update(self):
-        """Brute force updates the piece sprites."""
-        # TODO: implement more efficient update method for the piece sprites
-        for rank in self.piece_sprites:
-            for piece in rank:
-                if piece is None:
+    def update_squares(self, squares: Iterable[Square]):
+        """Update the piece sprites of squares whose pieces may have changed, leaving the sprites of unchanged squares alone."""
+        for square in squares:
+            piece = self.chess.get_piece_at(square)
+            symbol = str(piece) if piece is not None else None
+            sprite = self.piece_sprites[square.rank][square.file]
+            if sprite is not None:
+                if sprite.text == symbol:
                     continue
-                piece.delete()
-        self.piece_sprites = piece_sprites_generator(
-            self.chess.board.state,
-            self.layout,
-            self.main_batch,
-            self.pieces_group
-        )
-        print(self.chess.board)
+                self.release_sprite(sprite)
+            self.piece_sprites[square.rank][square.file] = self.acquire_sprite(symbol, square) if symbol is not None else None
+
+    def acquire_sprite(self, symbol: str, square: Square) -> PieceSprite:
+        """Show a sprite of a piece symbol on a square, reusing a hidden one if the pool has one."""
+        x = square.file * self.layout.square_size + self.layout.piece_offset[0]
+        y = square.rank * self.layout.square_size + self.layout.piece_offset[1]
+        pool = self.sprite_pool.get(symbol)
+        if not pool:
+            return PieceSprite(symbol, x, y, self.layout.piece_size, self.main_batch, self.pieces_group)
+        sprite = pool.pop()
+        # lay the sprite out once for its new position and visibility
+        sprite.begin_update()
+        sprite.x = x
+        sprite.y = y
+        sprite.visible = True
+        sprite.end_update()
+        return sprite
+
+    def release_sprite(self, sprite: PieceSprite):
+        """Hide a sprite, keeping it in the pool for reuse."""
+        sprite.visible = False
+        self.sprite_pool.setdefault(sprite.text, []).append(sprite)
+
+    def last_move_squares(self) -> list[Square]:
+        """Get the squares changed by the last move made, or none if no move has been made."""
+        record = self.chess.board.undo_stack.peek()
+        if record is None:
+            return []
+        return move_squares(packed_move(record.move))
 
     def input(self, x: int, y: int):
         """Recieves input from the player, selecting the square and making a move when necessary."""
+        if self.engine_to_move:
+            return
         self.select_square(x, y)
         if self.can_move():
             self.move()
             self.selected_squares = []
+        self.update_highlights()
 
     def select_square(self, x: int, y: int):
         """Select a square on the chess board, appending it to the list of selected squares."""
@@ -72,6 +132,19 @@ class Board:
         square = Square(clicked_rank, clicked_file)
         self.selected_squares.append(square)
 
+    def update_highlights(self):
+        """Highlight the squares the selected piece can legally move to, or clear the highlights when no piece is selected."""
+        for sprite in self.highlight_sprites:
+            sprite.delete()
+        self.highlight_sprites = []
+        if len(self.selected_squares) != 1:
+            return
+        size = self.layout.square_size
+        for square in self.chess.legal_destinations(self.selected_squares[0]):
+            sprite = RectangleSprite(square.file * size, square.rank * size, size, size, HIGHLIGHT_COLOUR, self.main_batch, self.highlight_group)
+            sprite.opacity = HIGHLIGHT_OPACITY
+            self.highlight_sprites.append(sprite)
+
     def update_promotion_colour(self):
         """Updates the promotion colour if pawn promotion, returning a bool to indicate if the next move should be made."""
         piece_to_move = self.chess.get_piece_at(self.selected_squares[0])
@@ -100,14 +173,62 @@ class Board:
                 return
             promotion_piece = PieceType(choice.file - 1)
         if self.chess.move_from_position(from_square, to_square, promotion_piece):
-            self.brute_force_update()
+            self.update_squares(self.last_move_squares())
+            if self.chess.is_game_over():
+                print(f"Game over: {self.chess.status().name}")
+            elif self.engine is not None:
+                record = self.chess.board.undo_stack.peek()
+                assert record is not None
+                self.engine.opponent_moved(self.chess.fen(), move_notation(record.move))
+
+    def engine_move(self, move: str, expected_reply: Optional[str]):
+        """Make the engine's move, called on the main loop, then ponder on the reply it expects."""
+        assert self.engine is not None
+        self.chess.move_from_uci(move)
+        self.update_squares(self.last_move_squares())
+        if self.chess.is_game_over():
+            print(f"Game over: {self.chess.status().name}")
+        elif expected_reply is not None:
+            self.engine.ponder(self.chess.fen(), expected_reply)
 
     def undo_move(self):
-        """Undo the last legal move and update the GUI."""
+        """Undo the last legal move and update the GUI.
+
+        Against the engine, its search is cancelled and moves are undone until it is the player's turn.
+        """
+        if self.engine is not None:
+            self.engine.cancel()
+        self.undo_ply()
+        while self.engine_to_move and self.chess.board.undo_stack:
+            self.undo_ply()
+        if self.engine is not None and self.engine_to_move:
+            self.engine.think(self.chess.fen())
+        self.update_highlights()
+
+    def undo_ply(self):
+        squares = self.last_move_squares()
         self.chess.undo_move()
-        self.brute_force_update()
+        self.update_squares(squares)
 
 
 def promotion_piece_selected(choice: Square, from_rank: int) -> bool:
     """Returns a bool indicating if a promotion piece was selected by the player."""
     return (choice.file in range(2, 6)) and (choice.rank == from_rank)
+
+
+def move_squares(packed: int) -> list[Square]:
+    """Get the squares whose pieces change when a packed move is made or undone.
+
+    These are the from and to squares, plus the captured pawn's square of an en-passant capture and the rook's squares of castling.
+    """
+    from_ = packed & FROM_MASK
+    to = (packed >> TO_SHIFT) & FROM_MASK
+    squares = [Square(*divmod(from_, 8)), Square(*divmod(to, 8))]
+    flags = packed >> FLAGS_SHIFT
+    if flags & EN_PASSANT_FLAG:
+        # the captured pawn is beside the capturing pawn, on the rank it moved from
+        squares.append(Square(from_ // 8, to % 8))
+    elif flags & CASTLING_FLAG:
+        side = CASTLING_SIDE_BY_KING_TO[to]
+        squares += [Square(*divmod(side.rook_from, 8)), Square(*divmod(side.rook_to, 8))]
+    return squares
@@ -0,0 +1,132 @@
+import queue
+import threading
+from collections.abc import Callable
+from typing import Optional
+
+import pyglet
+from core.chess import BoardBackend
+from core.chess import Chess
+from core.notation import move_notation
+from core.search import Search
+from core.search import SearchInfo
+from core.search import SearchLimits
+
+# Seconds the engine thinks for on its own time
+ENGINE_MOVETIME = 2.0
+# Seconds between checks of the main loop for a finished search
+POLL_INTERVAL = 1 / 30
+
+# Called on the main loop with the engine's move and the reply it expects, in long algebraic notation
+MoveCallback = Callable[[str, Optional[str]], None]
+
+
+class EngineWorker:
+    """Searches copies of positions on a worker thread, posting the best moves back to the pyglet main loop.
+
+    After the engine moves it ponders: it searches the position after the reply it expects on the opponent's time.
+    If the opponent plays that reply, the search carries on with a time limit, otherwise it is cancelled and restarted.
+    Cancelled searches are left to stop on their own, and their results are ignored.
+    """
+    on_move: MoveCallback
+    movetime: float
+    backend: BoardBackend
+    _search: Optional[Search]
+    # The expected reply being pondered on, or None when thinking on the engine's own time or idle
+    _ponder_move: Optional[str]
+    # A ponder search which finished before the opponent moved
+    _ponder_result: Optional[SearchInfo]
+    # Incremented on each new search, so results of cancelled searches can be told apart
+    _generation: int
+    _results: "queue.Queue[tuple[int, Optional[SearchInfo]]]"
+    _polling: bool
+
+    def __init__(self, on_move: MoveCallback, movetime: float = ENGINE_MOVETIME, backend: BoardBackend = BoardBackend.OBJECT):
+        self.on_move = on_move
+        self.movetime = movetime
+        self.backend = backend
+        self._search = None
+        self._ponder_move = None
+        self._ponder_result = None
+        self._generation = 0
+        self._results = queue.Queue()
+        self._polling = False
+
+    @property
+    def thinking(self) -> bool:
+        """Whether the engine is searching for its own move."""
+        return self._search is not None and self._ponder_move is None
+
+    def think(self, fen: str) -> None:
+        """Start searching for the engine's move in a position, cancelling any other search."""
+        self.cancel()
+        self._start(Chess(fen, self.backend), SearchLimits(movetime=self.movetime))
+
+    def ponder(self, fen: str, expected_move: str) -> None:
+        """Start searching the position after the expected reply to the engine's move, without a time limit."""
+        self.cancel()
+        chess = Chess(fen, self.backend)
+        try:
+            chess.move_from_uci(expected_move)
+        except ValueError:
+            return
+        self._ponder_move = expected_move
+        self._start(chess, SearchLimits())
+
+    def opponent_moved(self, fen: str, move: str) -> None:
+        """Carry on pondering if the opponent played the expected reply, otherwise start thinking in the new position."""
+        if self._search is None or move != self._ponder_move:
+            self.think(fen)
+            return
+        self._ponder_move = None
+        if self._ponder_result is not None:
+            self._deliver(self._ponder_result)
+        else:
+            self._search.ponderhit(self.movetime)
+
+    def cancel(self) -> None:
+        """Stop any search without waiting for it, ignoring its result."""
+        if self._search is not None:
+            self._search.stop()
+        self._search = None
+        self._ponder_move = None
+        self._ponder_result = None
+        self._generation += 1
+        self._stop_polling()
+
+    def _start(self, chess: Chess, limits: SearchLimits) -> None:
+        self._search = Search(chess.board, limits, None)
+        threading.Thread(target=self._run, args=(self._search, self._generation), daemon=True).start()
+        if not self._polling:
+            pyglet.clock.schedule_interval(self._poll, POLL_INTERVAL)
+            self._polling = True
+
+    def _run(self, search: Search, generation: int) -> None:
+        self._results.put((generation, search.run()))
+
+    def _poll(self, dt: float) -> None:
+        """Take the result of the current search off the queue on the main loop."""
+        while not self._results.empty():
+            generation, result = self._results.get()
+            if generation != self._generation:
+                continue
+            if result is None:
+                # the searched side has no legal moves
+                self.cancel()
+            elif self._ponder_move is not None:
+                # keep the result until the opponent plays the expected reply
+                self._ponder_result = result
+                self._stop_polling()
+            else:
+                self._deliver(result)
+
+    def _deliver(self, result: SearchInfo) -> None:
+        self._search = None
+        self._ponder_result = None
+        self._stop_polling()
+        expected_move = move_notation(result.pv[1]) if len(result.pv) > 1 else None
+        self.on_move(move_notation(result.pv[0]), expected_move)
+
+    def _stop_polling(self) -> None:
+        if self._polling:
+            pyglet.clock.unschedule(self._poll)
+            self._polling = False
@@ -12,9 +12,10 @@ class Game(pyglet.window.Window):
     board: Board
     promotion_overlay: PromotionOverlay
 
-    def __init__(self, layout: Layout, fen: str = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"):
+    def __init__(self, layout: Layout, fen: str = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+                 engine_colour: Optional[ColourType] = None):
         super().__init__(layout.board_size, layout.board_size, caption="Chess")
-        self.board = Board(fen, layout)
+        self.board = Board(fen, layout, engine_colour)
         self.promotion_overlay = PromotionOverlay(layout)
 
     def on_draw(self):
@@ -0,0 +1,70 @@
+import argparse
+import random
+import statistics
+import time
+from collections.abc import Callable
+
+from core.notation import move_notation
+from core.square import Square
+from gui.board import Board
+from gui.layout import Layout
+from gui.sprites import piece_sprites_generator
+
+# Updates a board's sprites given the squares changed by a move
+SpriteUpdate = Callable[[Board, list[Square]], None]
+
+
+def rebuild_sprites(board: Board, squares: list[Square]) -> None:
+    """Delete and recreate every piece sprite, as the GUI did before updating only the changed squares."""
+    for rank in board.piece_sprites:
+        for sprite in rank:
+            if sprite is not None:
+                sprite.delete()
+    board.piece_sprites = piece_sprites_generator(board.chess.board.state, board.layout, board.main_batch, board.pieces_group)
+
+
+def update_changed_squares(board: Board, squares: list[Square]) -> None:
+    board.update_squares(squares)
+
+
+def play_random_game(board: Board, update: SpriteUpdate, plies: int, rng: random.Random) -> list[float]:
+    """Play random legal moves then undo them, timing the sprite update after each move and undo in seconds."""
+    latencies = []
+    for _ in range(plies):
+        board.chess.board._generate_legal_moves()
+        if not board.chess.board.legal_moves:
+            break
+        board.chess.move_from_uci(move_notation(rng.choice(board.chess.board.legal_moves)))
+        squares = board.last_move_squares()
+        start = time.perf_counter()
+        update(board, squares)
+        latencies.append(time.perf_counter() - start)
+    while board.chess.board.undo_stack:
+        squares = board.last_move_squares()
+        board.chess.undo_move()
+        start = time.perf_counter()
+        update(board, squares)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def benchmark_updates(games: int, plies: int) -> None:
+    """Compare the per-move latency of updating only the changed squares' sprites with rebuilding every sprite."""
+    board = Board("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1", Layout(512, 45, (5, 10)))
+    for name, update in (("rebuild", rebuild_sprites), ("diff", update_changed_squares)):
+        rng = random.Random(0)
+        latencies = []
+        for _ in range(games):
+            latencies += play_random_game(board, update, plies, rng)
+        latencies.sort()
+        print(f"{name:<8} updates {len(latencies):>6} | mean {statistics.mean(latencies) * 1000:7.3f}ms"
+              f" | median {latencies[len(latencies) // 2] * 1000:7.3f}ms | p99 {latencies[len(latencies) * 99 // 100] * 1000:7.3f}ms"
+              f" | max {latencies[-1] * 1000:7.3f}ms")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="GUI benchmarks, which can run without a display with PYGLET_HEADLESS=true")
+    parser.add_argument("--games", type=int, default=20)
+    parser.add_argument("--plies", type=int, default=80)
+    args = parser.parse_args()
+    benchmark_updates(args.games, args.plies)
@@ -1,14 +1,17 @@
 import gui.game
 import gui.layout
 import pyglet
+from core.piece import ColourType
 
 if __name__ == '__main__':
     layout = gui.layout.Layout(512, 45, (5, 10))
     fen = input("Enter FEN to start from a position or leave empty for a new game: ")
     # TODO: validate FEN
+    engine_side = input("Enter w or b for the engine to play white or black, or leave empty for two players: ")
+    engine_colour = {"w": ColourType.WHITE, "b": ColourType.BLACK}.get(engine_side.strip().lower())
     if fen:
-        main = gui.game.Game(layout, fen)
+        main = gui.game.Game(layout, fen, engine_colour)
     else:
-        main = gui.game.Game(layout)
+        main = gui.game.Game(layout, engine_colour=engine_colour)
     # test = gui.game.Game(layout, "8/8/8/8/8/8/1ppp4/8 w KQkq - 0 1")
     pyglet.app.run()
@@ -0,0 +1,53 @@
+import random
+
+import pytest
+from core.bitboard import BitBoard
+from core.board import Board
+from core.chess import START_FEN
+from core.evaluation import compute_score
+from core.move import MOVE_KEY_MASK
+from core.perft import PERFT_SUITE
+from core.perft import PerftPosition
+
+GAME_COUNT = 4
+MAX_PLIES = 80
+
+
+@pytest.mark.parametrize("position", PERFT_SUITE, ids=lambda position: position.name)
+def test_incremental_score_matches_full_evaluation(position: PerftPosition) -> None:
+    rng = random.Random(position.name)
+    fen = position.fen.split()[:5]
+    for _ in range(GAME_COUNT):
+        board = Board(fen)
+        bit_board = BitBoard(fen)
+        board.verify_score = bit_board.verify_score = True
+        start_score = board.score
+        plies = 0
+        for _ in range(MAX_PLIES):
+            board._generate_legal_moves()
+            if not board.legal_moves:
+                break
+            move = rng.choice(board.legal_moves)
+            bit_move = bit_board.legal_move_index().get(move.packed & MOVE_KEY_MASK)
+            assert bit_move is not None
+            board._make_move(move)
+            bit_board._make_move(bit_move)
+            plies += 1
+            assert board.score == bit_board.score == compute_score(board.state)
+            assert board.evaluate() == bit_board.evaluate()
+        for _ in range(plies):
+            board.undo_move()
+            bit_board.undo_move()
+        assert board.score == bit_board.score == start_score
+
+
+@pytest.mark.parametrize("board_class", [Board, BitBoard], ids=lambda board_class: board_class.__name__)
+def test_evaluation_is_symmetric(board_class: type) -> None:
+    assert board_class(START_FEN.split()[:5]).evaluate() == 0
+    # the side to move sees the score from its own perspective
+    white_up_a_queen = board_class("4k3/8/8/8/8/8/8/3QK3 w - -".split())
+    black_to_move = board_class("4k3/8/8/8/8/8/8/3QK3 b - -".split())
+    mirrored = board_class("3qk3/8/8/8/8/8/8/4K3 b - -".split())
+    assert white_up_a_queen.evaluate() > 800
+    assert black_to_move.evaluate() == -white_up_a_queen.evaluate()
+    assert mirrored.evaluate() == white_up_a_queen.evaluate()
@@ -0,0 +1,39 @@
+import pytest
+from core.bitboard import BitBoard
+from core.board import Board
+from core.chess import BoardBackend
+from core.chess import make_board
+from core.perft import perft
+from core.perft import PERFT_SUITE
+from core.perft import PerftPosition
+
+PERFT_DEPTH = 3
+
+
+def _suite_ids(position: PerftPosition) -> str:
+    return position.name
+
+
+@pytest.mark.parametrize("position", PERFT_SUITE, ids=_suite_ids)
+def test_pin_aware_legal_moves_match_brute_force(position: PerftPosition) -> None:
+    board = Board(position.fen.split()[:5])
+    for move in board._brute_force_legal_moves():
+        board._make_move(move)
+        assert sorted(move.packed for move in board._pin_aware_legal_moves()) == sorted(move.packed for move in board._brute_force_legal_moves())
+        board.undo_move()
+
+
+@pytest.mark.parametrize("position", PERFT_SUITE, ids=_suite_ids)
+def test_bitboard_pin_aware_legal_moves_match_brute_force(position: PerftPosition) -> None:
+    board = BitBoard(position.fen.split()[:5])
+    for move in board._brute_force_legal_moves(board._get_pseudo_legal_moves()):
+        board._make_move(move)
+        pseudo_legal_moves = board._get_pseudo_legal_moves()
+        assert sorted(board._pin_aware_legal_moves(pseudo_legal_moves)) == sorted(board._brute_force_legal_moves(pseudo_legal_moves))
+        board.undo_move()
+
+
+@pytest.mark.parametrize("backend", list(BoardBackend), ids=lambda backend: backend.name)
+@pytest.mark.parametrize("position", PERFT_SUITE, ids=_suite_ids)
+def test_perft(position: PerftPosition, backend: BoardBackend) -> None:
+    assert perft(make_board(position.fen, backend), PERFT_DEPTH) == position.expected_nodes(PERFT_DEPTH)
@@ -0,0 +1,50 @@
+from core.bitboard import BitBoard
+from core.board import Board
+from core.move import CASTLING_FLAG
+from core.move import DOUBLE_STEP_FLAG
+from core.move import EN_PASSANT_FLAG
+from core.move import Move
+from core.move import PackedMove
+from core.perft import PERFT_SUITE
+
+
+def _check_round_trip(board: Board, seen_flags: set[str]) -> None:
+    """Pack and unpack each legal move of the board, recording the kinds of move seen."""
+    board._generate_legal_moves()
+    for move in board.legal_moves:
+        packed = PackedMove.from_move(move)
+        unpacked = packed.to_move(board.state)
+        assert type(unpacked) is type(move)
+        assert unpacked == move and unpacked.packed == move.packed
+        assert (unpacked.from_, unpacked.to_) == (move.from_, move.to_)
+        assert (unpacked.moved_piece, unpacked.captured_piece) == (move.moved_piece, move.captured_piece)
+        assert repr(packed) == repr(PackedMove(packed.key))
+        if packed.promotion is not None:
+            seen_flags.add("promotion")
+        for name, flag in (("en passant", EN_PASSANT_FLAG), ("double step", DOUBLE_STEP_FLAG), ("castling", CASTLING_FLAG)):
+            if packed.flags & flag:
+                seen_flags.add(name)
+
+
+def _legal_packed_moves(board: Board) -> list[int]:
+    board._generate_legal_moves()
+    return sorted(move.packed for move in board.legal_moves)
+
+
+def test_packed_moves_round_trip() -> None:
+    seen_flags: set[str] = set()
+    for position in PERFT_SUITE:
+        board = Board(position.fen.split()[:5])
+        bit_board = BitBoard(position.fen.split()[:5])
+        _check_round_trip(board, seen_flags)
+        assert _legal_packed_moves(board) == sorted(bit_board.legal_move_index().by_key.values())
+        root_moves: list[Move] = list(board.legal_moves)
+        for move in root_moves:
+            board._make_move(move)
+            bit_board._make_move(move.packed)
+            _check_round_trip(board, seen_flags)
+            assert _legal_packed_moves(board) == sorted(bit_board.legal_move_index().by_key.values())
+            bit_board.undo_move()
+            board.undo_move()
+    # every kind of move appears within two plies of the suite positions
+    assert seen_flags == {"promotion", "en passant", "double step", "castling"}
@@ -0,0 +1,145 @@
+import random
+
+import pytest
+from core.chess import AnyBoard
+from core.chess import BoardBackend
+from core.chess import make_board
+from core.move import CASTLING_FLAG
+from core.move import EN_PASSANT_FLAG
+from core.move import FROM_MASK
+from core.move import PackedMove
+from core.move import TO_SHIFT
+from core.notation import AnyMove
+from core.notation import move_notation
+from core.notation import packed_move
+from core.notation import SAN_PIECE_TYPES
+from core.notation import san_to_move
+from core.perft import PERFT_SUITE
+from core.perft import PerftPosition
+from core.pgn import iter_fens
+from core.pgn import parse_games
+from core.pgn import PgnError
+from core.pgn import read_games
+from core.pgn import replay_game
+from core.piece import PieceType
+from util import write_chess_notation
+
+BACKENDS = list(BoardBackend)
+# [PieceType value] SAN piece letter
+SAN_LETTERS: dict[int, str] = {value: letter for letter, value in SAN_PIECE_TYPES.items()}
+
+OPERA_GAME = """[Event "Paris"]
+[White "Morphy, Paul"]
+[Black "Duke Karl / Count Isouard"]
+[Result "1-0"]
+
+1. e4 e5 2. Nf3 d6 3. d4 Bg4 {This is a weak move already.} 4. dxe5 Bxf3 5. Qxf3 dxe5
+6. Bc4 Nf6 7. Qb3 Qe7 (7... Qd7 8. Qxb7) 8. Nc3 c6 9. Bg5 $6 b5 10. Nxb5 cxb5
+11. Bxb5+ Nbd7 12. O-O-O Rd8 13. Rxd7 Rxd7 14. Rd1 Qe6 15. Bxd7+ Nxd7 ; a comment to the end of the line
+16. Qb8+ Nxb8 17. Rd8# 1-0
+"""
+OPERA_GAME_FEN = "1n1Rkb1r/p4ppp/4q3/4p1B1/4P3/8/PPP2PPP/2K5 b k - 1 17"
+
+# En passant, an underpromotion with check, and move numbers written on their moves
+SET_UP_GAME = """[FEN "4k3/1P6/8/3pP3/8/8/8/4K3 w - d6 0 1"]
+
+1.exd6 Kd7 2.b8=N+ Kxd6 *
+"""
+SET_UP_GAME_FEN = "1N6/8/3k4/8/8/8/8/4K3 w - - 0 3"
+
+
+def _san(board: AnyBoard, move: AnyMove) -> str:
+    """Write the SAN of a legal move of a board, without check and checkmate suffixes."""
+    packed = PackedMove(packed_move(move))
+    if packed.flags & CASTLING_FLAG:
+        return "O-O" if packed.to_index & 7 == 6 else "O-O-O"
+    moved, captured = board.move_pieces(move)
+    capture = "x" if captured != -1 or packed.flags & EN_PASSANT_FLAG else ""
+    from_square = packed.from_square
+    destination = write_chess_notation(packed.to_square)
+    if moved == PieceType.PAWN.value:
+        # a pawn is named by its file when it captures
+        promotion = packed.promotion
+        return ((write_chess_notation(from_square)[0] if capture else "") + capture + destination
+                + (f"={SAN_LETTERS[promotion.value]}" if promotion is not None else ""))
+    rivals = [PackedMove(packed_move(rival)).from_square for rival in board.legal_moves
+              if board.move_key(rival) != board.move_key(move) and board.move_pieces(rival)[0] == moved
+              and packed_move(rival) >> TO_SHIFT & FROM_MASK == packed.to_index]
+    notation = write_chess_notation(from_square)
+    if not rivals:
+        disambiguation = ""
+    elif all(rival.file != from_square.file for rival in rivals):
+        disambiguation = notation[0]
+    elif all(rival.rank != from_square.rank for rival in rivals):
+        disambiguation = notation[1]
+    else:
+        disambiguation = notation
+    return SAN_LETTERS[moved] + disambiguation + capture + destination
+
+
+@pytest.mark.parametrize("backend", BACKENDS, ids=lambda backend: backend.name)
+@pytest.mark.parametrize("position", PERFT_SUITE, ids=lambda position: position.name)
+def test_san_round_trips_every_legal_move(position: PerftPosition, backend: BoardBackend) -> None:
+    rng = random.Random(position.name)
+    board = make_board(position.fen, backend)
+    for _ in range(40):
+        board._generate_legal_moves()
+        moves = list(board.legal_moves)
+        if not moves:
+            break
+        for move in moves:
+            san = _san(board, move)
+            assert packed_move(san_to_move(board, san)) == packed_move(move), san
+        board._make_move(rng.choice(moves))
+
+
+@pytest.mark.parametrize("backend", BACKENDS, ids=lambda backend: backend.name)
+def test_san_rejects_illegal_and_ambiguous_moves(backend: BoardBackend) -> None:
+    board = make_board("4k3/8/8/8/8/8/8/1N2KN2 w - - 0 1", backend)
+    assert move_notation(san_to_move(board, "Nbd2")) == "b1d2"
+    assert move_notation(san_to_move(board, "Nfd2")) == "f1d2"
+    with pytest.raises(ValueError, match="Ambiguous"):
+        san_to_move(board, "Nd2")
+    with pytest.raises(ValueError, match="Illegal"):
+        san_to_move(board, "Qd2")
+    with pytest.raises(ValueError, match="Invalid"):
+        san_to_move(board, "Nz9")
+
+
+@pytest.mark.parametrize("backend", BACKENDS, ids=lambda backend: backend.name)
+def test_replayed_games_reach_their_final_positions(backend: BoardBackend) -> None:
+    games = list(parse_games((OPERA_GAME + "\n" + SET_UP_GAME).splitlines()))
+    assert [game.result for game in games] == ["1-0", "*"]
+    opera_game, set_up_game = games
+    assert opera_game.tags["White"] == "Morphy, Paul"
+    # the comments, variation and NAG are skipped
+    assert len(opera_game.moves) == 33
+    assert "Qd7" not in opera_game.moves
+
+    fens = [chess.fen() for chess in replay_game(opera_game, backend=backend)]
+    assert len(fens) == 34
+    assert fens[-1] == OPERA_GAME_FEN
+    chess = None
+    for chess in replay_game(set_up_game, backend=backend):
+        pass
+    assert chess is not None and chess.fen() == SET_UP_GAME_FEN
+    # undoing every move goes back to the starting position
+    for _ in set_up_game.moves:
+        chess.undo_move()
+    assert chess.fen() == set_up_game.fen
+
+
+@pytest.mark.parametrize("backend", BACKENDS, ids=lambda backend: backend.name)
+def test_illegal_moves_skip_the_rest_of_the_game(tmp_path, backend: BoardBackend) -> None:
+    path = tmp_path / "games.pgn"
+    path.write_text("1. e4 e5 2. Ke3 Nc6 *\n\n" + SET_UP_GAME)
+    games = list(read_games(str(path)))
+    with pytest.raises(PgnError, match="ply 3"):
+        for _ in replay_game(games[0], backend=backend):
+            pass
+    fens = list(iter_fens(str(path), backend))
+    # the first game's starting position and two moves, then the whole second game
+    assert len(fens) == 3 + 5
+    assert fens[-1] == SET_UP_GAME_FEN
+    (tmp_path / "empty.pgn").write_bytes(b"")
+    assert list(read_games(str(tmp_path / "empty.pgn"))) == []
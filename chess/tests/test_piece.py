@@ -0,0 +1,37 @@
+import copy
+import pickle
+from collections.abc import Callable
+
+import pytest
+from core.board import Board
+from core.move import Move
+from core.piece import piece_code
+from core.piece import PIECES
+
+KIWIPETE_FEN = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"
+
+
+@pytest.mark.parametrize("piece", PIECES, ids=repr)
+def test_pieces_copy_as_the_shared_piece(piece: object) -> None:
+    assert pickle.loads(pickle.dumps(piece)) is piece
+    assert copy.copy(piece) is piece
+    assert copy.deepcopy(piece) is piece
+
+
+def test_piece_is_immutable() -> None:
+    with pytest.raises(AttributeError):
+        PIECES[0].fen = "Q"
+
+
+@pytest.mark.parametrize("clone", [lambda board: pickle.loads(pickle.dumps(board)), copy.deepcopy], ids=["pickle", "deepcopy"])
+def test_board_clones_keep_playing(clone: Callable[[Board], Board]) -> None:
+    board = Board(KIWIPETE_FEN.split()[:5])
+    board._generate_legal_moves()
+    move: Move = board.legal_moves[0]
+    board._make_move(move)
+    cloned = clone(board)
+    assert cloned.fen() == board.fen()
+    assert all(square.piece is None or square.piece is PIECES[piece_code(square.piece)] for rank in cloned.state for square in rank)
+    cloned.undo_move()
+    assert cloned.fen() == " ".join(KIWIPETE_FEN.split()[:4])
+    assert board.fen() != cloned.fen()
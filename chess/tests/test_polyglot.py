@@ -0,0 +1,84 @@
+import random
+from collections import Counter
+
+import pytest
+from core.chess import BoardBackend
+from core.chess import Chess
+from core.chess import make_board
+from core.chess import START_FEN
+from core.polyglot import ENTRY_STRUCT
+from core.polyglot import polyglot_key
+from core.polyglot import PolyglotBook
+from util import read_chess_notation
+
+# The reference keys of the Polyglot book format, after each move from the starting position
+REFERENCE_KEYS: list[tuple[list[str], int]] = [
+    ([], 0x463b96181691fc9c),
+    (["e2e4"], 0x823c9b50fd114196),
+    (["e2e4", "d7d5"], 0x0756b94461c50fb0),
+    (["e2e4", "d7d5", "e4e5"], 0x662fafb965db29d4),
+    (["e2e4", "d7d5", "e4e5", "f7f5"], 0x22a48b5a8e47ff78),
+    (["e2e4", "d7d5", "e4e5", "f7f5", "e1e2"], 0x652a607ca3f242c1),
+    (["e2e4", "d7d5", "e4e5", "f7f5", "e1e2", "e8f7"], 0x00fdd303c946bdd9),
+    (["a2a4", "b7b5", "h2h4", "b5b4", "c2c4"], 0x3c8123ea7b067637),
+    (["a2a4", "b7b5", "h2h4", "b5b4", "c2c4", "b4c3", "a1a3"], 0x5c3f9b829b279560),
+]
+CASTLING_FEN = "r3k2r/pppppppp/8/8/8/8/PPPPPPPP/R3K2R w KQkq - 0 1"
+
+
+def _polyglot_move(uci: str) -> int:
+    """Encode a move as Polyglot does: to | from << 6, with the squares as file + rank * 8."""
+    from_, to = read_chess_notation(uci[:2]), read_chess_notation(uci[2:])
+    return (to.rank * 8 + to.file) | (from_.rank * 8 + from_.file) << 6
+
+
+def _write_book(path: str, entries: list[tuple[int, str, int]]) -> None:
+    with open(path, "wb") as book_file:
+        # entries are sorted by key, keeping the order of the moves of a position
+        for key, uci, weight in sorted(entries, key=lambda entry: entry[0]):
+            book_file.write(ENTRY_STRUCT.pack(key, _polyglot_move(uci), weight, 0))
+
+
+@pytest.mark.parametrize("backend", list(BoardBackend), ids=lambda backend: backend.name)
+@pytest.mark.parametrize("moves, key", REFERENCE_KEYS, ids=lambda value: f"{value:016x}" if isinstance(value, int) else None)
+def test_reference_keys(moves: list[str], key: int, backend: BoardBackend) -> None:
+    chess = Chess(START_FEN, backend)
+    for uci in moves:
+        chess.move_from_uci(uci)
+    assert polyglot_key(chess.fen()) == key
+
+
+@pytest.fixture
+def book_path(tmp_path) -> str:
+    path = str(tmp_path / "book.bin")
+    start_key = polyglot_key(START_FEN)
+    _write_book(path, [(start_key, "e2e4", 3), (start_key, "d2d4", 1), (start_key, "g1f3", 0),
+                       # an illegal move, as from a book with a key collision, is skipped
+                       (start_key, "e2e5", 5),
+                       (start_key - 1, "a2a3", 1), (start_key + 1, "h2h3", 1),
+                       # Polyglot writes castling as the king taking its rook
+                       (polyglot_key(CASTLING_FEN), "e1h1", 1)])
+    return path
+
+
+@pytest.mark.parametrize("backend", list(BoardBackend), ids=lambda backend: backend.name)
+def test_book_entries_and_weighted_choice(book_path: str, backend: BoardBackend) -> None:
+    with PolyglotBook(book_path) as book:
+        assert len(book) == 7
+        board = make_board(START_FEN, backend)
+        assert [(repr(entry.move), entry.weight) for entry in book.entries(board)] == [("e2e4", 3), ("d2d4", 1), ("g1f3", 0)]
+        rng = random.Random(0)
+        choices = Counter(repr(book.choose(board, rng)) for _ in range(4000))
+        # moves are chosen in proportion to their weights, and never with no weight
+        assert set(choices) == {"e2e4", "d2d4"}
+        assert choices["e2e4"] / choices["d2d4"] == pytest.approx(3, rel=0.15)
+        assert repr(book.choose(make_board(CASTLING_FEN, backend))) == "e1g1"
+        assert book.choose(make_board("4k3/8/8/8/8/8/8/4K3 w - - 0 1", backend)) is None
+
+
+def test_empty_book(tmp_path) -> None:
+    path = str(tmp_path / "empty.bin")
+    _write_book(path, [])
+    with PolyglotBook(path) as book:
+        assert len(book) == 0
+        assert book.choose(make_board(START_FEN)) is None
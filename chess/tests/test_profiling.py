@@ -0,0 +1,59 @@
+import io
+import pstats
+
+import pytest
+from core.chess import BoardBackend
+from core.chess import make_board
+from core.perft import perft
+from core.perft import PERFT_SUITE
+from core.profiling import BoardProfiler
+
+KIWIPETE = PERFT_SUITE[1]
+
+
+@pytest.mark.parametrize("backend", list(BoardBackend), ids=lambda backend: backend.name)
+def test_profiler_counts_calls_and_callers(backend: BoardBackend) -> None:
+    board = make_board(KIWIPETE.fen, backend)
+    with BoardProfiler(board) as profiler:
+        assert profiler.enabled
+        assert perft(board, 2) == KIWIPETE.expected_nodes(2)
+    assert not profiler.enabled
+    stats = profiler.as_dict()
+    root_moves = KIWIPETE.expected_nodes(1)
+    assert stats["_make_move"]["calls"] >= root_moves
+    assert stats["undo_move"]["calls"] == stats["_make_move"]["calls"]
+    assert stats["_generate_legal_moves"]["calls"] == 1 + root_moves
+    for method_stats in stats.values():
+        assert method_stats["total_time"] <= method_stats["cumulative_time"] + 1e-9
+
+    pstats_dict = profiler.pstats_dict()
+    assert any(callers for *_, callers in pstats_dict.values())
+    for primitive_calls, calls, total_time, cumulative_time, callers in pstats_dict.values():
+        assert primitive_calls == calls
+        for caller_key, caller_stats in callers.items():
+            # pstats expects the same four numbers for each caller as for the function
+            assert len(caller_stats) == 4
+            caller_calls, _, caller_total_time, caller_cumulative_time = caller_stats
+            assert caller_calls <= calls and caller_key in pstats_dict
+            assert caller_total_time <= total_time + 1e-9 and caller_cumulative_time <= cumulative_time + 1e-9
+
+
+def test_dumped_stats_load_in_pstats(tmp_path) -> None:
+    board = make_board(KIWIPETE.fen, BoardBackend.OBJECT)
+    with BoardProfiler(board) as profiler:
+        perft(board, 2)
+    path = str(tmp_path / "board.prof")
+    profiler.dump_stats(path)
+    output = io.StringIO()
+    loaded = pstats.Stats(path, stream=output)
+    calls = sum(stats.calls for stats in profiler.stats.values())
+    profile = loaded.get_stats_profile()
+    assert sum(int(function.ncalls) for function in profile.func_profiles.values()) == calls
+    loaded.sort_stats("cumulative").print_stats()
+    loaded.print_callers()
+    loaded.print_callees()
+    assert "_generate_legal_moves" in output.getvalue()
+    # profiling a second board adds up with the first
+    loaded.add(path)
+    profile = loaded.get_stats_profile()
+    assert sum(int(function.ncalls) for function in profile.func_profiles.values()) == 2 * calls
@@ -0,0 +1,40 @@
+import pytest
+from core.chess import BoardBackend
+from core.chess import make_board
+from core.perft import PERFT_SUITE
+from core.perft import PerftPosition
+from core.search import INFINITE_SCORE
+from core.search import MATE_SCORE
+from core.search import Search
+from core.search import search
+from core.search import SearchLimits
+
+BACK_RANK_MATE_FEN = "6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1"
+CHECKMATED_FEN = "3R2k1/5ppp/8/8/8/8/5PPP/6K1 b - - 0 1"
+
+
+@pytest.mark.parametrize("backend", list(BoardBackend), ids=lambda backend: backend.name)
+@pytest.mark.parametrize("position", PERFT_SUITE, ids=lambda position: position.name)
+def test_staged_moves_yield_each_legal_move_once(position: PerftPosition, backend: BoardBackend) -> None:
+    board = make_board(position.fen, backend)
+    board._generate_legal_moves()
+    keys = sorted(board.move_key(move) for move in board.legal_moves)
+    hash_key = keys[len(keys) // 2]
+    staged_keys = [board.move_key(move) for move in board.staged_moves(hash_key, keys[:2], [0] * 4096)]
+    assert staged_keys[0] == hash_key
+    assert sorted(staged_keys) == keys
+
+
+@pytest.mark.parametrize("backend", list(BoardBackend), ids=lambda backend: backend.name)
+def test_search_finds_mate_in_one(backend: BoardBackend) -> None:
+    result = search(make_board(BACK_RANK_MATE_FEN, backend), SearchLimits(depth=3), report=None)
+    assert result is not None
+    assert repr(result).startswith("info depth 1 score mate 1 ")
+    assert repr(result).endswith(" pv d1d8")
+
+
+@pytest.mark.parametrize("backend", list(BoardBackend), ids=lambda backend: backend.name)
+def test_quiescence_scores_checkmate(backend: BoardBackend) -> None:
+    engine = Search(make_board(CHECKMATED_FEN, backend), report=None)
+    engine._max_nodes = engine._deadline = float("inf")
+    assert engine._quiescence(0, -INFINITE_SCORE, INFINITE_SCORE) == -MATE_SCORE
@@ -0,0 +1,76 @@
+import pytest
+from core.chess import BoardBackend
+from core.chess import Chess
+from core.status import FIFTY_MOVE_RULE_HALFMOVES
+from core.status import game_status
+from core.status import GameStatus
+from core.status import repetition_count
+
+BACKENDS = list(BoardBackend)
+
+
+@pytest.mark.parametrize("backend", BACKENDS, ids=lambda backend: backend.name)
+@pytest.mark.parametrize("fen, status", [
+    ("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1", GameStatus.IN_PROGRESS),
+    ("rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3", GameStatus.CHECKMATE),
+    ("7k/5Q2/6K1/8/8/8/8/8 b - - 0 1", GameStatus.STALEMATE),
+    ("8/8/4k3/8/8/3K4/8/8 w - - 0 1", GameStatus.INSUFFICIENT_MATERIAL),
+    ("8/8/4k3/8/8/3K4/8/6N1 w - - 0 1", GameStatus.INSUFFICIENT_MATERIAL),
+    ("8/8/4k2b/8/8/3K4/8/2B5 w - - 0 1", GameStatus.INSUFFICIENT_MATERIAL),
+    ("8/8/4k1b1/8/8/3K4/8/2B5 w - - 0 1", GameStatus.IN_PROGRESS),
+    ("8/8/4k3/8/8/3K4/8/5NN1 w - - 0 1", GameStatus.IN_PROGRESS),
+    ("8/8/4k3/8/8/3K4/4P3/8 w - - 0 1", GameStatus.IN_PROGRESS),
+    ("8/8/4k3/8/8/3K4/8/R7 w - - 99 80", GameStatus.IN_PROGRESS),
+    ("8/8/4k3/8/8/3K4/8/R7 w - - 100 80", GameStatus.FIFTY_MOVE_RULE),
+], ids=lambda value: value.name if isinstance(value, GameStatus) else None)
+def test_status_of_positions(fen: str, status: GameStatus, backend: BoardBackend) -> None:
+    chess = Chess(fen, backend)
+    assert chess.status() == status
+    assert chess.is_game_over() == (status != GameStatus.IN_PROGRESS)
+    assert status.is_draw == (status not in (GameStatus.IN_PROGRESS, GameStatus.CHECKMATE))
+
+
+@pytest.mark.parametrize("backend", BACKENDS, ids=lambda backend: backend.name)
+def test_checkmate_takes_precedence_over_the_fifty_move_rule(backend: BoardBackend) -> None:
+    chess = Chess(f"7k/8/6K1/8/8/8/8/Q7 w - - {FIFTY_MOVE_RULE_HALFMOVES - 1} 90", backend)
+    chess.move_from_uci("a1a8")
+    assert chess.halfmove_number == FIFTY_MOVE_RULE_HALFMOVES
+    assert chess.status() == GameStatus.CHECKMATE
+
+
+@pytest.mark.parametrize("backend", BACKENDS, ids=lambda backend: backend.name)
+def test_threefold_repetition(backend: BoardBackend) -> None:
+    chess = Chess(backend=backend)
+    shuffle = ["g1f3", "g8f6", "f3g1", "f6g8"]
+    for uci in shuffle:
+        chess.move_from_uci(uci)
+    assert repetition_count(chess.board) == 2
+    assert chess.status() == GameStatus.IN_PROGRESS
+    for uci in shuffle[:3]:
+        chess.move_from_uci(uci)
+    assert chess.status() == GameStatus.IN_PROGRESS
+    chess.move_from_uci(shuffle[3])
+    assert repetition_count(chess.board) == 3
+    assert chess.status() == GameStatus.THREEFOLD_REPETITION
+    # undoing the repetition recomputes the cached status
+    chess.undo_move()
+    assert chess.status() == GameStatus.IN_PROGRESS
+
+
+@pytest.mark.parametrize("backend", BACKENDS, ids=lambda backend: backend.name)
+def test_repetitions_stop_at_irreversible_moves(backend: BoardBackend) -> None:
+    chess = Chess(backend=backend)
+    for uci in ["g1f3", "g8f6", "f3g1", "f6g8", "e2e3", "e7e6"]:
+        chess.move_from_uci(uci)
+    for _ in range(2):
+        for uci in ["g1f3", "g8f6", "f3g1", "f6g8"]:
+            chess.move_from_uci(uci)
+    assert repetition_count(chess.board) == 3
+    assert game_status(chess.board) == GameStatus.THREEFOLD_REPETITION
+    # the first position can't be repeated after the pawn moves
+    assert chess.board.halfmove_clock == 8
+    # the same placement with different castling rights is a different position
+    chess = Chess(backend=backend)
+    for uci in ["e2e3", "e7e6", "g1f3", "g8f6", "f3g1", "f6g8", "e1e2", "e8e7", "e2e1", "e7e8", "g1f3", "g8f6", "f3g1", "f6g8"]:
+        chess.move_from_uci(uci)
+    assert repetition_count(chess.board) == 2
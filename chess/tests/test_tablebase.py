@@ -0,0 +1,152 @@
+import io
+import random
+from collections.abc import Iterator
+
+import numpy as np
+import pytest
+from core.board import EMPTY_SQUARE_COUNTS
+from core.chess import BoardBackend
+from core.chess import make_board
+from core.retrograde import _decode
+from core.retrograde import _encode
+from core.retrograde import generate_tablebase
+from core.retrograde import generation_order
+from core.retrograde import save_tablebase
+from core.tablebase import decode_value
+from core.tablebase import tablebase_index
+from core.tablebase import Tablebases
+from core.tablebase import Wdl
+from uci import UciEngine
+
+BACKENDS = list(BoardBackend)
+GENERATED_ENDINGS = generation_order(["KPK"])
+SAMPLE_COUNT = 500
+# [FEN] result with perfect play, and the plies to checkmate
+KNOWN_RESULTS: list[tuple[str, Wdl, int]] = [
+    ("Q6k/8/6K1/8/8/8/8/8 b - - 0 1", Wdl.LOSS, 0),
+    ("7k/8/6K1/8/8/8/8/1Q6 w - - 0 1", Wdl.WIN, 1),
+    ("7k/8/5K2/8/8/8/8/Q7 w - - 0 1", Wdl.WIN, 3),
+    # stalemate
+    ("k7/8/1Q6/8/8/8/8/K7 b - - 0 1", Wdl.DRAW, 0),
+    # the lone king takes the undefended rook
+    ("k7/1R6/8/8/8/8/8/7K b - - 0 1", Wdl.DRAW, 0),
+    ("6k1/8/6K1/8/8/8/8/R7 w - - 0 1", Wdl.WIN, 1),
+    # the king in front of its pawn on the sixth rank wins, the opposing king in front of the pawn draws
+    ("4k3/8/4K3/4P3/8/8/8/8 w - - 0 1", Wdl.WIN, 21),
+    ("4k3/8/4K3/4P3/8/8/8/8 b - - 0 1", Wdl.LOSS, 24),
+    ("8/8/8/8/8/4k3/4P3/4K3 w - - 0 1", Wdl.DRAW, 0),
+]
+
+
+@pytest.fixture(scope="module")
+def generated(tmp_path_factory) -> tuple[str, dict[str, np.ndarray]]:
+    """Generate the tables of the endings up to KPK, returning the temporary directory they are saved to and their entries."""
+    directory = str(tmp_path_factory.mktemp("tablebases"))
+    solved: dict[str, np.ndarray] = {}
+    for ending in GENERATED_ENDINGS:
+        solved[ending] = generate_tablebase(ending, solved)
+        save_tablebase(directory, ending, solved[ending])
+    return directory, solved
+
+
+@pytest.fixture
+def tablebases(generated: tuple[str, dict[str, np.ndarray]]) -> Iterator[Tablebases]:
+    with Tablebases(generated[0]) as tablebases:
+        yield tablebases
+
+
+def _fen(pieces: dict[int, str], side: str) -> str:
+    """Write the FEN of a placement of pieces by square index, without castling or en passant."""
+    empty_letters = {count: letter for letter, count in EMPTY_SQUARE_COUNTS.items()}
+    ranks = []
+    for rank in range(7, -1, -1):
+        rank_fen = ""
+        empty = 0
+        for file in range(8):
+            piece = pieces.get(rank * 8 + file)
+            if piece is None:
+                empty += 1
+                continue
+            rank_fen += (empty_letters[empty] if empty else "") + piece
+            empty = 0
+        ranks.append(rank_fen + (empty_letters[empty] if empty else ""))
+    return f"{'/'.join(ranks)} {side} - - 0 1"
+
+
+def test_index_round_trips() -> None:
+    rng = np.random.default_rng(0)
+    for piece_count in (3, 4):
+        squares = [rng.integers(0, 64, SAMPLE_COUNT) for _ in range(piece_count)]
+        for side in (0, 1):
+            indices = _encode(squares, side)
+            assert [tablebase_index([int(piece_squares[i]) for piece_squares in squares], side) for i in range(5)] == list(indices[:5])
+            assert all((decoded == piece_squares).all() for decoded, piece_squares in zip(_decode(indices, piece_count), squares))
+            assert (indices >> 6 * piece_count == side).all()
+
+
+def test_tables_read_back_their_entries(generated: tuple[str, dict[str, np.ndarray]], tablebases: Tablebases) -> None:
+    assert list(tablebases.tables) == GENERATED_ENDINGS
+    rng = random.Random(0)
+    for ending, values in generated[1].items():
+        table = tablebases.tables[ending]
+        assert table.ending == ending
+        for index in [0, len(values) - 1] + rng.sample(range(len(values)), SAMPLE_COUNT):
+            assert table.value(index) == values[index]
+            result = decode_value(int(values[index]))
+            assert result.dtm == (values[index] - 1 if values[index] else None)
+
+
+@pytest.mark.parametrize("backend", BACKENDS, ids=lambda backend: backend.name)
+@pytest.mark.parametrize("fen, wdl, dtm", KNOWN_RESULTS, ids=lambda value: value if isinstance(value, str) else None)
+def test_known_results(fen: str, wdl: Wdl, dtm: int, backend: BoardBackend, tablebases: Tablebases) -> None:
+    result = make_board(fen, backend).probe_tablebase(tablebases)
+    assert result is not None
+    assert (result.wdl, result.dtm if result.dtm is not None else 0) == (wdl, dtm)
+
+
+@pytest.mark.parametrize("ending", ["KRK", "KPK"])
+def test_colours_flip(ending: str, tablebases: Tablebases) -> None:
+    rng = random.Random(ending)
+    for _ in range(SAMPLE_COUNT):
+        squares = rng.sample(range(8, 56), len(ending))
+        side = rng.choice("wb")
+        white = _fen(dict(zip(squares, ending[:-1] + ending[-1].lower())), side)
+        # the same position with the colours swapped and the board flipped
+        black = _fen(dict(zip([square ^ 56 for square in squares], ending[:-1].lower() + ending[-1])), "b" if side == "w" else "w")
+        for backend in BACKENDS:
+            white_result = make_board(white, backend).probe_tablebase(tablebases)
+            black_result = make_board(black, backend).probe_tablebase(tablebases)
+            assert white_result is not None and black_result is not None
+            assert (white_result.wdl, white_result.dtm) == (black_result.wdl, black_result.dtm)
+
+
+@pytest.mark.parametrize("backend", BACKENDS, ids=lambda backend: backend.name)
+def test_probe_outside_the_tables(backend: BoardBackend, tablebases: Tablebases) -> None:
+    # castling rights aren't in the tables
+    assert make_board("4k3/8/8/8/8/8/8/4K2R w K - 0 1", backend).probe_tablebase(tablebases) is None
+    assert make_board("4k3/8/8/8/8/8/8/4K2R w - - 0 1", backend).probe_tablebase(tablebases) is not None
+    # endings which weren't generated, and material for both sides
+    assert make_board("4k3/8/8/8/8/8/8/2BNK3 w - - 0 1", backend).probe_tablebase(tablebases) is None
+    assert make_board("4k2r/8/8/8/8/8/8/4K2R w - - 0 1", backend).probe_tablebase(tablebases) is None
+    # a lone minor piece can't checkmate
+    result = make_board("4k3/8/8/8/8/8/8/3NK3 b - - 0 1", backend).probe_tablebase(tablebases)
+    assert result is not None and result.wdl == Wdl.DRAW
+
+
+@pytest.mark.parametrize("backend", BACKENDS, ids=lambda backend: backend.name)
+@pytest.mark.parametrize("fen, mate", [("7k/8/6K1/8/8/8/8/Q7 w - - 0 1", 1), ("7k/8/6K1/8/8/8/8/1Q6 w - - 0 1", 1),
+                                       ("7k/8/5K2/8/8/8/8/Q7 w - - 0 1", 2), ("4k3/8/4K3/4P3/8/8/8/8 w - - 0 1", 11)])
+def test_uci_reports_tablebase_mates(fen: str, mate: int, backend: BoardBackend, generated: tuple[str, dict[str, np.ndarray]]) -> None:
+    def mate_scores(tablebase_path: str, depth: int) -> list[str]:
+        output = io.StringIO()
+        engine = UciEngine(output, backend)
+        engine.handle(f"setoption name TablebasePath value {tablebase_path}")
+        engine.handle(f"position fen {fen}")
+        engine.handle(f"go depth {depth}")
+        engine.stop()
+        return [line.split(" score ")[1].split(" nodes ")[0] for line in output.getvalue().splitlines() if " score " in line]
+
+    assert mate_scores(generated[0], 1) == [f"mate {mate}"]
+    if mate <= 2:
+        # the search finds the same mate by itself
+        assert mate_scores("<empty>", 2 * mate)[-1] == f"mate {mate}"
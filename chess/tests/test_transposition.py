@@ -0,0 +1,68 @@
+import pytest
+from core.bitboard import BitBoard
+from core.board import Board
+from core.chess import START_FEN
+from core.notation import uci_to_move
+from core.perft import perft
+from core.perft import PERFT_SUITE
+from core.perft import PerftPosition
+from core.transposition import LegalMoveCache
+
+COLLISION_DEPTH = 3
+
+
+def test_cache_evicts_the_least_recently_used_position() -> None:
+    cache: LegalMoveCache[int] = LegalMoveCache(2)
+    cache.put(1, [10])
+    cache.put(2, [20])
+    assert cache.get(1) == [10]
+    cache.put(3, [30])
+    assert cache.get(2) is None
+    assert cache.get(1) == [10] and cache.get(3) == [30]
+    assert (cache.hits, cache.misses, len(cache)) == (3, 1, 2)
+
+
+@pytest.mark.parametrize("board_class", [Board, BitBoard], ids=lambda board_class: board_class.__name__)
+@pytest.mark.parametrize("position", PERFT_SUITE, ids=lambda position: position.name)
+def test_cached_moves_match_generated_moves(position: PerftPosition, board_class: type) -> None:
+    board = board_class(position.fen.split()[:5])
+    assert perft(board, 2) == position.expected_nodes(2)
+    # returning to the root position is answered from the cache with the moves a fresh board generates
+    hits = board.legal_move_cache.hits
+    board._generate_legal_moves()
+    assert board.legal_move_cache.hits == hits + 1
+    fresh_board = board_class(position.fen.split()[:5])
+    fresh_board._generate_legal_moves()
+    assert board.legal_moves == fresh_board.legal_moves
+
+
+@pytest.mark.parametrize("board_class", [Board, BitBoard], ids=lambda board_class: board_class.__name__)
+def test_transposition_hits_the_cache(board_class: type) -> None:
+    board = board_class(START_FEN.split()[:5])
+    for line in (["g1f3", "g8f6", "b1c3", "b8c6"], ["b1c3", "b8c6", "g1f3", "g8f6"]):
+        for uci in line:
+            board._make_move(uci_to_move(board, uci))
+        hits = board.legal_move_cache.hits
+        board._generate_legal_moves()
+        for _ in line:
+            board.undo_move()
+    assert board.legal_move_cache.hits == hits + 1
+
+
+def _collect_hashes(board: BitBoard, depth: int, fens: dict[int, str]) -> None:
+    fen = board.fen()
+    assert fens.setdefault(board.zobrist_hash, fen) == fen, "Two positions share a Zobrist hash"
+    if depth == 0:
+        return
+    board._generate_legal_moves()
+    for move in list(board.legal_moves):
+        board._make_move(move)
+        _collect_hashes(board, depth - 1, fens)
+        board.undo_move()
+
+
+@pytest.mark.parametrize("position", PERFT_SUITE, ids=lambda position: position.name)
+def test_positions_have_distinct_cache_keys(position: PerftPosition) -> None:
+    fens: dict[int, str] = {}
+    _collect_hashes(BitBoard(position.fen.split()[:5]), COLLISION_DEPTH, fens)
+    assert len(fens) > position.expected_nodes(COLLISION_DEPTH - 1)
@@ -0,0 +1,70 @@
+import io
+import time
+
+import pytest
+from core.chess import BoardBackend
+from core.chess import START_FEN
+from core.search import MAX_PLY
+from uci import limits_from_go
+from uci import UciEngine
+
+BACK_RANK_MATE_FEN = "6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1"
+# How long to give a search to finish before checking that it is holding its best move back
+SETTLE_TIME = 0.3
+
+
+def _bestmoves(output: io.StringIO) -> list[str]:
+    return [line for line in output.getvalue().splitlines() if line.startswith("bestmove")]
+
+
+def test_limits_from_go() -> None:
+    limits = limits_from_go(["depth", "5", "nodes", "1000"], True)
+    assert (limits.depth, limits.nodes, limits.movetime, limits.infinite) == (5, 1000, None, False)
+    assert limits_from_go(["movetime", "250"], False).movetime == 0.25
+    assert limits_from_go(["depth", str(MAX_PLY * 2)], True).depth == MAX_PLY
+    # each side's clock is used for its own moves
+    clock = ["wtime", "60000", "btime", "3000", "winc", "0", "binc", "0"]
+    assert limits_from_go(clock, True).movetime == pytest.approx(2 - 0.05)
+    assert limits_from_go(clock, False).movetime == pytest.approx(0.1 - 0.05)
+    limits = limits_from_go(["infinite"], True)
+    assert limits.infinite and limits.depth == MAX_PLY and limits.movetime is None
+
+
+@pytest.mark.parametrize("backend", list(BoardBackend), ids=lambda backend: backend.name)
+def test_go_infinite_waits_for_stop(backend: BoardBackend) -> None:
+    output = io.StringIO()
+    engine = UciEngine(output, backend)
+    engine.handle(f"position fen {BACK_RANK_MATE_FEN}")
+    engine.handle("go infinite")
+    time.sleep(SETTLE_TIME)
+    # the mate is found straight away, but the best move is held back until stop
+    assert any("score mate 1" in line for line in output.getvalue().splitlines())
+    assert not _bestmoves(output)
+    engine.handle("stop")
+    assert _bestmoves(output) == ["bestmove d1d8"]
+
+
+@pytest.mark.parametrize("backend", list(BoardBackend), ids=lambda backend: backend.name)
+def test_commands_during_a_search(backend: BoardBackend) -> None:
+    output = io.StringIO()
+    engine = UciEngine(output, backend)
+    engine.handle("position startpos moves e2e4")
+    fen = engine.chess.fen()
+    engine.handle("go infinite")
+    # the search runs on a board of its own, leaving the game's board as it is
+    for _ in range(20):
+        engine.handle("d")
+        time.sleep(0.01)
+    assert all(line == f"Fen: {fen}" for line in output.getvalue().splitlines() if line.startswith("Fen:"))
+    assert not _bestmoves(output)
+    # changing an option stops the search before replacing the board it uses
+    other_backend = BoardBackend.BITBOARD if backend == BoardBackend.OBJECT else BoardBackend.OBJECT
+    engine.handle(f"setoption name Backend value {other_backend.name}")
+    assert len(_bestmoves(output)) == 1
+    assert engine._search_thread is None
+    assert engine.backend == other_backend and engine.chess.fen() == fen
+    engine.handle("position startpos")
+    engine.handle("go depth 2")
+    engine.stop()
+    assert len(_bestmoves(output)) == 2
+    assert engine.chess.fen() == START_FEN
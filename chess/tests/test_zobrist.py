@@ -0,0 +1,57 @@
+import random
+
+import pytest
+from core.bitboard import BitBoard
+from core.board import Board
+from core.chess import START_FEN
+from core.move import MOVE_KEY_MASK
+from core.notation import uci_to_move
+from core.perft import PERFT_SUITE
+from core.perft import PerftPosition
+
+GAME_COUNT = 4
+MAX_PLIES = 80
+
+
+@pytest.mark.parametrize("position", PERFT_SUITE, ids=lambda position: position.name)
+def test_incremental_hash_matches_recomputed_hash(position: PerftPosition) -> None:
+    rng = random.Random(position.name)
+    fen = position.fen.split()[:5]
+    for _ in range(GAME_COUNT):
+        board = Board(fen)
+        bit_board = BitBoard(fen)
+        board.verify_hash = bit_board.verify_hash = True
+        start_hash = board.zobrist_hash
+        assert bit_board.zobrist_hash == start_hash
+        plies = 0
+        for _ in range(MAX_PLIES):
+            board._generate_legal_moves()
+            if not board.legal_moves:
+                break
+            move = rng.choice(board.legal_moves)
+            bit_move = bit_board.legal_move_index().get(move.packed & MOVE_KEY_MASK)
+            assert bit_move is not None
+            board._make_move(move)
+            bit_board._make_move(bit_move)
+            plies += 1
+            assert bit_board.zobrist_hash == board.zobrist_hash
+            # a board loaded from the position's FEN hashes it from scratch
+            assert Board(board.fen().split()).zobrist_hash == board.zobrist_hash
+        for _ in range(plies):
+            board.undo_move()
+            bit_board.undo_move()
+        assert board.zobrist_hash == bit_board.zobrist_hash == start_hash
+
+
+@pytest.mark.parametrize("board_class", [Board, BitBoard], ids=lambda board_class: board_class.__name__)
+def test_transpositions_have_the_same_hash(board_class: type) -> None:
+    hashes = []
+    for line in (["g1f3", "g8f6", "b1c3"], ["b1c3", "g8f6", "g1f3"]):
+        board = board_class(START_FEN.split())
+        for uci in line:
+            board._make_move(uci_to_move(board, uci))
+        hashes.append(board.zobrist_hash)
+    assert hashes[0] == hashes[1]
+    assert board_class("rnbqkb1r/pppppppp/5n2/8/8/2N2N2/PPPPPPPP/R1BQKB1R b KQkq -".split()).zobrist_hash == hashes[0]
+    # the same pieces with the other side to move hash differently
+    assert board_class("rnbqkb1r/pppppppp/5n2/8/8/2N2N2/PPPPPPPP/R1BQKB1R w KQkq -".split()).zobrist_hash != hashes[0]
@@ -0,0 +1,197 @@
+import sys
+import threading
+from typing import Optional
+from typing import TextIO
+
+from core.chess import BoardBackend
+from core.chess import Chess
+from core.chess import make_board
+from core.chess import START_FEN
+from core.notation import move_notation
+from core.piece import ColourType
+from core.polyglot import PolyglotBook
+from core.search import MAX_PLY
+from core.search import Search
+from core.search import SearchInfo
+from core.search import SearchLimits
+from core.tablebase import Tablebases
+
+ENGINE_NAME = "Chess"
+# Fraction of the remaining clock time to spend on a move when no move time is given
+CLOCK_TIME_FRACTION = 30
+# Seconds kept back from the clock for communication delays
+MOVE_OVERHEAD = 0.05
+
+
+def limits_from_go(arguments: list[str], white_to_move: bool) -> SearchLimits:
+    """Get the search limits of the arguments of a go command, in which times are in milliseconds."""
+    values: dict[str, int] = {}
+    for name, value in zip(arguments, arguments[1:]):
+        if value.lstrip("-").isdigit():
+            values[name] = int(value)
+    limits = SearchLimits(values.get("depth", MAX_PLY), values.get("nodes"), infinite="infinite" in arguments)
+    if "movetime" in values:
+        limits.movetime = values["movetime"] / 1000
+    else:
+        clock_time = values.get("wtime" if white_to_move else "btime")
+        if clock_time is not None:
+            increment = values.get("winc" if white_to_move else "binc", 0)
+            movetime = (clock_time / CLOCK_TIME_FRACTION + increment / 2) / 1000
+            limits.movetime = max(min(movetime, clock_time / 1000 / 2) - MOVE_OVERHEAD, 0.01)
+    return limits
+
+
+class UciEngine:
+    """Drives a Chess game and search over the UCI protocol, searching on a worker thread so stop is handled immediately."""
+    output: TextIO
+    backend: BoardBackend
+    chess: Chess
+    # Opening book whose moves are played without searching while the position is in it
+    book: Optional[PolyglotBook]
+    # Endgame tablebases whose positions are answered without searching
+    tablebases: Optional[Tablebases]
+    _search: Optional[Search]
+    _search_thread: Optional[threading.Thread]
+    _output_lock: threading.Lock
+
+    def __init__(self, output: TextIO = sys.stdout, backend: BoardBackend = BoardBackend.OBJECT):
+        self.output = output
+        self.backend = backend
+        self.chess = Chess(START_FEN, backend)
+        self.book = None
+        self.tablebases = None
+        self._search = None
+        self._search_thread = None
+        self._output_lock = threading.Lock()
+
+    def send(self, line: str) -> None:
+        with self._output_lock:
+            self.output.write(line + "\n")
+            self.output.flush()
+
+    def run(self, commands: TextIO = sys.stdin) -> None:
+        """Handle commands until quit or the end of the input."""
+        for line in commands:
+            if not self.handle(line):
+                break
+        self.stop()
+
+    def handle(self, line: str) -> bool:
+        """Handle a command, returning False when the engine should quit."""
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, arguments = tokens[0], tokens[1:]
+        if command == "uci":
+            self.send(f"id name {ENGINE_NAME}")
+            backends = " ".join(f"var {backend.name}" for backend in BoardBackend)
+            self.send(f"option name Backend type combo default {self.backend.name} {backends}")
+            self.send("option name BookFile type string default <empty>")
+            self.send("option name TablebasePath type string default <empty>")
+            self.send("uciok")
+        elif command == "isready":
+            self.send("readyok")
+        elif command == "setoption":
+            # options are only changed while no search is running
+            self.stop()
+            self.set_option(arguments)
+        elif command == "ucinewgame":
+            self.stop()
+            self.chess = Chess(START_FEN, self.backend)
+        elif command == "position":
+            self.stop()
+            self.set_position(arguments)
+        elif command == "go":
+            self.stop()
+            self.go(arguments)
+        elif command == "stop":
+            self.stop()
+        elif command == "quit":
+            return False
+        elif command == "d":
+            self.send(f"{self.chess.board}\nFen: {self.chess.fen()}")
+        else:
+            self.send(f"info string Unknown command: {command}")
+        return True
+
+    def set_option(self, arguments: list[str]) -> None:
+        """Handle setoption name <name> value <value>."""
+        if "name" not in arguments or "value" not in arguments:
+            return
+        name = " ".join(arguments[arguments.index("name") + 1:arguments.index("value")])
+        value = " ".join(arguments[arguments.index("value") + 1:])
+        if name.lower() == "backend" and value.upper() in BoardBackend.__members__:
+            self.backend = BoardBackend[value.upper()]
+            self.chess = Chess(self.chess.fen(), self.backend)
+        elif name.lower() == "bookfile":
+            if self.book is not None:
+                self.book.close()
+                self.book = None
+            if value and value != "<empty>":
+                try:
+                    self.book = PolyglotBook(value)
+                except OSError as error:
+                    self.send(f"info string Can't open book: {error}")
+        elif name.lower() == "tablebasepath":
+            if self.tablebases is not None:
+                self.tablebases.close()
+                self.tablebases = None
+            if value and value != "<empty>":
+                try:
+                    self.tablebases = Tablebases(value)
+                except (OSError, ValueError) as error:
+                    self.send(f"info string Can't open tablebases: {error}")
+                    return
+                self.send(f"info string Found tablebases: {' '.join(self.tablebases.tables) or 'none'}")
+        else:
+            self.send(f"info string Unknown option: {name}")
+
+    def set_position(self, arguments: list[str]) -> None:
+        """Handle position [startpos | fen <fen>] [moves <move>...]."""
+        moves_index = arguments.index("moves") if "moves" in arguments else len(arguments)
+        if arguments and arguments[0] == "fen":
+            fen = " ".join(arguments[1:moves_index])
+        else:
+            fen = START_FEN
+        try:
+            self.chess.set_fen(fen)
+            for uci in arguments[moves_index + 1:]:
+                self.chess.move_from_uci(uci)
+        except (ValueError, IndexError, KeyError) as error:
+            self.send(f"info string Invalid position: {error}")
+
+    def go(self, arguments: list[str]) -> None:
+        """Play a book move if the position is in the opening book, otherwise start searching the position on a worker thread,
+        which sends the best move when the search ends."""
+        if self.book is not None:
+            book_move = self.book.choose(self.chess.board)
+            if book_move is not None:
+                self.send(f"bestmove {book_move!r}")
+                return
+        limits = limits_from_go(arguments, self.chess.board.turn == ColourType.WHITE)
+        # the search makes and undoes moves on a board of its own, so the game's board can be shown while it runs
+        board = make_board(self.chess.fen(), self.backend)
+        self._search = Search(board, limits, self._report, self.tablebases)
+        self._search_thread = threading.Thread(target=self._run_search, args=(self._search,), daemon=True)
+        self._search_thread.start()
+
+    def stop(self) -> None:
+        """Stop any running search, waiting for it to send its best move."""
+        if self._search is not None:
+            self._search.stop()
+        if self._search_thread is not None:
+            self._search_thread.join()
+        self._search = None
+        self._search_thread = None
+
+    def _run_search(self, search: Search) -> None:
+        result = search.run()
+        best_move = result.best_move if result is not None else None
+        self.send(f"bestmove {move_notation(best_move) if best_move is not None else '0000'}")
+
+    def _report(self, info: SearchInfo) -> None:
+        self.send(repr(info))
+
+
+if __name__ == '__main__':
+    UciEngine().run()
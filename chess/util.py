@@ -14,6 +14,11 @@ def read_chess_notation(position: str) -> Square:
     return Square(RANK_NOTATION[position[1:2]], FILE_NOTATION[position[:1]])
 
 
+def write_chess_notation(square: Square) -> str:
+    """Convert a Square into chess notation."""
+    return chr(ord('a') + square.file) + str(square.rank + 1)
+
+
 def is_pawn_promotion(to_rank: int, piece: Optional[Piece]) -> bool:
     """Returns a bool indicating whether a piece moving to a given rank is a pawn and promoting."""
     if piece is None or piece.piece_type != PieceType.PAWN: